@@ -5,25 +5,22 @@ import time
 import os
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
-from models.neural_network import NeuralNetwork
 from optimizers.genetic_algorithm import GeneticAlgorithm
 from optimizers.particle_swarm import ParticleSwarmOptimization
 from optimizers.ant_colony import AntColonyOptimization
 from optimizers.tabu_search import TabuSearch
-from utils.data_handler import DataHandler
+from utils.context_registry import contexts
 from utils.visualization import Visualizer
+from utils.static_cache import StaticFileCache
 
 class APIHandler(BaseHTTPRequestHandler):
     """Handler for API requests from the frontend."""
     
-    # Store data and neural network as class variables to avoid reloading
-    data_loaded = False
-    data_handler = None
-    nn = None
-    X_train = None
-    X_test = None
-    y_train = None
-    y_test = None
+    # Datasets and network architectures, loaded once and shared across requests
+    contexts = contexts
+    
+    # In-memory cache for the files under ui/
+    static_cache = None
     
     def _set_headers(self, status_code=200, content_type='application/json'):
         """Set response headers."""
@@ -80,29 +77,34 @@ class APIHandler(BaseHTTPRequestHandler):
             # Parse JSON data
             data = json.loads(post_data)
             
-            # Initialize data and neural network if not already done
-            if not APIHandler.data_loaded:
-                self.initialize_data_and_nn()
+            # Dataset and architecture for this request, loaded on first use
+            try:
+                context = APIHandler.contexts.get(str(data.get('dataset', 'iris')),
+                                                  int(data.get('hidden_size', 8)))
+            except (TypeError, ValueError) as e:
+                self._set_headers(400)
+                self.wfile.write(json.dumps({'error': str(e)}).encode())
+                return
             
             # Handle algorithm endpoints
             if path == '/api/run/ga':
-                result = self.run_genetic_algorithm(data)
+                result = self.run_genetic_algorithm(data, context)
                 self._set_headers()
                 self.wfile.write(json.dumps(result).encode())
             elif path == '/api/run/pso':
-                result = self.run_particle_swarm(data)
+                result = self.run_particle_swarm(data, context)
                 self._set_headers()
                 self.wfile.write(json.dumps(result).encode())
             elif path == '/api/run/aco':
-                result = self.run_ant_colony(data)
+                result = self.run_ant_colony(data, context)
                 self._set_headers()
                 self.wfile.write(json.dumps(result).encode())
             elif path == '/api/run/tabu':
-                result = self.run_tabu_search(data)
+                result = self.run_tabu_search(data, context)
                 self._set_headers()
                 self.wfile.write(json.dumps(result).encode())
             elif path == '/api/run/all':
-                result = self.run_all_algorithms(data)
+                result = self.run_all_algorithms(data, context)
                 self._set_headers()
                 self.wfile.write(json.dumps(result).encode())
             else:
@@ -121,33 +123,19 @@ class APIHandler(BaseHTTPRequestHandler):
             self.wfile.write(json.dumps(response).encode())
     
     def serve_static_file(self, file_path):
-        """Serve a static file."""
+        """Serve a static file from the in-memory static cache."""
         try:
-            # Get the current working directory
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            absolute_path = os.path.join(base_dir, file_path)
-            
-            # Determine content type based on file extension
-            content_type = 'text/html'
-            if file_path.endswith('.css'):
-                content_type = 'text/css'
-            elif file_path.endswith('.js'):
-                content_type = 'application/javascript'
-            elif file_path.endswith('.json'):
-                content_type = 'application/json'
-            elif file_path.endswith('.png'):
-                content_type = 'image/png'
-            elif file_path.endswith('.jpg') or file_path.endswith('.jpeg'):
-                content_type = 'image/jpeg'
-            
-            with open(absolute_path, 'rb') as file:
-                self._set_headers(200, content_type)
-                self.wfile.write(file.read())
-        except FileNotFoundError:
-            logging.error(f"File not found: {file_path}")
-            self._set_headers(404)
-            response = {'error': f'File not found: {file_path}'}
-            self.wfile.write(json.dumps(response).encode())
+            if APIHandler.static_cache is None:
+                # Get the current working directory
+                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                APIHandler.static_cache = StaticFileCache(os.path.join(base_dir, 'ui'))
+            
+            # Paths are resolved inside ui/, so requests cannot escape it
+            if not APIHandler.static_cache.serve(self, os.path.relpath(file_path, 'ui')):
+                logging.error(f"File not found: {file_path}")
+                self._set_headers(404)
+                response = {'error': f'File not found: {file_path}'}
+                self.wfile.write(json.dumps(response).encode())
         except Exception as e:
             logging.error(f"Error serving static file {file_path}: {str(e)}")
             logging.error(traceback.format_exc())
@@ -198,27 +186,7 @@ class APIHandler(BaseHTTPRequestHandler):
             response = {'error': str(e)}
             self.wfile.write(json.dumps(response).encode())
     
-    def initialize_data_and_nn(self):
-        """Initialize data and neural network."""
-        try:
-            logging.info("Loading and preprocessing data...")
-            APIHandler.data_handler = DataHandler()
-            APIHandler.X_train, APIHandler.X_test, APIHandler.y_train, APIHandler.y_test = APIHandler.data_handler.load_iris_data()
-            
-            # Initialize neural network
-            input_size = APIHandler.X_train.shape[1]
-            hidden_size = 8  # Default value, can be made configurable
-            output_size = 3  # Iris has 3 classes
-            APIHandler.nn = NeuralNetwork(input_size, hidden_size, output_size)
-            
-            APIHandler.data_loaded = True
-            logging.info(f"Neural network created with architecture: {input_size}-{hidden_size}-{output_size}")
-        except Exception as e:
-            logging.error(f"Error initializing data and neural network: {str(e)}")
-            logging.error(traceback.format_exc())
-            raise
-    
-    def run_genetic_algorithm(self, data):
+    def run_genetic_algorithm(self, data, context):
         """Run the Genetic Algorithm with the specified parameters."""
         try:
             logging.info("\nRunning Genetic Algorithm...")
@@ -232,11 +200,11 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.info(f"GA Parameters: population_size={population_size}, generations={generations}, mutation_rate={mutation_rate}")
             
             ga = GeneticAlgorithm(
-                APIHandler.nn, 
-                APIHandler.X_train, 
-                APIHandler.y_train, 
-                APIHandler.X_test, 
-                APIHandler.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 population_size=population_size,
                 generations=generations,
                 mutation_rate=mutation_rate
@@ -247,7 +215,7 @@ class APIHandler(BaseHTTPRequestHandler):
             
             result = {
                 'best_accuracy': best_accuracy,
-                'accuracy_history': history['best_accuracy_history'],
+                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
                 'execution_time': execution_time
             }
             
@@ -269,7 +237,7 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_particle_swarm(self, data):
+    def run_particle_swarm(self, data, context):
         """Run the Particle Swarm Optimization with the specified parameters."""
         try:
             logging.info("\nRunning Particle Swarm Optimization...")
@@ -285,11 +253,11 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.info(f"PSO Parameters: swarm_size={swarm_size}, iterations={iterations}, inertia={inertia}, cognitive_coef={cognitive_coef}, social_coef={social_coef}")
             
             pso = ParticleSwarmOptimization(
-                APIHandler.nn, 
-                APIHandler.X_train, 
-                APIHandler.y_train, 
-                APIHandler.X_test, 
-                APIHandler.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 swarm_size=swarm_size,
                 iterations=iterations,
                 inertia=inertia,
@@ -302,7 +270,7 @@ class APIHandler(BaseHTTPRequestHandler):
             
             result = {
                 'best_accuracy': best_accuracy,
-                'accuracy_history': history['best_accuracy_history'],
+                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
                 'execution_time': execution_time
             }
             
@@ -324,7 +292,7 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_ant_colony(self, data):
+    def run_ant_colony(self, data, context):
         """Run the Ant Colony Optimization with the specified parameters."""
         try:
             logging.info("\nRunning Ant Colony Optimization...")
@@ -340,11 +308,11 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.info(f"ACO Parameters: ant_count={ant_count}, iterations={iterations}, pheromone_importance={pheromone_importance}, heuristic_importance={heuristic_importance}, evaporation_rate={evaporation_rate}")
             
             aco = AntColonyOptimization(
-                APIHandler.nn, 
-                APIHandler.X_train, 
-                APIHandler.y_train, 
-                APIHandler.X_test, 
-                APIHandler.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 ant_count=ant_count,
                 iterations=iterations,
                 pheromone_importance=pheromone_importance,
@@ -357,7 +325,7 @@ class APIHandler(BaseHTTPRequestHandler):
             
             result = {
                 'best_accuracy': best_accuracy,
-                'accuracy_history': history['best_accuracy_history'],
+                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
                 'execution_time': execution_time
             }
             
@@ -379,7 +347,7 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_tabu_search(self, data):
+    def run_tabu_search(self, data, context):
         """Run the Tabu Search with the specified parameters."""
         try:
             logging.info("\nRunning Tabu Search...")
@@ -394,11 +362,11 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.info(f"Tabu Search Parameters: iterations={iterations}, tabu_list_size={tabu_list_size}, neighborhood_size={neighborhood_size}, step_size={step_size}")
             
             tabu = TabuSearch(
-                APIHandler.nn, 
-                APIHandler.X_train, 
-                APIHandler.y_train, 
-                APIHandler.X_test, 
-                APIHandler.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 iterations=iterations,
                 tabu_list_size=tabu_list_size,
                 neighborhood_size=neighborhood_size,
@@ -410,7 +378,7 @@ class APIHandler(BaseHTTPRequestHandler):
             
             result = {
                 'best_accuracy': best_accuracy,
-                'accuracy_history': history['best_accuracy_history'],
+                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
                 'execution_time': execution_time
             }
             
@@ -432,16 +400,16 @@ class APIHandler(BaseHTTPRequestHandler):
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_all_algorithms(self, data):
+    def run_all_algorithms(self, data, context):
         """Run all optimization algorithms with the specified parameters."""
         try:
             logging.info("\nRunning all optimization algorithms...")
             
             # Run each algorithm
-            ga_result = self.run_genetic_algorithm(data.get('ga', {}))
-            pso_result = self.run_particle_swarm(data.get('pso', {}))
-            aco_result = self.run_ant_colony(data.get('aco', {}))
-            tabu_result = self.run_tabu_search(data.get('tabu', {}))
+            ga_result = self.run_genetic_algorithm(data.get('ga', {}), context)
+            pso_result = self.run_particle_swarm(data.get('pso', {}), context)
+            aco_result = self.run_ant_colony(data.get('aco', {}), context)
+            tabu_result = self.run_tabu_search(data.get('tabu', {}), context)
             
             # Determine best algorithm
             algorithms = {
@@ -0,0 +1,194 @@
+import io
+import os
+import asyncio
+import logging
+import traceback
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+class BufferedRequestAdapter:
+    """
+    Runs a BaseHTTPRequestHandler subclass against an already-parsed request.
+
+    The handler's request logic (static files, API dispatch, error pages) is
+    reused unchanged; its response is written to an in-memory buffer instead
+    of a socket, and the event loop sends the buffer.
+    """
+
+    @staticmethod
+    def create(handler_class, method, target, version, headers, body, client_address, directory,
+               disconnected=None):
+        """
+        Create a handler instance without a socket.
+
+        Args:
+            handler_class: BaseHTTPRequestHandler subclass to run
+            method (str): HTTP method
+            target (str): Request target (path and query)
+            version (str): HTTP version of the request
+            headers (http.client.HTTPMessage): Parsed request headers
+            body (bytes): Request body
+            client_address (tuple): Peer address
+            directory (str): Project directory the handler serves from
+            disconnected: Callable returning True once the client has closed the
+                connection; replaces the handler's socket-based check
+
+        Returns:
+            Handler instance ready to have its do_<METHOD> method called
+        """
+        handler = handler_class.__new__(handler_class)
+        handler.command = method
+        handler.path = target
+        handler.request_version = version
+        handler.requestline = f'{method} {target} {version}'
+        handler.headers = headers
+        handler.rfile = io.BytesIO(body)
+        handler.wfile = io.BytesIO()
+        handler.client_address = client_address
+        handler.directory = directory
+        handler.close_connection = version != 'HTTP/1.1'
+        handler.client_disconnected = disconnected or (lambda: False)
+        return handler
+
+
+class AsyncHTTPServer:
+    """
+    asyncio-based HTTP/1.1 server.
+
+    Static files, /api/status and /api/results are served on the event loop, so
+    idle keep-alive connections cost a coroutine rather than a thread.
+    CPU-bound /api/run/* requests are offloaded to a thread pool with
+    run_in_executor.
+    """
+
+    def __init__(self, handler_class, directory, max_runs=1, idle_timeout=15):
+        """
+        Initialize the asyncio server.
+
+        Args:
+            handler_class: BaseHTTPRequestHandler subclass with the request logic
+            directory (str): Project directory the handler serves from
+            max_runs (int): Number of concurrent optimizer runs the handler admits
+            idle_timeout (float): Seconds before an idle connection is closed
+        """
+        self.handler_class = handler_class
+        self.directory = directory
+        self.idle_timeout = idle_timeout
+
+        # A few threads beyond max_runs, so requests over the handler's admission
+        # limit are rejected promptly instead of waiting in the executor queue
+        self.executor = ThreadPoolExecutor(max_workers=max_runs + 4, thread_name_prefix='optimizer-run')
+
+    def is_blocking(self, method, path):
+        """
+        Check whether a request would block the event loop.
+
+        Args:
+            method (str): HTTP method
+            path (str): Request path
+
+        Returns:
+            bool: True for requests that must run in the executor
+        """
+        return method == 'POST' and path.startswith('/api/')
+
+    def dispatch(self, handler):
+        """
+        Run the handler for its request method and return the buffered response.
+
+        Args:
+            handler: Handler instance created by BufferedRequestAdapter
+
+        Returns:
+            tuple: Response bytes and whether to close the connection
+        """
+        method = getattr(handler, f'do_{handler.command}', None)
+        if method is None:
+            handler.send_error(501, f"Unsupported method ({handler.command})")
+        else:
+            method()
+        return handler.wfile.getvalue(), handler.close_connection
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve requests on one connection until it is closed or goes idle.
+
+        Args:
+            reader (asyncio.StreamReader): Connection reader
+            writer (asyncio.StreamWriter): Connection writer
+        """
+        client_address = writer.get_extra_info('peername') or ('', 0)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Request line and headers
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+
+                request_line, _, header_block = head.partition(b'\r\n')
+                parts = request_line.decode('iso-8859-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                headers = http.client.parse_headers(io.BytesIO(header_block))
+
+                # Request body
+                content_length = int(headers.get('Content-Length', 0) or 0)
+                body = await reader.readexactly(content_length) if content_length else b''
+
+                handler = BufferedRequestAdapter.create(
+                    self.handler_class, method, target, version, headers, body,
+                    client_address, self.directory,
+                    # The loop keeps reading the socket, so EOF shows up while a run executes
+                    disconnected=reader.at_eof
+                )
+                if headers.get('Connection', '').lower() == 'close':
+                    handler.close_connection = True
+
+                if self.is_blocking(method, urlparse(target).path):
+                    response, close = await loop.run_in_executor(self.executor, self.dispatch, handler)
+                else:
+                    response, close = self.dispatch(handler)
+
+                writer.write(response)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.error(f"Error handling connection: {str(e)}")
+            logging.error(traceback.format_exc())
+        finally:
+            writer.close()
+
+    async def serve(self, port):
+        """
+        Listen on a port and serve until cancelled.
+
+        Args:
+            port (int): Port to listen on
+        """
+        server = await asyncio.start_server(self.handle_connection, host=None, port=port)
+        async with server:
+            await server.serve_forever()
+
+
+def start_async_server(handler_class, port=8000, max_runs=1):
+    """Start the asyncio web server with the given request handler class."""
+    try:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        server = AsyncHTTPServer(handler_class, directory, max_runs=max_runs)
+
+        print(f"\nAsync server started at http://localhost:{port}")
+        print("Press Ctrl+C to stop the server")
+
+        asyncio.run(server.serve(port))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    except Exception as e:
+        logging.error(f"Error starting async web server: {str(e)}")
+        logging.error(traceback.format_exc())
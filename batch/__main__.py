@@ -0,0 +1,42 @@
+import argparse
+import logging
+
+from batch.sweep import load_config, run_sweep
+from batch.tuner import run_tuner
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(prog='python -m batch',
+                                     description='Headless batch runs of the optimizers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sweep = commands.add_parser('sweep', help='Run a grid or random parameter sweep')
+    sweep.add_argument('config', help='Sweep configuration (.yaml or .json)')
+    sweep.add_argument('--output', help='JSONL results file; existing results are skipped')
+    sweep.add_argument('--workers', type=int, help='Number of worker processes')
+    sweep.add_argument('--parquet', help='Also write all results to this Parquet file')
+    sweep.add_argument('--dry-run', action='store_true', help='Only count the trials')
+
+    tune = commands.add_parser('tune', help='Tune one optimizer with successive halving or Hyperband')
+    tune.add_argument('config', help='Tuner configuration (.yaml or .json)')
+    tune.add_argument('--output', help='JSONL file for trial results; existing results are reused')
+    tune.add_argument('--workers', type=int, help='Number of worker processes')
+
+    return parser.parse_args()
+
+def main():
+    """Entry point for python -m batch."""
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'sweep':
+        config = load_config(args.config)
+        run_sweep(config, output_path=args.output, workers=args.workers,
+                  parquet_path=args.parquet, dry_run=args.dry_run)
+    elif args.command == 'tune':
+        config = load_config(args.config)
+        run_tuner(config, output_path=args.output, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import os
+import json
+import math
+import random
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch.trials import OPTIMIZERS, make_trial, run_trial, load_context
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional; JSON configs always work
+    yaml = None
+
+def load_config(path):
+    """
+    Load a sweep configuration from a YAML or JSON file.
+
+    Args:
+        path (str): Path to the configuration file
+
+    Returns:
+        dict: Parsed configuration
+    """
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError("YAML configs need PyYAML (pip install pyyaml); use a .json config instead")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def expand_seeds(seeds):
+    """
+    Turn the 'seeds' setting into a list of seeds.
+
+    Args:
+        seeds: Number of seeds (0..n-1) or an explicit list
+
+    Returns:
+        list: Seeds
+    """
+    if isinstance(seeds, int):
+        return list(range(seeds))
+    return list(seeds)
+
+def sample_value(spec, rng):
+    """
+    Draw one value for a parameter in a random search.
+
+    Args:
+        spec: Fixed value, list of choices, or {'low', 'high', 'log', 'type'} range
+        rng (random.Random): Random generator
+
+    Returns:
+        Sampled value
+    """
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if not isinstance(spec, dict):
+        return spec
+
+    low, high = spec['low'], spec['high']
+    if spec.get('log', False):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    if spec.get('type') == 'int' or (isinstance(low, int) and isinstance(high, int) and 'type' not in spec):
+        return int(round(value))
+    return value
+
+def expand_experiment(experiment, seeds, rng):
+    """
+    Expand one experiment block into trials.
+
+    Args:
+        experiment (dict): Block with 'algorithm', 'params' and optionally
+            'search' ('grid' or 'random') and 'samples'
+        seeds (list): Seeds every configuration is run with
+        rng (random.Random): Random generator for random search
+
+    Returns:
+        list: Trials
+    """
+    algorithm = experiment['algorithm']
+    if algorithm not in OPTIMIZERS:
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {sorted(OPTIMIZERS)}")
+
+    params = experiment.get('params', {})
+    names = sorted(params)
+    search = experiment.get('search', 'grid')
+
+    if search == 'grid':
+        for name in names:
+            if isinstance(params[name], dict):
+                raise ValueError(f"Grid search needs a list of values for '{name}', not a range")
+        choices = [params[name] if isinstance(params[name], list) else [params[name]] for name in names]
+        configs = [dict(zip(names, values)) for values in itertools.product(*choices)]
+    elif search == 'random':
+        configs = [{name: sample_value(params[name], rng) for name in names}
+                   for _ in range(int(experiment.get('samples', 10)))]
+    else:
+        raise ValueError(f"Unknown search '{search}', expected 'grid' or 'random'")
+
+    return [make_trial(algorithm, config, seed) for config in configs for seed in seeds]
+
+def expand_config(config):
+    """
+    Expand a sweep configuration into the full list of trials.
+
+    A configuration is either a single experiment (algorithm, params, search,
+    samples at the top level) or has an 'experiments' list of such blocks.
+    'seeds' and 'random_state' apply to every experiment.
+
+    Args:
+        config (dict): Sweep configuration
+
+    Returns:
+        list: Trials, in a stable order
+    """
+    seeds = expand_seeds(config.get('seeds', 1))
+
+    # Random search is seeded so a resumed sweep regenerates the same trials
+    rng = random.Random(config.get('random_state', 0))
+
+    experiments = config.get('experiments', [config])
+    trials = []
+    for experiment in experiments:
+        trials.extend(expand_experiment(experiment, seeds, rng))
+    return trials
+
+def completed_trials(output_path):
+    """
+    Find the trials that already finished successfully in an output file.
+
+    Args:
+        output_path (str): JSONL results file
+
+    Returns:
+        set: Trial identifiers
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by an interrupted sweep
+            if 'error' not in record:
+                done.add(record.get('trial_id'))
+    return done
+
+def write_parquet(jsonl_path, parquet_path):
+    """
+    Convert a JSONL results file to Parquet.
+
+    Results are streamed to the JSONL file only; the Parquet file is written
+    in one pass at the end, since trials with different parameters produce
+    different columns and a Parquet file has one schema.
+
+    Args:
+        jsonl_path (str): JSONL results file
+        parquet_path (str): Parquet file to write
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        logging.warning("Parquet output needs pandas and pyarrow; results are in the JSONL file only")
+        return
+    with open(jsonl_path, 'r') as f:
+        frame = pd.json_normalize([json.loads(line) for line in f if line.strip()])
+    try:
+        frame.to_parquet(parquet_path, index=False)
+    except ImportError:
+        # pandas is installed but neither pyarrow nor fastparquet is
+        logging.warning("Parquet output needs pandas and pyarrow; results are in the JSONL file only")
+        return
+    logging.info(f"Wrote {len(frame)} results to {parquet_path}")
+
+def run_trials(trials, workers=None, on_result=None, executor=None):
+    """
+    Run trials in parallel worker processes.
+
+    Args:
+        trials (list): Trials to run
+        workers (int): Number of worker processes (default: CPU count)
+        on_result: Called with each result as soon as its trial finishes
+        executor (ProcessPoolExecutor): Pool to reuse across calls; one is
+            created (and shut down afterwards) if not given
+
+    Returns:
+        list: Results in completion order
+    """
+    results = []
+    workers = workers or os.cpu_count() or 1
+    if executor is None and workers == 1:
+        for trial in trials:
+            result = run_trial(trial)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        return results
+
+    if executor is None:
+        with create_executor(workers) as executor:
+            return run_trials(trials, on_result=on_result, executor=executor)
+
+    futures = [executor.submit(run_trial, trial) for trial in trials]
+    for future in as_completed(futures):
+        result = future.result()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+def create_executor(workers=None):
+    """
+    Create a process pool for running trials.
+
+    Args:
+        workers (int): Number of worker processes (default: CPU count)
+
+    Returns:
+        ProcessPoolExecutor: Pool whose workers have the dataset loaded
+    """
+    # Each worker loads the dataset once, not once per trial
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=load_context)
+
+def run_sweep(config, output_path=None, workers=None, parquet_path=None, dry_run=False):
+    """
+    Run a parameter sweep, appending results to a JSONL file as trials finish.
+
+    Trials whose identifier is already in the output file without an error
+    are skipped, so an interrupted sweep continues where it stopped.
+
+    Args:
+        config (dict): Sweep configuration
+        output_path (str): JSONL results file (default: config 'output' or sweep_results.jsonl)
+        workers (int): Number of worker processes (default: config 'workers' or CPU count)
+        parquet_path (str): Also write all results to this Parquet file at the end
+        dry_run (bool): Only report how many trials would run
+
+    Returns:
+        int: Number of trials run
+    """
+    output_path = output_path or config.get('output', 'sweep_results.jsonl')
+    workers = workers or config.get('workers')
+    parquet_path = parquet_path or config.get('parquet')
+
+    trials = expand_config(config)
+    done = completed_trials(output_path)
+    pending = [trial for trial in trials if trial['trial_id'] not in done]
+    logging.info(f"Sweep: {len(trials)} trials, {len(trials) - len(pending)} already done, {len(pending)} to run")
+    if dry_run or not pending:
+        return 0
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, 'a') as output:
+        progress = {'count': 0}
+
+        def write_result(result):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            progress['count'] += 1
+            status = result.get('error') or f"test accuracy {result['test_accuracy']:.4f}"
+            logging.info(f"[{progress['count']}/{len(pending)}] {result['algorithm']} "
+                         f"{result['params']} seed={result['seed']}: {status}")
+
+        run_trials(pending, workers, on_result=write_result)
+
+    if parquet_path:
+        write_parquet(output_path, parquet_path)
+    return len(pending)
@@ -0,0 +1,126 @@
+import io
+import json
+import time
+import random
+import hashlib
+import contextlib
+import numpy as np
+
+from optimizers.genetic_algorithm import GeneticAlgorithm
+from optimizers.particle_swarm import ParticleSwarmOptimization
+from optimizers.ant_colony import AntColonyOptimization
+from optimizers.tabu_search import TabuSearch
+from optimizers.cma_es import CMAES
+from optimizers.differential_evolution import DifferentialEvolution
+from utils.context_registry import contexts
+
+# Optimizer classes by the short names used in the API and configs
+OPTIMIZERS = {
+    'ga': GeneticAlgorithm,
+    'pso': ParticleSwarmOptimization,
+    'aco': AntColonyOptimization,
+    'tabu': TabuSearch,
+    'cmaes': CMAES,
+    'de': DifferentialEvolution
+}
+
+# Constructor argument that sets each optimizer's iteration budget
+BUDGET_PARAMS = {
+    'ga': 'generations',
+    'pso': 'iterations',
+    'aco': 'iterations',
+    'tabu': 'iterations',
+    'cmaes': 'iterations',
+    'de': 'generations'
+}
+
+def load_context(dataset='iris', hidden_size=8):
+    """
+    Get the dataset and network, loaded once per worker process.
+
+    Args:
+        dataset (str): Dataset name
+        hidden_size (int): Number of hidden neurons
+
+    Returns:
+        DatasetContext: Shared context from the process-wide registry
+    """
+    return contexts.get(dataset, hidden_size)
+
+def trial_id(algorithm, params, seed):
+    """
+    Build a stable identifier for a trial.
+
+    Args:
+        algorithm (str): Optimizer name
+        params (dict): Optimizer parameters
+        seed (int): Random seed
+
+    Returns:
+        str: Identifier that is the same whenever the trial is the same
+    """
+    key = json.dumps({'algorithm': algorithm, 'params': params, 'seed': seed}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def make_trial(algorithm, params, seed, **extra):
+    """
+    Describe one trial.
+
+    Args:
+        algorithm (str): Optimizer name
+        params (dict): Optimizer constructor arguments
+        seed (int): Random seed
+        **extra: Additional fields copied into the trial and its result
+
+    Returns:
+        dict: Trial description accepted by run_trial()
+    """
+    trial = {
+        'trial_id': trial_id(algorithm, params, seed),
+        'algorithm': algorithm,
+        'params': params,
+        'seed': seed
+    }
+    trial.update(extra)
+    return trial
+
+def run_trial(trial):
+    """
+    Run one optimizer configuration headlessly.
+
+    Args:
+        trial (dict): Trial from make_trial()
+
+    Returns:
+        dict: The trial plus its results, or an 'error' field if it failed
+    """
+    record = dict(trial)
+    start_time = time.time()
+    try:
+        optimizer_class = OPTIMIZERS[trial['algorithm']]
+        context = load_context()
+
+        # Seed every source of randomness the optimizers use
+        np.random.seed(trial['seed'])
+        random.seed(trial['seed'])
+
+        optimizer = optimizer_class(context.nn, context.X_train, context.y_train,
+                                    context.X_test, context.y_test, **trial['params'])
+
+        # The optimizers report progress with print(); keep worker output quiet
+        with contextlib.redirect_stdout(io.StringIO()):
+            best_weights, best_accuracy, history = optimizer.run()
+
+        record.update({
+            'test_accuracy': float(best_accuracy),
+            'train_accuracy': float(context.nn.calculate_accuracy(context.X_train, context.y_train, best_weights)),
+            'best_fitness': float(history['best_fitness_history'][-1]),
+            'evaluations': int(optimizer.evaluations),
+            'execution_time': float(time.time() - start_time)
+        })
+    except Exception as e:
+        record.update({
+            'error': f"{type(e).__name__}: {str(e)}",
+            'execution_time': float(time.time() - start_time)
+        })
+    return record
@@ -0,0 +1,302 @@
+import os
+import json
+import math
+import random
+import logging
+import numpy as np
+
+from batch.trials import OPTIMIZERS, BUDGET_PARAMS, make_trial
+from batch.sweep import expand_seeds, sample_value, run_trials, create_executor
+
+class SuccessiveHalvingTuner:
+    """
+    Hyperparameter tuner based on successive halving and Hyperband.
+
+    Successive halving runs many randomly sampled configurations of one
+    optimizer with a small iteration budget, keeps the best 1/eta of them,
+    and reruns those with eta times the budget until the maximum budget is
+    reached. Hyperband runs several such brackets that trade the number of
+    configurations against their starting budget. Every rung runs its trials
+    in parallel worker processes.
+
+    The budget is the optimizer's own iteration argument ('generations' for
+    GA, 'iterations' for the others). The optimizers cannot resume, so a
+    promoted configuration is rerun from scratch with the larger budget.
+    """
+
+    def __init__(self, algorithm, space, min_budget=10, max_budget=100, eta=3,
+                 method='hyperband', n_configs=None, seeds=1, metric='best_fitness',
+                 fixed_params=None, random_state=0):
+        """
+        Initialize the tuner.
+
+        Args:
+            algorithm (str): Optimizer to tune ('ga', 'pso', 'aco', 'tabu', 'cmaes' or 'de')
+            space (dict): Search space; each value is a list of choices or a
+                {'low', 'high', 'log', 'type'} range
+            min_budget (int): Iterations in the first rung
+            max_budget (int): Iterations in the last rung
+            eta (int): Fraction kept per rung is 1/eta and the budget grows by eta
+            method (str): 'hyperband' or 'successive_halving'
+            n_configs (int): Configurations in the first rung (successive halving
+                only; default eta ** number of promotions)
+            seeds (int or list): Seeds each configuration is run with; the
+                metric is averaged over them
+            metric (str): 'best_fitness' (training objective) or 'test_accuracy'
+            fixed_params (dict): Constructor arguments shared by every configuration
+            random_state (int): Seed for sampling configurations
+        """
+        if algorithm not in OPTIMIZERS:
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {sorted(OPTIMIZERS)}")
+        if method not in ('hyperband', 'successive_halving'):
+            raise ValueError(f"Unknown method '{method}', expected 'hyperband' or 'successive_halving'")
+        if metric not in ('best_fitness', 'test_accuracy'):
+            raise ValueError(f"Unknown metric '{metric}', expected 'best_fitness' or 'test_accuracy'")
+        if eta < 2 or min_budget < 1 or max_budget < min_budget:
+            raise ValueError("Need eta >= 2 and 1 <= min_budget <= max_budget")
+
+        self.algorithm = algorithm
+        self.budget_param = BUDGET_PARAMS[algorithm]
+        self.space = {name: spec for name, spec in space.items() if name != self.budget_param}
+        self.min_budget = int(min_budget)
+        self.max_budget = int(max_budget)
+        self.eta = int(eta)
+        self.method = method
+        self.seeds = expand_seeds(seeds)
+        self.metric = metric
+        self.fixed_params = dict(fixed_params or {})
+        self.rng = random.Random(random_state)
+
+        # Number of promotions from min_budget to max_budget
+        self.max_rung = int(math.floor(math.log(self.max_budget / self.min_budget, self.eta) + 1e-9))
+        self.n_configs = int(n_configs) if n_configs else self.eta ** self.max_rung
+
+        # Results of every trial run so far, by trial id
+        self.results = {}
+
+        # Iterations spent by trials this tuner ran itself (not loaded with load_results)
+        self.iterations_spent = 0
+
+    def sample_config(self):
+        """
+        Draw one configuration from the search space.
+
+        Returns:
+            dict: Parameter values
+        """
+        config = dict(self.fixed_params)
+        for name in sorted(self.space):
+            config[name] = sample_value(self.space[name], self.rng)
+        return config
+
+    def brackets(self):
+        """
+        Plan the brackets to run.
+
+        Returns:
+            list: (number of configurations, starting rung) per bracket
+        """
+        if self.method == 'successive_halving':
+            return [(self.n_configs, 0)]
+
+        # Hyperband: bracket s starts with many configurations at a small budget
+        # (s = max_rung) or few at the full budget (s = 0)
+        plan = []
+        for s in range(self.max_rung, -1, -1):
+            n = int(math.ceil((self.max_rung + 1) / (s + 1) * self.eta ** s))
+            plan.append((n, self.max_rung - s))
+        return plan
+
+    def budget_for(self, rung):
+        """
+        Get the iteration budget of a rung.
+
+        Args:
+            rung (int): Rung index, 0 for min_budget
+
+        Returns:
+            int: Iterations
+        """
+        if rung >= self.max_rung:
+            return self.max_budget
+        return int(round(self.min_budget * self.eta ** rung))
+
+    def score(self, config, budget):
+        """
+        Average the metric of a configuration over its seeds at one budget.
+
+        Args:
+            config (dict): Parameter values
+            budget (int): Iterations
+
+        Returns:
+            float: Mean metric (higher is better), -inf if every seed failed
+        """
+        params = dict(config, **{self.budget_param: budget})
+        values = [self.results[make_trial(self.algorithm, params, seed)['trial_id']].get(self.metric)
+                  for seed in self.seeds]
+        values = [v for v in values if v is not None]
+        return float(np.mean(values)) if values else -np.inf
+
+    def evaluate(self, configs, budget, bracket, rung, executor, on_result):
+        """
+        Run every configuration at one budget, skipping trials already run.
+
+        Args:
+            configs (list): Configurations
+            budget (int): Iterations
+            bracket (int): Bracket index, recorded with each result
+            rung (int): Rung index, recorded with each result
+            executor (ProcessPoolExecutor): Worker pool
+            on_result: Called with each new result
+
+        Returns:
+            list: Mean metric per configuration
+        """
+        trials = {}
+        for config in configs:
+            params = dict(config, **{self.budget_param: budget})
+            for seed in self.seeds:
+                trial = make_trial(self.algorithm, params, seed, bracket=bracket, rung=rung, budget=budget)
+                if trial['trial_id'] not in self.results:
+                    trials[trial['trial_id']] = trial
+        trials = list(trials.values())
+
+        for result in run_trials(trials, on_result=on_result, executor=executor):
+            self.results[result['trial_id']] = result
+        self.iterations_spent += sum(trial['budget'] for trial in trials)
+
+        return [self.score(config, budget) for config in configs]
+
+    def run(self, workers=None, on_result=None):
+        """
+        Run the tuner.
+
+        Args:
+            workers (int): Number of worker processes (default: CPU count)
+            on_result: Called with each trial result as it finishes
+
+        Returns:
+            dict: Best configuration, its score, and the budget spent
+        """
+        best_config = None
+        best_score = -np.inf
+        rungs = []
+        configs_sampled = 0
+
+        with create_executor(workers) as executor:
+            for bracket, (n, first_rung) in enumerate(self.brackets()):
+                configs = [self.sample_config() for _ in range(n)]
+                configs_sampled += n
+
+                for rung in range(first_rung, self.max_rung + 1):
+                    budget = self.budget_for(rung)
+                    scores = self.evaluate(configs, budget, bracket, rung, executor, on_result)
+                    rungs.append({'bracket': bracket, 'rung': rung, 'budget': budget,
+                                  'configs': len(configs), 'best_score': max(scores)})
+                    logging.info(f"Bracket {bracket} rung {rung}: {len(configs)} configs at "
+                                 f"{self.budget_param}={budget}, best {self.metric} {max(scores):.4f}")
+
+                    # Only full-budget scores compete for the overall best
+                    if budget == self.max_budget:
+                        top = int(np.argmax(scores))
+                        if scores[top] > best_score:
+                            best_score = scores[top]
+                            best_config = dict(configs[top], **{self.budget_param: budget})
+                        break
+
+                    # Promote the best 1/eta to the next rung
+                    keep = max(1, len(configs) // self.eta)
+                    order = np.argsort(scores)[::-1][:keep]
+                    configs = [configs[i] for i in order]
+
+        # Cost of the trials this run executed (reused results are free) compared
+        # with running every sampled configuration at the full budget
+        spent = self.iterations_spent
+        exhaustive = configs_sampled * len(self.seeds) * self.max_budget
+        return {
+            'algorithm': self.algorithm,
+            'method': self.method,
+            'metric': self.metric,
+            'best_params': best_config,
+            'best_score': best_score,
+            'rungs': rungs,
+            'configs_sampled': configs_sampled,
+            'iterations_spent': spent,
+            'iterations_exhaustive': exhaustive
+        }
+
+    def load_results(self, output_path):
+        """
+        Reuse trial results from an earlier run of the same tuning job.
+
+        Args:
+            output_path (str): JSONL file the earlier run wrote
+
+        Returns:
+            int: Number of results loaded
+        """
+        if not os.path.exists(output_path):
+            return 0
+        with open(output_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'error' not in record and 'budget' in record:
+                    self.results[record['trial_id']] = record
+        return len(self.results)
+
+
+def run_tuner(config, output_path=None, workers=None):
+    """
+    Run a tuning job from a configuration and log the best parameters.
+
+    Args:
+        config (dict): Tuner configuration
+        output_path (str): JSONL file for every trial result (default: config
+            'output' or tune_results.jsonl); results already in it are reused
+        workers (int): Number of worker processes (default: config 'workers' or CPU count)
+
+    Returns:
+        dict: Summary from SuccessiveHalvingTuner.run()
+    """
+    output_path = output_path or config.get('output', 'tune_results.jsonl')
+    workers = workers or config.get('workers')
+
+    tuner = SuccessiveHalvingTuner(
+        config['algorithm'],
+        config.get('params', {}),
+        min_budget=config.get('min_budget', 10),
+        max_budget=config.get('max_budget', 100),
+        eta=config.get('eta', 3),
+        method=config.get('method', 'hyperband'),
+        n_configs=config.get('n_configs'),
+        seeds=config.get('seeds', 1),
+        metric=config.get('metric', 'best_fitness'),
+        fixed_params=config.get('fixed_params'),
+        random_state=config.get('random_state', 0)
+    )
+    loaded = tuner.load_results(output_path)
+    if loaded:
+        logging.info(f"Reusing {loaded} trial results from {output_path}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'a') as output:
+        def write_result(result):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+
+        summary = tuner.run(workers, on_result=write_result)
+
+    logging.info(f"Best {summary['algorithm']} parameters ({summary['metric']} "
+                 f"{summary['best_score']:.4f}): {summary['best_params']}")
+    logging.info(f"Spent {summary['iterations_spent']} iterations; running all "
+                 f"{summary['configs_sampled']} configurations at the full budget would take "
+                 f"{summary['iterations_exhaustive']}")
+
+    summary_path = os.path.splitext(output_path)[0] + '_summary.json'
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
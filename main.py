@@ -8,16 +8,29 @@ import socketserver
 import http.server
 import time
 import json
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, unquote
 import mimetypes
+import queue
+import numpy as np
 
-from models.neural_network import NeuralNetwork
+from models.model_store import ModelStore
 from optimizers.genetic_algorithm import GeneticAlgorithm
 from optimizers.particle_swarm import ParticleSwarmOptimization
 from optimizers.ant_colony import AntColonyOptimization
 from optimizers.tabu_search import TabuSearch
-from utils.data_handler import DataHandler
+from optimizers.cma_es import CMAES
+from optimizers.differential_evolution import DifferentialEvolution
+from optimizers.gradient_refinement import GradientRefiner
+from optimizers.budget import RunBudget
+from utils.context_registry import contexts
+from utils.cancellation import jobs, connection_closed
 from utils.visualization import Visualizer
+from utils.static_cache import StaticFileCache
+from utils.metrics import metrics
+from utils.profiling import RunProfiler
+from utils.history import downsample
+from utils import result_encoding
+from async_server import start_async_server
 
 # Set up logging
 logging.basicConfig(
@@ -38,18 +51,55 @@ def parse_arguments():
                         help='Port for the web server (default: 8000)')
     parser.add_argument('--no-browser', action='store_true',
                         help='Do not open browser automatically')
+    parser.add_argument('--static-max-age', type=int, default=0,
+                        help='Cache-Control max-age in seconds for CSS/JS/images (default: 0, always revalidate)')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Number of threads handling connections (default: 16)')
+    parser.add_argument('--max-runs', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Maximum number of concurrent optimizer runs (default: half the CPU count)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Serve with the asyncio event loop instead of a thread pool')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Collect metrics and expose them at /api/metrics')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile every optimizer run, as if each request set "profile": true')
+    parser.add_argument('--context-cache-mb', type=int, default=256,
+                        help='Memory cap in MB for cached datasets; least recently used are evicted (default: 256)')
     
     return parser.parse_args()
 
 class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
-    # Class variables to store data and neural network
-    data_loaded = False
-    data_handler = None
-    nn = None
-    X_train = None
-    X_test = None
-    y_train = None
-    y_test = None
+    # Persistent connections; every response must carry a Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    # Close idle keep-alive connections after this many seconds so they do not hold a worker
+    timeout = 15
+    
+    # Admission limit for CPU-heavy /api/run/* requests
+    run_slots = threading.BoundedSemaphore(1)
+    retry_after = 5
+    
+    # Datasets and network architectures, loaded once and shared across requests
+    contexts = contexts
+    
+    # In-memory cache for the files under ui/
+    static_cache = None
+    
+    # Profiler for runs that ask for it, and whether every run is profiled
+    profiler = RunProfiler(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+    profile_all = False
+    
+    # In-flight runs by job ID, and the current request's cancellation token
+    jobs = jobs
+    cancel_token = None
+    
+    # Trained models saved by every run and served by /api/predict
+    model_store = ModelStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models'))
+    
+    # Routes reported individually in request metrics; anything else is grouped
+    API_ROUTES = ('/api/status', '/api/results', '/api/metrics', '/api/models', '/api/predict', '/api/jobs',
+                  '/api/run/ga', '/api/run/pso', '/api/run/aco', '/api/run/tabu', '/api/run/cmaes',
+                  '/api/run/de', '/api/run/all')
     
     def __init__(self, *args, **kwargs):
         # Set the directory to serve files from
@@ -63,15 +113,32 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
                       self.log_date_time_string(),
                       format % args))
     
+    def send_response(self, code, message=None):
+        # Record request latency and status once the response starts
+        if metrics.enabled and hasattr(self, 'request_start'):
+            path = urlparse(self.path).path
+            if path in self.API_ROUTES:
+                route = path
+            else:
+                route = 'api_other' if path.startswith('/api/') else 'static'
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - self.request_start,
+                            method=self.command, route=route)
+            metrics.inc('http_requests_total', method=self.command, route=route, status=code)
+            del self.request_start
+        super().send_response(code, message)
+    
     def do_OPTIONS(self):
         # Handle CORS preflight requests
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
+        self.request_start = time.perf_counter()
+        
         # Parse URL
         parsed_url = urlparse(self.path)
         path = parsed_url.path
@@ -81,23 +148,58 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_api_request(path)
             return
         
-        # Serve static files
+        self.serve_static(path)
+    
+    def do_HEAD(self):
+        self.request_start = time.perf_counter()
+        
+        # Headers only; the API has no HEAD endpoints
+        path = urlparse(self.path).path
+        if path.startswith('/api/'):
+            self.send_error(405, "Method Not Allowed")
+            return
+        self.serve_static(path, head=True)
+    
+    def do_DELETE(self):
+        self.request_start = time.perf_counter()
+        
+        # DELETE /api/jobs/<id> cancels an in-flight optimizer run
+        path = urlparse(self.path).path
+        if not path.startswith('/api/jobs/'):
+            self.send_error(404, "API endpoint not found")
+            return
+        job_id = unquote(path[len('/api/jobs/'):])
+        if self.__class__.jobs.cancel(job_id):
+            self.send_json_response({'job_id': job_id, 'status': 'cancelling'}, status=202)
+        else:
+            self.send_json_response({'error': 'Job not found'}, status=404)
+    
+    def client_disconnected(self):
+        """Check without blocking whether the client has closed the connection"""
+        return connection_closed(self.connection)
+    
+    def serve_static(self, path, head=False):
+        """Serve a file under ui/ from the in-memory static cache"""
+        # Map the URL to a path relative to ui/
+        path = unquote(path)
         if path == '/':
-            # Redirect to index.html
-            self.path = '/ui/index.html'
-        elif not path.startswith('/ui/'):
-            # Prepend /ui/ to all non-API paths
-            self.path = f'/ui{path}'
+            path = '/index.html'
+        elif path.startswith('/ui/'):
+            path = path[3:]
         
         try:
-            # Use the parent class method to serve static files
-            super().do_GET()
+            if self.__class__.static_cache is None:
+                self.__class__.static_cache = StaticFileCache(os.path.join(self.directory, 'ui'))
+            if not self.__class__.static_cache.serve(self, path, head=head):
+                self.send_error(404, "File not found")
         except Exception as e:
             logging.error(f"Error serving static file: {str(e)}")
             logging.error(traceback.format_exc())
             self.send_error(500, f"Server Error: {str(e)}")
     
     def do_POST(self):
+        self.request_start = time.perf_counter()
+        
         # Parse URL
         parsed_url = urlparse(self.path)
         path = parsed_url.path
@@ -105,7 +207,7 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
         # Only handle API endpoints
         if path.startswith('/api/'):
             # Get request body
-            content_length = int(self.headers['Content-Length'])
+            content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length).decode('utf-8')
             
             try:
@@ -127,41 +229,222 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             self.send_json_response({'status': 'ok', 'message': 'Server is running'})
         elif path == '/api/results':
             self.serve_results()
+        elif path == '/api/metrics':
+            self.serve_metrics()
+        elif path.startswith('/api/profiles/'):
+            self.serve_profile(unquote(path[len('/api/profiles/'):]))
+        elif path == '/api/jobs':
+            self.send_json_response({'jobs': self.__class__.jobs.describe()})
+        elif path == '/api/models':
+            self.send_json_response({'models': self.__class__.model_store.list_ids()})
+        elif path.startswith('/api/models/'):
+            model = self.__class__.model_store.get(unquote(path[len('/api/models/'):]))
+            if model is None:
+                self.send_json_response({'error': 'Model not found'}, status=404)
+            else:
+                self.send_json_response(model.describe())
         else:
             self.send_error(404, "API endpoint not found")
     
     def handle_api_post(self, path, data):
         """Handle API POST requests"""
-        # Initialize data and neural network if not already done
-        if not self.__class__.data_loaded:
-            self.initialize_data_and_nn()
+        # Inference is cheap and does not take an optimizer run slot
+        if path == '/api/predict':
+            self.handle_predict(data)
+            return
+        
+        if not path.startswith('/api/run/'):
+            self.send_error(404, "API endpoint not found")
+            return
+        
+        # Optimizer runs are CPU-bound; refuse new ones instead of oversubscribing the machine
+        if not self.__class__.run_slots.acquire(blocking=False):
+            logging.warning(f"Rejecting {path}: all optimizer run slots are busy")
+            self.send_json_response(
+                {'error': 'Server is busy running other optimizations, please retry later'},
+                status=503,
+                headers={'Retry-After': str(self.__class__.retry_after)}
+            )
+            return
+        
+        try:
+            self.handle_run_request(path, data)
+        finally:
+            self.__class__.run_slots.release()
+    
+    def handle_run_request(self, path, data):
+        """Handle /api/run/* requests"""
+        # Dataset and architecture for this request, loaded on first use
+        try:
+            context = self.get_context(data)
+            # Reject bad refinement options before spending a whole run on the search
+            self.make_refiner(data, context)
+        except (TypeError, ValueError) as e:
+            self.send_json_response({'error': str(e)}, status=400)
+            return
         
         # Handle algorithm endpoints
-        if path == '/api/run/ga':
-            result = self.run_genetic_algorithm(data)
-            self.send_json_response(result)
-        elif path == '/api/run/pso':
-            result = self.run_particle_swarm(data)
-            self.send_json_response(result)
-        elif path == '/api/run/aco':
-            result = self.run_ant_colony(data)
-            self.send_json_response(result)
-        elif path == '/api/run/tabu':
-            result = self.run_tabu_search(data)
-            self.send_json_response(result)
-        elif path == '/api/run/all':
-            result = self.run_all_algorithms(data)
-            self.send_json_response(result)
-        else:
+        runners = {
+            '/api/run/ga': self.run_genetic_algorithm,
+            '/api/run/pso': self.run_particle_swarm,
+            '/api/run/aco': self.run_ant_colony,
+            '/api/run/tabu': self.run_tabu_search,
+            '/api/run/cmaes': self.run_cmaes,
+            '/api/run/de': self.run_differential_evolution,
+            '/api/run/all': self.run_all_algorithms
+        }
+        runner = runners.get(path)
+        if runner is None:
             self.send_error(404, "API endpoint not found")
+            return
+        
+        algorithm = path.rsplit('/', 1)[-1]
+        
+        # Register the run so DELETE /api/jobs/<id> or a client disconnect can cancel it
+        try:
+            self.cancel_token = self.__class__.jobs.start(algorithm, data.get('job_id'),
+                                                          disconnected=self.client_disconnected)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, status=400)
+            return
+        except KeyError as e:
+            self.send_json_response({'error': e.args[0]}, status=409)
+            return
+        
+        metrics.inc('optimizer_runs_in_flight')
+        start_time = time.perf_counter()
+        try:
+            # Optionally run under the profiler and attach its report
+            if data.get('profile', self.__class__.profile_all):
+                result, report = self.__class__.profiler.run(algorithm, runner, data, context)
+                if 'pstats_file' in report:
+                    report['download_url'] = f"/api/profiles/{report['pstats_file']}"
+                result['profile'] = report
+            else:
+                result = runner(data, context)
+        finally:
+            metrics.dec('optimizer_runs_in_flight')
+            self.__class__.jobs.finish(self.cancel_token)
+        result['job_id'] = self.cancel_token.job_id
+        if 'error' in result:
+            status = 'error'
+        else:
+            status = 'cancelled' if result.get('cancelled') else 'ok'
+        metrics.observe('optimizer_run_duration_seconds', time.perf_counter() - start_time, algorithm=algorithm)
+        metrics.inc('optimizer_runs_total', algorithm=algorithm, status=status)
+        
+        # Nobody is left to read the result of a run abandoned by its client
+        if self.cancel_token.reason == 'client_disconnected':
+            logging.info(f"Client disconnected; dropped the result of job {self.cancel_token.job_id}")
+            self.close_connection = True
+            return
+        
+        self.send_result(result, status=result.pop('http_status', 200))
     
-    def send_json_response(self, data):
+    def handle_predict(self, data):
+        """Handle /api/predict: classify raw feature rows with a saved model
+        
+        The request has 'inputs' (a list of feature rows, unscaled) and optionally
+        'model_id' (default: the most recently saved model). Rows from concurrent
+        requests are micro-batched into one forward pass.
+        """
+        store = self.__class__.model_store
+        model_id = data.get('model_id')
+        if model_id is None:
+            model_id = store.latest()
+        model = store.get(str(model_id)) if model_id is not None else None
+        if model is None:
+            self.send_json_response({'error': 'Model not found'}, status=404)
+            return
+        
+        # Validate the input rows against the model's input layer
+        try:
+            X = np.atleast_2d(np.asarray(data.get('inputs'), dtype=float))
+        except (TypeError, ValueError):
+            X = None
+        if X is None or X.ndim != 2 or X.shape[1] != model.neural_network.input_size or not np.all(np.isfinite(X)):
+            self.send_json_response(
+                {'error': f"'inputs' must be a list of rows with {model.neural_network.input_size} numbers each"},
+                status=400
+            )
+            return
+        
+        probabilities = model.batcher.submit(X).result()
+        self.send_result({
+            'model_id': model.model_id,
+            'predictions': np.argmax(probabilities, axis=1).tolist(),
+            'probabilities': probabilities.tolist()
+        })
+    
+    def save_model(self, algorithm, weights, accuracy, data, context):
+        """Persist a run's best weights with the architecture and scaler; returns the model ID"""
+        try:
+            return self.__class__.model_store.save(
+                weights,
+                context.nn,
+                context.data_handler.scaler,
+                metadata={'algorithm': algorithm, 'dataset': context.dataset,
+                          'test_accuracy': float(accuracy), 'parameters': data},
+                prefix=algorithm
+            )
+        except Exception as e:
+            logging.error(f"Error saving {algorithm} model: {str(e)}")
+            logging.error(traceback.format_exc())
+            return None
+    
+    def send_result(self, data, status=200):
+        """Send a result as JSON or, if the Accept header asks for it, a binary encoding"""
+        media_type = result_encoding.negotiate(self.headers.get('Accept'))
+        body = result_encoding.encode(data, media_type)
+        self.send_response(status)
+        self.send_header('Content-type', media_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_json_response(self, data, status=200, headers=None):
         """Send a JSON response"""
-        self.send_response(200)
+        body = json.dumps(data).encode()
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+    
+    def serve_metrics(self):
+        """Serve collected metrics in the Prometheus text exposition format"""
+        if metrics.enabled:
+            body = metrics.render().encode()
+        else:
+            body = b'# Metrics collection is disabled; start the server with --metrics\n'
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def serve_profile(self, filename):
+        """Serve a stored pstats file for download"""
+        profile_path = self.__class__.profiler.path_for(filename)
+        if profile_path is None:
+            self.send_error(404, "Profile not found")
+            return
+        
+        with open(profile_path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/octet-stream')
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
     
     def serve_results(self):
         """Serve the results.json file"""
@@ -173,7 +456,7 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             if os.path.exists(results_path):
                 with open(results_path, 'r') as f:
                     results = json.load(f)
-                self.send_json_response(results)
+                self.send_result(results)
             else:
                 # Create empty results file if it doesn't exist
                 results = {
@@ -195,33 +478,117 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
                 with open(results_path, 'w') as f:
                     json.dump(results, f, indent=2)
                 
-                self.send_json_response(results)
+                self.send_result(results)
         except Exception as e:
             logging.error(f"Error serving results: {str(e)}")
             logging.error(traceback.format_exc())
             self.send_error(500, f"Server Error: {str(e)}")
     
-    def initialize_data_and_nn(self):
-        """Initialize data and neural network"""
-        try:
-            logging.info("Loading and preprocessing data...")
-            self.__class__.data_handler = DataHandler()
-            self.__class__.X_train, self.__class__.X_test, self.__class__.y_train, self.__class__.y_test = self.__class__.data_handler.load_iris_data()
-            
-            # Initialize neural network
-            input_size = self.__class__.X_train.shape[1]
-            hidden_size = 8  # Default value, can be made configurable
-            output_size = 3  # Iris has 3 classes
-            self.__class__.nn = NeuralNetwork(input_size, hidden_size, output_size)
-            
-            self.__class__.data_loaded = True
-            logging.info(f"Neural network created with architecture: {input_size}-{hidden_size}-{output_size}")
-        except Exception as e:
-            logging.error(f"Error initializing data and neural network: {str(e)}")
-            logging.error(traceback.format_exc())
-            raise
+    def get_context(self, data):
+        """Get the dataset and network context a request asks for
+        
+        'dataset' names the dataset (default 'iris') and 'hidden_size' the number
+        of hidden neurons (default 8). Contexts are loaded once and shared.
+        """
+        return self.__class__.contexts.get(
+            str(data.get('dataset', 'iris')),
+            int(data.get('hidden_size', 8))
+        )
+    
+    def mark_cancelled(self, result):
+        """Flag a result as the partial outcome of a cancelled run"""
+        result['cancelled'] = True
+        result['cancel_reason'] = self.cancel_token.reason
+        logging.info(f"Run cancelled ({self.cancel_token.reason}) after "
+                     f"{result['iterations_completed']} iterations")
+    
+    def iteration_limit(self, data, name, default=100):
+        """Get a run's iteration limit from its parameters
+        
+        A run with a 'max_seconds' or 'max_evaluations' budget and no explicit
+        limit runs until the budget is spent.
+        """
+        if name in data:
+            return int(data[name])
+        if data.get('max_seconds') or data.get('max_evaluations'):
+            return RunBudget.UNLIMITED_ITERATIONS
+        return default
+    
+    def budget_options(self, data):
+        """Get the optional wall-clock and fitness-evaluation budgets of a run"""
+        return {
+            'max_seconds': float(data['max_seconds']) if data.get('max_seconds') else None,
+            'max_evaluations': int(data['max_evaluations']) if data.get('max_evaluations') else None
+        }
+    
+    def compact_history(self, values, data):
+        """Downsample a history for responses and results.json
+        
+        'history_points' caps the number of points (default 1000, 0 keeps all) and
+        'downsample' picks the method: 'lttb' (default, keeps the curve's shape) or
+        'stride' (every Nth point). Returns the kept values and their iteration
+        numbers (None when nothing was dropped).
+        """
+        indices, kept = downsample(
+            values,
+            int(data.get('history_points', 1000)),
+            method=str(data.get('downsample', 'lttb'))
+        )
+        return kept.tolist(), None if indices is None else indices.tolist()
+    
+    def make_refiner(self, data, context):
+        """Build the gradient refiner a request asks for, or None without 'refine'
+        
+        The 'refine' option is either true (use defaults) or an object with any of
+        method ('lbfgs' or 'sgd'), top_k, steps, learning_rate, batch_size and momentum.
+        A top_k above the optimizer's population refines the whole population.
+        Raises ValueError for invalid options.
+        """
+        options = data.get('refine')
+        if not options:
+            return None
+        if not isinstance(options, dict):
+            options = {}
+        
+        return GradientRefiner(
+            context.nn, 
+            context.X_train, 
+            context.y_train, 
+            context.X_test, 
+            context.y_test,
+            method=str(options.get('method', 'lbfgs')),
+            top_k=int(options.get('top_k', 5)),
+            steps=int(options.get('steps', 100)),
+            learning_rate=float(options.get('learning_rate', 0.1)),
+            batch_size=int(options.get('batch_size', 32)),
+            momentum=float(options.get('momentum', 0.9))
+        )
+    
+    def refine_solution(self, optimizer, data, algorithm, context):
+        """Polish the optimizer's top solutions with gradient-based refinement if requested
+        
+        Returns None when refinement was not requested.
+        """
+        refiner = self.make_refiner(data, context)
+        if refiner is None:
+            return None
+        
+        logging.info(f"Refining top {refiner.top_k} solutions with {refiner.method} for {refiner.steps} steps")
+        start_time = time.time()
+        candidates = optimizer.get_top_solutions(refiner.top_k)
+        with metrics.timer('optimizer_phase_seconds', algorithm=algorithm, phase='refinement'):
+            best_weights, best_accuracy, history = refiner.refine(candidates)
+        
+        return best_weights, best_accuracy, {
+            'method': refiner.method,
+            'top_k': len(candidates),
+            'steps': refiner.steps,
+            'fitness_history': self.compact_history(history['best_fitness_history'], data)[0],
+            'final_accuracy': float(best_accuracy),
+            'execution_time': float(time.time() - start_time)
+        }
     
-    def run_genetic_algorithm(self, data):
+    def run_genetic_algorithm(self, data, context):
         """Run the Genetic Algorithm with the specified parameters"""
         try:
             logging.info("\nRunning Genetic Algorithm...")
@@ -229,52 +596,89 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             
             # Extract parameters from request data
             population_size = int(data.get('population_size', 50))
-            generations = int(data.get('generations', 100))
+            generations = self.iteration_limit(data, 'generations')
             mutation_rate = float(data.get('mutation_rate', 0.1))
+            crossover = str(data.get('crossover', 'point'))
             
-            logging.info(f"GA Parameters: population_size={population_size}, generations={generations}, mutation_rate={mutation_rate}")
+            logging.info(f"GA Parameters: population_size={population_size}, generations={generations}, mutation_rate={mutation_rate}, crossover={crossover}")
             
             ga = GeneticAlgorithm(
-                self.__class__.nn, 
-                self.__class__.X_train, 
-                self.__class__.y_train, 
-                self.__class__.X_test, 
-                self.__class__.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 population_size=population_size,
                 generations=generations,
-                mutation_rate=mutation_rate
+                mutation_rate=mutation_rate,
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                crossover=crossover,
+                **self.budget_options(data)
             )
             
             best_weights, best_accuracy, history = ga.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if ga.stop_reason == 'cancelled' else self.refine_solution(ga, data, 'ga', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
             execution_time = time.time() - start_time
             
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
             result = {
                 'best_accuracy': float(best_accuracy),
-                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
-                'execution_time': float(execution_time)
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(ga.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1
             }
+            if ga.stop_reason is not None:
+                result['stop_reason'] = ga.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('ga', best_weights, best_accuracy, data, context)
             
             logging.info(f"GA Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
             
+            # A cancelled run returns its partial result without redrawing the plot
+            if ga.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
             # Save visualization
             visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
             save_path = os.path.join(self.directory, 'ui', 'assets', 'ga_accuracy.png')
             
             # Call the visualization function with the correct parameters
-            visualizer.plot_individual_accuracy(
-                history=history,
-                title="Genetic Algorithm",
-                color="blue",
-                save_path=save_path
-            )
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="Genetic Algorithm",
+                    color="blue",
+                    save_path=save_path
+                )
             
             return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid Genetic Algorithm parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
         except Exception as e:
             logging.error(f"Error running Genetic Algorithm: {str(e)}")
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_particle_swarm(self, data):
+    def run_particle_swarm(self, data, context):
         """Run the Particle Swarm Optimization with the specified parameters"""
         try:
             logging.info("\nRunning Particle Swarm Optimization...")
@@ -282,56 +686,99 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             
             # Extract parameters from request data
             swarm_size = int(data.get('swarm_size', 30))
-            iterations = int(data.get('iterations', 100))
+            iterations = self.iteration_limit(data, 'iterations')
             inertia = float(data.get('inertia', 0.7))
             cognitive_coef = float(data.get('cognitive_coef', 1.5))
             social_coef = float(data.get('social_coef', 1.5))
+            topology = str(data.get('topology', 'global'))
+            neighbors = int(data.get('neighbors', 3))
+            inertia_schedule = str(data.get('inertia_schedule', 'constant'))
+            final_inertia = float(data.get('final_inertia', 0.4))
             
-            logging.info(f"PSO Parameters: swarm_size={swarm_size}, iterations={iterations}, inertia={inertia}, cognitive_coef={cognitive_coef}, social_coef={social_coef}")
+            logging.info(f"PSO Parameters: swarm_size={swarm_size}, iterations={iterations}, inertia={inertia}, cognitive_coef={cognitive_coef}, social_coef={social_coef}, topology={topology}, inertia_schedule={inertia_schedule}")
             
             pso = ParticleSwarmOptimization(
-                self.__class__.nn, 
-                self.__class__.X_train, 
-                self.__class__.y_train, 
-                self.__class__.X_test, 
-                self.__class__.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 swarm_size=swarm_size,
                 iterations=iterations,
                 inertia=inertia,
                 cognitive_coef=cognitive_coef,
-                social_coef=social_coef
+                social_coef=social_coef,
+                topology=topology,
+                neighbors=neighbors,
+                inertia_schedule=inertia_schedule,
+                final_inertia=final_inertia,
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                **self.budget_options(data)
             )
             
             best_weights, best_accuracy, history = pso.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if pso.stop_reason == 'cancelled' else self.refine_solution(pso, data, 'pso', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
             execution_time = time.time() - start_time
             
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
             result = {
                 'best_accuracy': float(best_accuracy),
-                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
-                'execution_time': float(execution_time)
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(pso.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1
             }
+            if pso.stop_reason is not None:
+                result['stop_reason'] = pso.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('pso', best_weights, best_accuracy, data, context)
             
             logging.info(f"PSO Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
             
+            # A cancelled run returns its partial result without redrawing the plot
+            if pso.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
             # Save visualization
             visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
             save_path = os.path.join(self.directory, 'ui', 'assets', 'pso_accuracy.png')
             
             # Call the visualization function with the correct parameters
-            visualizer.plot_individual_accuracy(
-                history=history,
-                title="Particle Swarm Optimization",
-                color="red",
-                save_path=save_path
-            )
+            with metrics.timer('optimizer_phase_seconds', algorithm='pso', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="Particle Swarm Optimization",
+                    color="red",
+                    save_path=save_path
+                )
             
             return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid Particle Swarm Optimization parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
         except Exception as e:
             logging.error(f"Error running Particle Swarm Optimization: {str(e)}")
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_ant_colony(self, data):
+    def run_ant_colony(self, data, context):
         """Run the Ant Colony Optimization with the specified parameters"""
         try:
             logging.info("\nRunning Ant Colony Optimization...")
@@ -339,127 +786,434 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             
             # Extract parameters from request data
             ant_count = int(data.get('ant_count', 20))
-            iterations = int(data.get('iterations', 100))
+            iterations = self.iteration_limit(data, 'iterations')
             pheromone_importance = float(data.get('pheromone_importance', 1.0))
             heuristic_importance = float(data.get('heuristic_importance', 2.0))
             evaporation_rate = float(data.get('evaporation_rate', 0.5))
+            mode = str(data.get('mode', 'grid'))
+            archive_size = int(data.get('archive_size', 10))
+            pheromone_update = str(data.get('pheromone_update', 'rank'))
+            elite_count = int(data.get('elite_count', 5))
+            memo_size = int(data.get('memo_size', 10000))
             
-            logging.info(f"ACO Parameters: ant_count={ant_count}, iterations={iterations}, pheromone_importance={pheromone_importance}, heuristic_importance={heuristic_importance}, evaporation_rate={evaporation_rate}")
+            logging.info(f"ACO Parameters: ant_count={ant_count}, iterations={iterations}, pheromone_importance={pheromone_importance}, heuristic_importance={heuristic_importance}, evaporation_rate={evaporation_rate}, mode={mode}, pheromone_update={pheromone_update}")
             
             aco = AntColonyOptimization(
-                self.__class__.nn, 
-                self.__class__.X_train, 
-                self.__class__.y_train, 
-                self.__class__.X_test, 
-                self.__class__.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 ant_count=ant_count,
                 iterations=iterations,
                 pheromone_importance=pheromone_importance,
                 heuristic_importance=heuristic_importance,
-                evaporation_rate=evaporation_rate
+                evaporation_rate=evaporation_rate,
+                mode=mode,
+                archive_size=archive_size,
+                pheromone_update=pheromone_update,
+                elite_count=elite_count,
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                memo_size=memo_size,
+                **self.budget_options(data)
             )
             
             best_weights, best_accuracy, history = aco.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if aco.stop_reason == 'cancelled' else self.refine_solution(aco, data, 'aco', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
             execution_time = time.time() - start_time
             
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
             result = {
                 'best_accuracy': float(best_accuracy),
-                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
-                'execution_time': float(execution_time)
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(aco.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1
             }
+            if 'memo_hit_rate_history' in history:
+                result['memo_hit_rate'] = float(aco.memo_hit_rate())
+                memo_history, memo_iterations = self.compact_history(history['memo_hit_rate_history'], data)
+                result['memo_hit_rate_history'] = memo_history
+                if memo_iterations is not None:
+                    result['memo_hit_rate_iterations'] = memo_iterations
+            if aco.stop_reason is not None:
+                result['stop_reason'] = aco.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('aco', best_weights, best_accuracy, data, context)
             
             logging.info(f"ACO Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
             
+            # A cancelled run returns its partial result without redrawing the plot
+            if aco.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
             # Save visualization
             visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
             save_path = os.path.join(self.directory, 'ui', 'assets', 'aco_accuracy.png')
             
             # Call the visualization function with the correct parameters
-            visualizer.plot_individual_accuracy(
-                history=history,
-                title="Ant Colony Optimization",
-                color="green",
-                save_path=save_path
-            )
+            with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="Ant Colony Optimization",
+                    color="green",
+                    save_path=save_path
+                )
             
             return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid Ant Colony Optimization parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
         except Exception as e:
             logging.error(f"Error running Ant Colony Optimization: {str(e)}")
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_tabu_search(self, data):
+    def run_tabu_search(self, data, context):
         """Run the Tabu Search with the specified parameters"""
         try:
             logging.info("\nRunning Tabu Search...")
             start_time = time.time()
             
             # Extract parameters from request data
-            iterations = int(data.get('iterations', 100))
+            iterations = self.iteration_limit(data, 'iterations')
             tabu_list_size = int(data.get('tabu_list_size', 10))
             neighborhood_size = int(data.get('neighborhood_size', 20))
             step_size = float(data.get('step_size', 0.1))
+            solution_tabu = bool(data.get('solution_tabu', False))
+            move_size = int(data['move_size']) if data.get('move_size') else None
             
-            logging.info(f"Tabu Search Parameters: iterations={iterations}, tabu_list_size={tabu_list_size}, neighborhood_size={neighborhood_size}, step_size={step_size}")
+            logging.info(f"Tabu Search Parameters: iterations={iterations}, tabu_list_size={tabu_list_size}, neighborhood_size={neighborhood_size}, step_size={step_size}, solution_tabu={solution_tabu}, move_size={move_size}")
             
             tabu = TabuSearch(
-                self.__class__.nn, 
-                self.__class__.X_train, 
-                self.__class__.y_train, 
-                self.__class__.X_test, 
-                self.__class__.y_test,
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
                 iterations=iterations,
                 tabu_list_size=tabu_list_size,
                 neighborhood_size=neighborhood_size,
-                step_size=step_size
+                step_size=step_size,
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                solution_tabu=solution_tabu,
+                move_size=move_size,
+                **self.budget_options(data)
             )
             
             best_weights, best_accuracy, history = tabu.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if tabu.stop_reason == 'cancelled' else self.refine_solution(tabu, data, 'tabu', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
             execution_time = time.time() - start_time
             
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
             result = {
                 'best_accuracy': float(best_accuracy),
-                'accuracy_history': [float(x) for x in history['best_accuracy_history']],
-                'execution_time': float(execution_time)
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(tabu.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1
             }
+            if solution_tabu:
+                result['solution_rejections'] = int(tabu.solution_rejections)
+            if tabu.stop_reason is not None:
+                result['stop_reason'] = tabu.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('tabu', best_weights, best_accuracy, data, context)
             
             logging.info(f"Tabu Search Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
             
+            # A cancelled run returns its partial result without redrawing the plot
+            if tabu.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
             # Save visualization
             visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
             save_path = os.path.join(self.directory, 'ui', 'assets', 'tabu_accuracy.png')
             
             # Call the visualization function with the correct parameters
-            visualizer.plot_individual_accuracy(
-                history=history,
-                title="Tabu Search",
-                color="purple",
-                save_path=save_path
-            )
+            with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="Tabu Search",
+                    color="purple",
+                    save_path=save_path
+                )
             
             return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid Tabu Search parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
         except Exception as e:
             logging.error(f"Error running Tabu Search: {str(e)}")
             logging.error(traceback.format_exc())
             return {'error': str(e)}
     
-    def run_all_algorithms(self, data):
+    def run_cmaes(self, data, context):
+        """Run CMA-ES with the specified parameters"""
+        try:
+            logging.info("\nRunning CMA-ES...")
+            start_time = time.time()
+            
+            # Extract parameters from request data
+            population_size = int(data['population_size']) if data.get('population_size') else None
+            iterations = self.iteration_limit(data, 'iterations')
+            sigma = float(data.get('sigma', 0.3))
+            covariance = str(data.get('covariance', 'auto'))
+            memory = int(data['memory']) if data.get('memory') else None
+            
+            logging.info(f"CMA-ES Parameters: population_size={population_size}, iterations={iterations}, sigma={sigma}, covariance={covariance}")
+            
+            cmaes = CMAES(
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
+                population_size=population_size,
+                iterations=iterations,
+                sigma=sigma,
+                covariance=covariance,
+                memory=memory,
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                **self.budget_options(data)
+            )
+            
+            best_weights, best_accuracy, history = cmaes.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if cmaes.stop_reason == 'cancelled' else self.refine_solution(cmaes, data, 'cmaes', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
+            execution_time = time.time() - start_time
+            
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
+            result = {
+                'best_accuracy': float(best_accuracy),
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(cmaes.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1,
+                'covariance': cmaes.covariance,
+                'population_size': cmaes.population_size,
+                'final_sigma': float(cmaes.sigma)
+            }
+            if cmaes.stop_reason is not None:
+                result['stop_reason'] = cmaes.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('cmaes', best_weights, best_accuracy, data, context)
+            
+            logging.info(f"CMA-ES Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
+            
+            # A cancelled run returns its partial result without redrawing the plot
+            if cmaes.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
+            # Save visualization
+            visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
+            save_path = os.path.join(self.directory, 'ui', 'assets', 'cmaes_accuracy.png')
+            
+            # Call the visualization function with the correct parameters
+            with metrics.timer('optimizer_phase_seconds', algorithm='cmaes', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="CMA-ES",
+                    color="orange",
+                    save_path=save_path
+                )
+            
+            return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid CMA-ES parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
+        except Exception as e:
+            logging.error(f"Error running CMA-ES: {str(e)}")
+            logging.error(traceback.format_exc())
+            return {'error': str(e)}
+    
+    def run_differential_evolution(self, data, context):
+        """Run Differential Evolution with the specified parameters"""
+        try:
+            logging.info("\nRunning Differential Evolution...")
+            start_time = time.time()
+            
+            # Extract parameters from request data
+            population_size = int(data.get('population_size', 50))
+            generations = self.iteration_limit(data, 'generations')
+            strategy = str(data.get('strategy', 'current_to_pbest'))
+            mutation_factor = float(data.get('mutation_factor', 0.5))
+            crossover_rate = float(data.get('crossover_rate', 0.9))
+            
+            logging.info(f"DE Parameters: population_size={population_size}, generations={generations}, strategy={strategy}, mutation_factor={mutation_factor}, crossover_rate={crossover_rate}")
+            
+            de = DifferentialEvolution(
+                context.nn, 
+                context.X_train, 
+                context.y_train, 
+                context.X_test, 
+                context.y_test,
+                population_size=population_size,
+                generations=generations,
+                strategy=strategy,
+                mutation_factor=mutation_factor,
+                crossover_rate=crossover_rate,
+                p_best=float(data.get('p_best', 0.05)),
+                accuracy_stride=int(data.get('accuracy_stride', 1)),
+                background_accuracy=bool(data.get('background_accuracy', False)),
+                cancel_token=self.cancel_token,
+                **self.budget_options(data)
+            )
+            
+            best_weights, best_accuracy, history = de.run()
+            search_accuracy = best_accuracy
+            
+            # Optional gradient-based polishing of the best solutions (skipped for cancelled runs)
+            refinement = None if de.stop_reason == 'cancelled' else self.refine_solution(de, data, 'de', context)
+            if refinement is not None:
+                best_weights, best_accuracy, refinement_info = refinement
+                refinement_info['search_accuracy'] = float(search_accuracy)
+            execution_time = time.time() - start_time
+            
+            accuracy_history, history_iterations = self.compact_history(history['best_accuracy_history'], data)
+            result = {
+                'best_accuracy': float(best_accuracy),
+                'accuracy_history': accuracy_history,
+                'execution_time': float(execution_time),
+                'evaluations': int(de.evaluations),
+                'iterations_completed': len(history['best_fitness_history']) - 1,
+                'strategy': de.strategy
+            }
+            if de.strategy == 'current_to_pbest':
+                result['final_mutation_factor'] = float(de.mean_mutation_factor)
+                result['final_crossover_rate'] = float(de.mean_crossover_rate)
+            if de.stop_reason is not None:
+                result['stop_reason'] = de.stop_reason
+            if history_iterations is not None:
+                result['history_iterations'] = history_iterations
+            if refinement is not None:
+                result['refinement'] = refinement_info
+            if data.get('include_weights'):
+                result['best_weights'] = [float(x) for x in best_weights]
+            
+            # Save the model so /api/predict can serve it
+            result['model_id'] = self.save_model('de', best_weights, best_accuracy, data, context)
+            
+            logging.info(f"DE Best Accuracy: {best_accuracy:.4f}, Time: {execution_time:.2f}s")
+            
+            # A cancelled run returns its partial result without redrawing the plot
+            if de.stop_reason == 'cancelled':
+                self.mark_cancelled(result)
+                return result
+            
+            # Save visualization
+            visualizer = Visualizer(output_dir=os.path.join(self.directory, 'ui', 'assets'))
+            save_path = os.path.join(self.directory, 'ui', 'assets', 'de_accuracy.png')
+            
+            # Call the visualization function with the correct parameters
+            with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='plotting'):
+                visualizer.plot_individual_accuracy(
+                    history=history,
+                    title="Differential Evolution",
+                    color="teal",
+                    save_path=save_path
+                )
+            
+            return result
+        except ValueError as e:
+            # Parameters the request parser or the optimizer rejected
+            logging.error(f"Invalid Differential Evolution parameters: {str(e)}")
+            return {'error': str(e), 'http_status': 400}
+        except Exception as e:
+            logging.error(f"Error running Differential Evolution: {str(e)}")
+            logging.error(traceback.format_exc())
+            return {'error': str(e)}
+    
+    def run_all_algorithms(self, data, context):
         """Run all optimization algorithms with the specified parameters"""
         try:
             logging.info("\nRunning all optimization algorithms...")
             
-            # Run each algorithm
-            ga_result = self.run_genetic_algorithm(data.get('ga', {}))
-            pso_result = self.run_particle_swarm(data.get('pso', {}))
-            aco_result = self.run_ant_colony(data.get('aco', {}))
-            tabu_result = self.run_tabu_search(data.get('tabu', {}))
+            # Top-level refine, history and budget options apply to every algorithm unless overridden
+            params = {}
+            for name in ('ga', 'pso', 'aco', 'tabu', 'cmaes', 'de'):
+                params[name] = dict(data.get(name, {}))
+                for option in ('refine', 'history_points', 'downsample', 'max_seconds', 'max_evaluations'):
+                    if option in data:
+                        params[name].setdefault(option, data[option])
+            
+            # An equal evaluation budget makes the comparison compute-fair: every algorithm
+            # runs until it has spent the same number of fitness evaluations, however many
+            # iterations that takes
+            evaluation_budget = int(data.get('evaluation_budget') or 0)
+            if evaluation_budget > 0:
+                iteration_params = {'ga': 'generations', 'pso': 'iterations', 'aco': 'iterations',
+                                    'tabu': 'iterations', 'cmaes': 'iterations', 'de': 'generations'}
+                for name, iteration_param in iteration_params.items():
+                    params[name]['max_evaluations'] = evaluation_budget
+                    params[name][iteration_param] = RunBudget.UNLIMITED_ITERATIONS
+            
+            # Run each algorithm; after a cancellation the remaining ones stop at their first iteration
+            ga_result = self.run_genetic_algorithm(params['ga'], context)
+            pso_result = self.run_particle_swarm(params['pso'], context)
+            aco_result = self.run_ant_colony(params['aco'], context)
+            tabu_result = self.run_tabu_search(params['tabu'], context)
+            cmaes_result = self.run_cmaes(params['cmaes'], context)
+            de_result = self.run_differential_evolution(params['de'], context)
             
             # Determine best algorithm
             algorithms = {
                 'ga': ga_result.get('best_accuracy', 0.0),
                 'pso': pso_result.get('best_accuracy', 0.0),
                 'aco': aco_result.get('best_accuracy', 0.0),
-                'tabu': tabu_result.get('best_accuracy', 0.0)
+                'tabu': tabu_result.get('best_accuracy', 0.0),
+                'cmaes': cmaes_result.get('best_accuracy', 0.0),
+                'de': de_result.get('best_accuracy', 0.0)
             }
             
             best_algorithm = max(algorithms, key=algorithms.get)
@@ -471,11 +1225,24 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
                     'ga': ga_result,
                     'pso': pso_result,
                     'aco': aco_result,
-                    'tabu': tabu_result
+                    'tabu': tabu_result,
+                    'cmaes': cmaes_result,
+                    'de': de_result
                 },
                 'best_algorithm': best_algorithm,
                 'best_accuracy': best_accuracy
             }
+            if evaluation_budget > 0:
+                results_data['evaluation_budget'] = evaluation_budget
+            
+            # One algorithm's invalid parameters do not make the whole comparison a bad request
+            for result in results_data['algorithms'].values():
+                result.pop('http_status', None)
+            
+            # A cancelled comparison is returned as is, keeping the last complete results.json
+            if any(result.get('cancelled') for result in results_data['algorithms'].values()):
+                results_data['cancelled'] = True
+                return results_data
             
             # Save to JSON file
             assets_dir = os.path.join(self.directory, 'ui', 'assets')
@@ -490,6 +1257,8 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             logging.info(f"PSO Best Accuracy: {pso_result.get('best_accuracy', 0.0)}")
             logging.info(f"ACO Best Accuracy: {aco_result.get('best_accuracy', 0.0)}")
             logging.info(f"Tabu Search Best Accuracy: {tabu_result.get('best_accuracy', 0.0)}")
+            logging.info(f"CMA-ES Best Accuracy: {cmaes_result.get('best_accuracy', 0.0)}")
+            logging.info(f"DE Best Accuracy: {de_result.get('best_accuracy', 0.0)}")
             logging.info(f"\n{best_algorithm.upper()} performed best with accuracy: {best_accuracy}")
             
             # Create comparison visualization
@@ -497,20 +1266,31 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             save_path = os.path.join(assets_dir, 'comparison.png')
             
             # Create dictionaries with the format expected by the visualizer
-            ga_history = {'best_accuracy_history': ga_result.get('accuracy_history', [])}
-            pso_history = {'best_accuracy_history': pso_result.get('accuracy_history', [])}
-            aco_history = {'best_accuracy_history': aco_result.get('accuracy_history', [])}
-            tabu_history = {'best_accuracy_history': tabu_result.get('accuracy_history', [])}
+            ga_history = {'best_accuracy_history': ga_result.get('accuracy_history', []),
+                          'iterations': ga_result.get('history_iterations')}
+            pso_history = {'best_accuracy_history': pso_result.get('accuracy_history', []),
+                           'iterations': pso_result.get('history_iterations')}
+            aco_history = {'best_accuracy_history': aco_result.get('accuracy_history', []),
+                           'iterations': aco_result.get('history_iterations')}
+            tabu_history = {'best_accuracy_history': tabu_result.get('accuracy_history', []),
+                            'iterations': tabu_result.get('history_iterations')}
+            cmaes_history = {'best_accuracy_history': cmaes_result.get('accuracy_history', []),
+                             'iterations': cmaes_result.get('history_iterations')}
+            de_history = {'best_accuracy_history': de_result.get('accuracy_history', []),
+                          'iterations': de_result.get('history_iterations')}
             
             try:
                 # Call the visualization function with the correct parameters
-                visualizer.plot_accuracy_history(
-                    ga_history=ga_history,
-                    pso_history=pso_history,
-                    aco_history=aco_history,
-                    tabu_history=tabu_history,
-                    save_path=save_path
-                )
+                with metrics.timer('optimizer_phase_seconds', algorithm='all', phase='plotting'):
+                    visualizer.plot_accuracy_history(
+                        ga_history=ga_history,
+                        pso_history=pso_history,
+                        aco_history=aco_history,
+                        tabu_history=tabu_history,
+                        cmaes_history=cmaes_history,
+                        de_history=de_history,
+                        save_path=save_path
+                    )
             except Exception as e:
                 logging.error(f"Error creating comparison visualization: {str(e)}")
                 logging.error(traceback.format_exc())
@@ -522,18 +1302,95 @@ class HybridAIOptimizationHandler(http.server.SimpleHTTPRequestHandler):
             return {'error': str(e)}
 
 
-def start_web_server(port=8000):
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """
+    TCP server that handles connections on a fixed pool of worker threads.
+    
+    Unlike ThreadingTCPServer it does not start a thread per connection. When
+    more than max_pending connections are waiting for or held by a worker, new
+    ones get an immediate 503 with Retry-After instead of queueing without bound.
+    """
+    
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, workers=16, max_pending=64):
+        super().__init__(server_address, handler_class)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        self.connections = queue.Queue()
+        
+        # Daemon workers so an idle keep-alive connection never blocks shutdown
+        for i in range(workers):
+            worker = threading.Thread(target=self.worker_loop, name=f'http-worker-{i}')
+            worker.daemon = True
+            worker.start()
+    
+    def process_request(self, request, client_address):
+        with self.pending_lock:
+            overloaded = self.pending >= self.max_pending
+            if not overloaded:
+                self.pending += 1
+            metrics.set('http_pending_connections', self.pending)
+        
+        if overloaded:
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\n"
+                                b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        
+        self.connections.put((request, client_address))
+    
+    def worker_loop(self):
+        while True:
+            request, client_address = self.connections.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.pending_lock:
+                    self.pending -= 1
+                    metrics.set('http_pending_connections', self.pending)
+
+
+def configure_handler(static_max_age=0, max_runs=1, enable_metrics=False, profile_all=False,
+                      context_cache_mb=256):
+    """Prepare the shared handler state used by both server modes."""
+    metrics.enabled = enable_metrics
+    HybridAIOptimizationHandler.profile_all = profile_all
+    HybridAIOptimizationHandler.contexts.max_bytes = context_cache_mb * 1024 * 1024
+    
+    # Register common MIME types
+    mimetypes.add_type('text/css', '.css')
+    mimetypes.add_type('application/javascript', '.js')
+    mimetypes.add_type('application/json', '.json')
+    
+    # Load and pre-compress the UI files once, before the first request
+    ui_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ui')
+    HybridAIOptimizationHandler.static_cache = StaticFileCache(ui_dir, max_age=static_max_age)
+    HybridAIOptimizationHandler.static_cache.preload()
+    
+    # Keep recently trained models ready for /api/predict
+    HybridAIOptimizationHandler.model_store.preload()
+    
+    # At most max_runs optimizer runs execute at once
+    HybridAIOptimizationHandler.run_slots = threading.BoundedSemaphore(max_runs)
+
+def start_web_server(port=8000, static_max_age=0, workers=16, max_runs=1, enable_metrics=False,
+                     profile_all=False, context_cache_mb=256):
     """Start a web server with API endpoints for the UI."""
     try:
-        # Register common MIME types
-        mimetypes.add_type('text/css', '.css')
-        mimetypes.add_type('application/javascript', '.js')
-        mimetypes.add_type('application/json', '.json')
+        configure_handler(static_max_age, max_runs, enable_metrics, profile_all, context_cache_mb)
         
         # Create server
         server_address = ('', port)
-        httpd = socketserver.ThreadingTCPServer(server_address, HybridAIOptimizationHandler)
-        httpd.daemon_threads = True
+        httpd = ThreadPoolHTTPServer(server_address, HybridAIOptimizationHandler,
+                                     workers=workers, max_pending=workers * 4)
         
         print(f"\nServer started at http://localhost:{port}")
         print("Press Ctrl+C to stop the server")
@@ -559,7 +1416,16 @@ def main():
     os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ui', 'assets'), exist_ok=True)
     
     # Start the web server in a separate thread
-    server_thread = threading.Thread(target=lambda: start_web_server(args.port))
+    if args.use_async:
+        def serve():
+            configure_handler(args.static_max_age, args.max_runs, args.metrics, args.profile,
+                              args.context_cache_mb)
+            start_async_server(HybridAIOptimizationHandler, args.port, args.max_runs)
+    else:
+        def serve():
+            start_web_server(args.port, args.static_max_age, args.workers, args.max_runs, args.metrics,
+                             args.profile, args.context_cache_mb)
+    server_thread = threading.Thread(target=serve)
     server_thread.daemon = True  # This makes the thread exit when the main program exits
     server_thread.start()
     
@@ -0,0 +1,240 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba is optional; NeuralNetwork falls back to NumPy without it
+    numba = None
+else:
+    # Kernels run on request-handler threads. Once TBB has been started from a
+    # non-main thread the process cannot exit, and OpenMP is not fork-safe for
+    # batch workers, so use the workqueue layer unless one was chosen explicitly
+    if 'NUMBA_THREADING_LAYER' not in os.environ:
+        numba.config.THREADING_LAYER = 'workqueue'
+
+NUMBA_AVAILABLE = numba is not None
+
+# Samples per parallel work item; small enough that one solution still splits across cores
+BLOCK_SIZE = 32
+
+# With the 'auto' backend, calls evaluating at most this many solutions x samples
+# use the kernel. Below it NumPy's per-op dispatch dominates and the kernel is
+# about twice as fast; above it NumPy's vectorized exp wins on a single core.
+#
+# The cap also bounds the cost of launch_lock: every kernel launch in the process
+# holds it, so concurrent runs on server threads queue behind each other, but only
+# for one small evaluation (tens of microseconds) at a time. Large evaluations
+# never take the lock under 'auto'; only backend='numba' makes them contend.
+KERNEL_MAX_ROWS = 512
+
+# Kernel launches are serialized: each one already uses every core, and the
+# workqueue threading layer selected above does not support concurrent launches
+launch_lock = threading.Lock()
+
+
+def _loss_and_correct(X, y, weights, input_size, hidden_size, output_size, losses, correct):
+    """
+    Fused forward pass, cross-entropy and accuracy for a population of solutions.
+
+    Each work item is one solution and one block of samples, so the loop runs
+    in parallel over population x samples. The arithmetic follows the NumPy
+    path: clipped sigmoid, max-shifted softmax and -log(p + 1e-10).
+
+    Args:
+        X (numpy.ndarray): Input data of shape (samples, input_size)
+        y (numpy.ndarray): True labels
+        weights (numpy.ndarray): Array of shape (solutions, total_weights)
+        input_size, hidden_size, output_size (int): Layer sizes
+        losses (numpy.ndarray): Output, summed loss per (solution, block)
+        correct (numpy.ndarray): Output, correct predictions per (solution, block)
+    """
+    samples = X.shape[0]
+    blocks = losses.shape[1]
+    b1_start = input_size * hidden_size
+    W2_start = b1_start + hidden_size
+    b2_start = W2_start + hidden_size * output_size
+
+    for item in numba.prange(weights.shape[0] * blocks):
+        solution = item // blocks
+        block = item % blocks
+        w = weights[solution]
+        hidden = np.empty(hidden_size)
+        output = np.empty(output_size)
+        loss = 0.0
+        hits = 0
+
+        for sample in range(block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, samples)):
+            # Hidden layer: sigmoid(x @ W1 + b1), clipped like NeuralNetwork.sigmoid;
+            # rows of W1 are contiguous, so accumulate one input at a time
+            for j in range(hidden_size):
+                hidden[j] = w[b1_start + j]
+            for i in range(input_size):
+                x = X[sample, i]
+                row = i * hidden_size
+                for j in range(hidden_size):
+                    hidden[j] += x * w[row + j]
+            for j in range(hidden_size):
+                z = min(max(hidden[j], -500.0), 500.0)
+                hidden[j] = 1.0 / (1.0 + math.exp(-z))
+
+            # Output layer, accumulated one hidden unit at a time
+            for o in range(output_size):
+                output[o] = w[b2_start + o]
+            for j in range(hidden_size):
+                a = hidden[j]
+                row = W2_start + j * output_size
+                for o in range(output_size):
+                    output[o] += a * w[row + o]
+
+            # Index of the largest output (the first one on ties, like argmax)
+            best = 0
+            for o in range(1, output_size):
+                if output[o] > output[best]:
+                    best = o
+
+            # Softmax probability of the true class
+            label = y[sample]
+            total = 0.0
+            true_class = 0.0
+            for o in range(output_size):
+                e = math.exp(output[o] - output[best])
+                total += e
+                if o == label:
+                    true_class = e
+            loss -= math.log(true_class / total + 1e-10)
+            if best == label:
+                hits += 1
+
+        losses[solution, block] = loss
+        correct[solution, block] = hits
+
+
+if NUMBA_AVAILABLE:
+    _loss_and_correct = numba.njit(parallel=True, cache=True)(_loss_and_correct)
+
+
+def loss_and_accuracy(nn, X, y, weights):
+    """
+    Calculate the cross-entropy loss and accuracy with the compiled kernel.
+
+    Args:
+        nn: NeuralNetwork providing the layer sizes
+        X (numpy.ndarray): Input data
+        y (numpy.ndarray): True labels (as integers)
+        weights (numpy.ndarray): Flat array of weights, or a 2D array with one row per solution
+
+    Returns:
+        tuple: Loss and accuracy (one per row when weights is 2D)
+    """
+    population = np.ascontiguousarray(np.atleast_2d(weights), dtype=np.float64)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    blocks = -(-len(X) // BLOCK_SIZE)
+    losses = np.empty((len(population), blocks))
+    correct = np.empty((len(population), blocks), dtype=np.int64)
+
+    with launch_lock:
+        _loss_and_correct(X, y, population, nn.input_size, nn.hidden_size, nn.output_size, losses, correct)
+
+    loss = losses.sum(axis=1) / len(X)
+    accuracy = correct.sum(axis=1) / len(X)
+    if weights.ndim == 1:
+        return loss[0], accuracy[0]
+    return loss, accuracy
+
+
+def check_equivalence(nn, X, y, weights, tolerance=1e-9):
+    """
+    Compare the compiled kernel with the NumPy path.
+
+    Args:
+        nn: NeuralNetwork to compare on
+        X (numpy.ndarray): Input data
+        y (numpy.ndarray): True labels
+        weights (numpy.ndarray): 2D array of solutions to evaluate
+        tolerance (float): Largest allowed loss difference
+
+    Returns:
+        dict: Largest loss and accuracy differences and whether both are within tolerance
+    """
+    loss, accuracy = loss_and_accuracy(nn, X, y, weights)
+    _, predictions = nn.forward(X, weights)
+    reference_loss = nn.numpy_loss(X, y, weights)
+    reference_accuracy = np.mean(predictions == y, axis=-1)
+    loss_error = float(np.max(np.abs(loss - reference_loss)))
+    accuracy_error = float(np.max(np.abs(accuracy - reference_accuracy)))
+    return {
+        'loss_error': loss_error,
+        'accuracy_error': accuracy_error,
+        'equivalent': loss_error <= tolerance and accuracy_error == 0
+    }
+
+
+def benchmark(dataset='iris', hidden_size=8, populations=(1, 30, 200), repeats=20):
+    """
+    Time the compiled kernel against the NumPy path.
+
+    Args:
+        dataset (str): Dataset to evaluate on
+        hidden_size (int): Number of hidden neurons
+        populations (tuple): Population sizes to time
+        repeats (int): Timed calls per measurement
+
+    Returns:
+        list: One row per population size with both timings, the speedup and the equivalence check
+    """
+    from utils.context_registry import contexts
+
+    context = contexts.get(dataset, hidden_size)
+    nn, X, y = context.nn, context.X_train, context.y_train
+    rows = []
+    for population in populations:
+        weights = np.random.randn(population, nn.total_weights) * 0.5
+
+        # The first call compiles the kernel (or loads it from Numba's cache)
+        loss_and_accuracy(nn, X, y, weights)
+
+        # Optimizers only ask for the loss, so NumPy is timed on the loss alone
+        start = time.perf_counter()
+        for _ in range(repeats):
+            nn.numpy_loss(X, y, weights)
+        numpy_seconds = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            loss_and_accuracy(nn, X, y, weights)
+        numba_seconds = (time.perf_counter() - start) / repeats
+
+        check = check_equivalence(nn, X, y, weights)
+        rows.append({
+            'population': population,
+            'numpy_ms': numpy_seconds * 1000,
+            'numba_ms': numba_seconds * 1000,
+            'speedup': numpy_seconds / numba_seconds,
+            'loss_error': check['loss_error'],
+            'equivalent': check['equivalent']
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m models.fused_kernels',
+                                     description='Check and time the Numba fitness kernel against NumPy')
+    parser.add_argument('--dataset', default='iris', help='Dataset to evaluate on')
+    parser.add_argument('--hidden-size', type=int, default=8, help='Number of hidden neurons')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed calls per measurement')
+    args = parser.parse_args()
+
+    if not NUMBA_AVAILABLE:
+        raise SystemExit("Numba is not installed; NeuralNetwork uses the NumPy path")
+
+    print(f"{'population':>10} {'numpy ms':>10} {'numba ms':>10} {'speedup':>8} {'max loss diff':>14}")
+    for row in benchmark(args.dataset, args.hidden_size, repeats=args.repeats):
+        print(f"{row['population']:>10} {row['numpy_ms']:>10.3f} {row['numba_ms']:>10.3f} "
+              f"{row['speedup']:>7.1f}x {row['loss_error']:>14.2e}"
+              + ("" if row['equivalent'] else "  MISMATCH"))
@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+
+from models.neural_network import NeuralNetwork
+from utils.micro_batcher import MicroBatcher
+
+class ServedModel:
+    """
+    A trained network ready for inference: weights, architecture and the
+    feature scaling used during training.
+    """
+
+    def __init__(self, model_id, weights, input_size, hidden_size, output_size,
+                 scaler_mean, scaler_scale, metadata=None):
+        """
+        Initialize a served model.
+
+        Args:
+            model_id (str): Model identifier
+            weights (numpy.ndarray): Flat weight vector
+            input_size (int): Number of input features
+            hidden_size (int): Number of hidden neurons
+            output_size (int): Number of classes
+            scaler_mean (numpy.ndarray): Per-feature mean from the training scaler
+            scaler_scale (numpy.ndarray): Per-feature scale from the training scaler
+            metadata (dict): Algorithm, accuracy and other details of the run
+        """
+        self.model_id = model_id
+        self.neural_network = NeuralNetwork(input_size, hidden_size, output_size)
+        if len(weights) != self.neural_network.total_weights:
+            raise ValueError(f"Model {model_id} has {len(weights)} weights, "
+                             f"expected {self.neural_network.total_weights}")
+        self.weights = np.asarray(weights, dtype=float)
+        self.scaler_mean = np.asarray(scaler_mean, dtype=float)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=float)
+        self.metadata = metadata or {}
+        self.batcher = MicroBatcher(self.predict_proba)
+
+    def predict_proba(self, X):
+        """
+        Compute class probabilities for raw (unscaled) feature rows.
+
+        Args:
+            X (numpy.ndarray): Array of shape (n_samples, input_size)
+
+        Returns:
+            numpy.ndarray: Array of shape (n_samples, output_size)
+        """
+        X_scaled = (X - self.scaler_mean) / self.scaler_scale
+        probabilities, _ = self.neural_network.forward(X_scaled, self.weights)
+        return probabilities
+
+    def describe(self):
+        """
+        Summarize the model for API responses.
+
+        Returns:
+            dict: Identifier, architecture and metadata
+        """
+        nn = self.neural_network
+        return {
+            'model_id': self.model_id,
+            'architecture': [nn.input_size, nn.hidden_size, nn.output_size],
+            'metadata': self.metadata
+        }
+
+
+class ModelStore:
+    """
+    Persists trained models to disk and keeps recently used ones in memory.
+
+    Each model is one .npz file holding the weights, the architecture and
+    the training scaler's parameters. Loaded models are cached by ID (least
+    recently used first out) so predictions do not touch the disk.
+    """
+
+    ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+    def __init__(self, directory, max_cached=16, keep=100):
+        """
+        Initialize the model store.
+
+        Args:
+            directory (str): Directory holding the .npz model files
+            max_cached (int): Number of models kept loaded in memory
+            keep (int): Number of most recent model files kept on disk
+        """
+        self.directory = directory
+        self.max_cached = max_cached
+        self.keep = keep
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Most recently saved model, so default predictions need not scan the directory
+        self.latest_id = None
+
+    def path_for(self, model_id):
+        """
+        Get the file path of a model.
+
+        Args:
+            model_id (str): Model identifier
+
+        Returns:
+            str: Path of the .npz file, or None if the identifier is invalid
+        """
+        if not self.ID_PATTERN.match(model_id or ''):
+            return None
+        return os.path.join(self.directory, f'{model_id}.npz')
+
+    def save(self, weights, neural_network, scaler, metadata=None, prefix='model'):
+        """
+        Persist a trained model and add it to the cache.
+
+        Args:
+            weights (numpy.ndarray): Flat weight vector
+            neural_network: NeuralNetwork the weights belong to
+            scaler: Fitted StandardScaler used on the training features
+            metadata (dict): Algorithm, accuracy and other details of the run
+            prefix (str): Start of the model identifier, e.g. the algorithm name
+
+        Returns:
+            str: Model identifier
+        """
+        model_id = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        metadata = dict(metadata or {}, created=time.time())
+
+        os.makedirs(self.directory, exist_ok=True)
+        np.savez(
+            self.path_for(model_id),
+            weights=np.asarray(weights, dtype=float),
+            architecture=np.array([neural_network.input_size, neural_network.hidden_size,
+                                   neural_network.output_size]),
+            scaler_mean=scaler.mean_,
+            scaler_scale=scaler.scale_,
+            metadata=np.array(json.dumps(metadata))
+        )
+        with self.lock:
+            self.latest_id = model_id
+        self.prune()
+
+        model = ServedModel(model_id, weights, neural_network.input_size, neural_network.hidden_size,
+                            neural_network.output_size, scaler.mean_, scaler.scale_, metadata)
+        self.cache(model)
+        return model_id
+
+    def load_file(self, model_id):
+        """
+        Read a model from disk.
+
+        Args:
+            model_id (str): Model identifier
+
+        Returns:
+            ServedModel: Loaded model, or None if it does not exist
+        """
+        path = self.path_for(model_id)
+        if path is None or not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            input_size, hidden_size, output_size = (int(x) for x in data['architecture'])
+            return ServedModel(model_id, data['weights'], input_size, hidden_size, output_size,
+                               data['scaler_mean'], data['scaler_scale'],
+                               json.loads(str(data['metadata'])))
+
+    def cache(self, model):
+        """
+        Add a model to the in-memory cache, evicting the least recently used.
+
+        Args:
+            model (ServedModel): Model to cache
+        """
+        with self.lock:
+            self.models[model.model_id] = model
+            self.models.move_to_end(model.model_id)
+            while len(self.models) > self.max_cached:
+                self.models.popitem(last=False)
+
+    def get(self, model_id):
+        """
+        Get a model, loading it from disk if it is not cached.
+
+        Args:
+            model_id (str): Model identifier
+
+        Returns:
+            ServedModel: Model, or None if it does not exist
+        """
+        with self.lock:
+            model = self.models.get(model_id)
+            if model is not None:
+                self.models.move_to_end(model_id)
+                return model
+
+        model = self.load_file(model_id)
+        if model is not None:
+            self.cache(model)
+        return model
+
+    def list_ids(self):
+        """
+        List stored models, newest first.
+
+        Returns:
+            list: Model identifiers
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            # A concurrent prune() may delete a file between the listing and the stat
+            try:
+                mtime = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((mtime, name[:-len('.npz')]))
+        entries.sort(reverse=True)
+        return [model_id for _, model_id in entries]
+
+    def latest(self):
+        """
+        Get the most recently saved model without scanning the directory.
+
+        The directory is listed only until the first save() (or once after
+        startup, for models saved by an earlier process).
+
+        Returns:
+            str: Model identifier, or None if there are no models
+        """
+        with self.lock:
+            if self.latest_id is not None:
+                return self.latest_id
+        model_ids = self.list_ids()
+        with self.lock:
+            if self.latest_id is None and model_ids:
+                self.latest_id = model_ids[0]
+            return self.latest_id
+
+    def preload(self):
+        """
+        Load the most recent models into the cache.
+
+        Returns:
+            int: Number of models loaded
+        """
+        count = 0
+        for model_id in reversed(self.list_ids()[:self.max_cached]):
+            try:
+                if self.get(model_id) is not None:
+                    count += 1
+            except Exception as e:
+                logging.warning(f"Could not load model {model_id}: {str(e)}")
+        if count:
+            logging.info(f"Preloaded {count} models from {self.directory}")
+        return count
+
+    def prune(self):
+        """Delete all but the most recent model files."""
+        for model_id in self.list_ids()[self.keep:]:
+            try:
+                os.remove(self.path_for(model_id))
+            except OSError as e:
+                logging.warning(f"Could not remove old model {model_id}: {str(e)}")
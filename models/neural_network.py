@@ -1,12 +1,21 @@
 import numpy as np
 
+from models import fused_kernels
+
 class NeuralNetwork:
     """
     A simple feedforward neural network with one hidden layer.
     Uses sigmoid activation for hidden layer and softmax for output layer.
+    
+    When Numba is installed, small loss and accuracy evaluations run on a
+    compiled kernel that fuses the whole forward pass (see models.fused_kernels);
+    everything else runs on NumPy.
     """
     
-    def __init__(self, input_size, hidden_size, output_size):
+    # Elements per temporary array in sparse_update_loss (about 256 KB of float64)
+    SPARSE_CHUNK_ELEMENTS = 32768
+    
+    def __init__(self, input_size, hidden_size, output_size, backend='auto'):
         """
         Initialize the neural network with given layer sizes.
         
@@ -14,7 +23,17 @@ class NeuralNetwork:
             input_size (int): Number of input features
             hidden_size (int): Number of neurons in the hidden layer
             output_size (int): Number of output classes
+            backend (str): 'auto' uses the Numba kernel for small evaluations when Numba
+                is installed, 'numba' uses it for all of them and 'numpy' never does
         """
+        if backend not in ('auto', 'numba', 'numpy'):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == 'numba' and not fused_kernels.NUMBA_AVAILABLE:
+            raise ValueError("The numba backend needs Numba to be installed")
+        if backend == 'auto' and not fused_kernels.NUMBA_AVAILABLE:
+            backend = 'numpy'
+        self.backend = backend
+        
         self.input_size = input_size
         self.hidden_size = hidden_size
         self.output_size = output_size
@@ -26,35 +45,65 @@ class NeuralNetwork:
         """
         Unpack a flat array of weights into the network's weight matrices and bias vectors.
         
+        A 2D array of shape (n_solutions, total_weights) is unpacked into stacked
+        matrices so that a whole population can be evaluated at once.
+        
         Args:
-            weights (numpy.ndarray): Flat array of weights
+            weights (numpy.ndarray): Flat array of weights, or a 2D array of flat weights
             
         Returns:
             tuple: Weight matrices and bias vectors (W1, b1, W2, b2)
         """
+        lead = weights.shape[:-1]
+        
         # Extract weights for the hidden layer
         W1_size = self.input_size * self.hidden_size
-        W1 = weights[:W1_size].reshape(self.input_size, self.hidden_size)
+        W1 = weights[..., :W1_size].reshape(lead + (self.input_size, self.hidden_size))
         
         # Extract biases for the hidden layer
         b1_size = self.hidden_size
         b1_start = W1_size
         b1_end = b1_start + b1_size
-        b1 = weights[b1_start:b1_end]
+        b1 = weights[..., b1_start:b1_end]
         
         # Extract weights for the output layer
         W2_size = self.hidden_size * self.output_size
         W2_start = b1_end
         W2_end = W2_start + W2_size
-        W2 = weights[W2_start:W2_end].reshape(self.hidden_size, self.output_size)
+        W2 = weights[..., W2_start:W2_end].reshape(lead + (self.hidden_size, self.output_size))
         
         # Extract biases for the output layer
         b2_size = self.output_size
         b2_start = W2_end
-        b2 = weights[b2_start:b2_start + b2_size]
+        b2 = weights[..., b2_start:b2_start + b2_size]
+        
+        # Stacked biases need a sample axis to broadcast against (n_solutions, samples, units)
+        if lead:
+            b1 = b1[..., np.newaxis, :]
+            b2 = b2[..., np.newaxis, :]
         
         return W1, b1, W2, b2
     
+    def _pack_weights(self, W1, b1, W2, b2):
+        """
+        Pack weight matrices and bias vectors back into a flat array of weights.
+        
+        Inverse of _unpack_weights; stacked matrices produce a 2D array.
+        
+        Args:
+            W1, b1, W2, b2 (numpy.ndarray): Weight matrices and bias vectors
+            
+        Returns:
+            numpy.ndarray: Flat array (or 2D array) of weights
+        """
+        lead = W1.shape[:-2]
+        return np.concatenate([
+            W1.reshape(lead + (-1,)),
+            b1.reshape(lead + (-1,)),
+            W2.reshape(lead + (-1,)),
+            b2.reshape(lead + (-1,))
+        ], axis=-1)
+    
     def sigmoid(self, x):
         """
         Sigmoid activation function.
@@ -67,19 +116,20 @@ class NeuralNetwork:
         """
         return 1 / (1 + np.exp(-np.clip(x, -500, 500)))  # Clip to avoid overflow
     
-    def softmax(self, x):
+    def softmax(self, x, axis=-1):
         """
         Softmax activation function.
         
         Args:
             x (numpy.ndarray): Input array
+            axis (int): Axis holding the classes
             
         Returns:
             numpy.ndarray: Output after applying softmax
         """
         # Subtract max for numerical stability
-        exp_x = np.exp(x - np.max(x, axis=1, keepdims=True))
-        return exp_x / np.sum(exp_x, axis=1, keepdims=True)
+        exp_x = np.exp(x - np.max(x, axis=axis, keepdims=True))
+        return exp_x / np.sum(exp_x, axis=axis, keepdims=True)
     
     def forward(self, X, weights):
         """
@@ -87,7 +137,7 @@ class NeuralNetwork:
         
         Args:
             X (numpy.ndarray): Input data
-            weights (numpy.ndarray): Flat array of weights
+            weights (numpy.ndarray): Flat array of weights, or a 2D array with one row per solution
             
         Returns:
             tuple: Output probabilities and predicted classes
@@ -96,15 +146,15 @@ class NeuralNetwork:
         W1, b1, W2, b2 = self._unpack_weights(weights)
         
         # Hidden layer
-        Z1 = np.dot(X, W1) + b1
+        Z1 = np.matmul(X, W1) + b1
         A1 = self.sigmoid(Z1)
         
         # Output layer
-        Z2 = np.dot(A1, W2) + b2
+        Z2 = np.matmul(A1, W2) + b2
         A2 = self.softmax(Z2)
         
         # Get predicted class
-        y_pred = np.argmax(A2, axis=1)
+        y_pred = np.argmax(A2, axis=-1)
         
         return A2, y_pred
     
@@ -118,10 +168,12 @@ class NeuralNetwork:
             weights (numpy.ndarray): Flat array of weights
             
         Returns:
-            float: Accuracy score
+            float: Accuracy score (one per row when weights is 2D)
         """
+        if self.use_kernel(X, weights):
+            return fused_kernels.loss_and_accuracy(self, X, y, weights)[1]
         _, y_pred = self.forward(X, weights)
-        return np.mean(y_pred == y)
+        return np.mean(y_pred == y, axis=-1)
     
     def calculate_loss(self, X, y, weights):
         """
@@ -133,21 +185,280 @@ class NeuralNetwork:
             weights (numpy.ndarray): Flat array of weights
             
         Returns:
-            float: Cross-entropy loss
+            float: Cross-entropy loss (one per row when weights is 2D)
+        """
+        if self.use_kernel(X, weights):
+            return fused_kernels.loss_and_accuracy(self, X, y, weights)[0]
+        return self.numpy_loss(X, y, weights)
+    
+    def loss_and_accuracy(self, X, y, weights):
+        """
+        Calculate the cross-entropy loss and the accuracy together.
+        
+        Args:
+            X (numpy.ndarray): Input data
+            y (numpy.ndarray): True labels (as integers)
+            weights (numpy.ndarray): Flat array of weights, or a 2D array with one row per solution
+            
+        Returns:
+            tuple: Loss and accuracy (one per row when weights is 2D)
+        """
+        if self.use_kernel(X, weights):
+            return fused_kernels.loss_and_accuracy(self, X, y, weights)
+        y_prob, y_pred = self.forward(X, weights)
+        true_class_prob = y_prob[..., np.arange(X.shape[0]), y]
+        loss = np.sum(-np.log(true_class_prob + 1e-10), axis=-1) / X.shape[0]
+        return loss, np.mean(y_pred == y, axis=-1)
+    
+    def use_kernel(self, X, weights):
+        """
+        Check whether an evaluation runs on the Numba kernel.
+        
+        Args:
+            X (numpy.ndarray): Input data
+            weights (numpy.ndarray): Weights to evaluate
+            
+        Returns:
+            bool: True for flat or 2D weights with the numba backend, or with the
+                auto backend when solutions x samples is at most KERNEL_MAX_ROWS
+        """
+        if self.backend == 'numpy' or weights.ndim > 2:
+            return False
+        if self.backend == 'numba':
+            return True
+        solutions = 1 if weights.ndim == 1 else len(weights)
+        return solutions * len(X) <= fused_kernels.KERNEL_MAX_ROWS
+    
+    def numpy_loss(self, X, y, weights):
+        """
+        Calculate the cross-entropy loss with NumPy (the fallback for calculate_loss).
+        
+        Args:
+            X (numpy.ndarray): Input data
+            y (numpy.ndarray): True labels (as integers)
+            weights (numpy.ndarray): Flat array of weights
+            
+        Returns:
+            float: Cross-entropy loss (one per row when weights is 2D)
         """
         m = X.shape[0]
         y_prob, _ = self.forward(X, weights)
         
-        # Convert y to one-hot encoding
-        y_one_hot = np.zeros((m, self.output_size))
-        y_one_hot[np.arange(m), y] = 1
+        # Pick the predicted probability of the true class for each sample
+        true_class_prob = y_prob[..., np.arange(m), y]
         
         # Calculate cross-entropy loss
-        log_likelihood = -np.log(np.sum(y_one_hot * y_prob, axis=1) + 1e-10)
-        loss = np.sum(log_likelihood) / m
+        log_likelihood = -np.log(true_class_prob + 1e-10)
+        loss = np.sum(log_likelihood, axis=-1) / m
         
         return loss
     
+    def loss_and_gradient(self, X, y, weights):
+        """
+        Calculate the cross-entropy loss and its analytic gradient (backpropagation).
+        
+        Args:
+            X (numpy.ndarray): Input data
+            y (numpy.ndarray): True labels (as integers)
+            weights (numpy.ndarray): Flat array of weights, or a 2D array with one row per solution
+            
+        Returns:
+            tuple: Loss (float or array) and gradient with the same shape as weights
+        """
+        m = X.shape[0]
+        W1, b1, W2, b2 = self._unpack_weights(weights)
+        
+        # Forward pass, keeping the intermediate activations
+        A1 = self.sigmoid(np.matmul(X, W1) + b1)
+        A2 = self.softmax(np.matmul(A1, W2) + b2)
+        
+        true_class_prob = A2[..., np.arange(m), y]
+        loss = np.sum(-np.log(true_class_prob + 1e-10), axis=-1) / m
+        
+        # Output layer: d(loss)/dZ2 = (softmax - one_hot) / m
+        dZ2 = A2.copy()
+        dZ2[..., np.arange(m), y] -= 1
+        dZ2 /= m
+        dW2 = np.matmul(np.swapaxes(A1, -1, -2), dZ2)
+        db2 = np.sum(dZ2, axis=-2)
+        
+        # Hidden layer: back through W2 and the sigmoid derivative
+        dZ1 = np.matmul(dZ2, np.swapaxes(W2, -1, -2)) * A1 * (1 - A1)
+        dW1 = np.matmul(X.T, dZ1)
+        db1 = np.sum(dZ1, axis=-2)
+        
+        return loss, self._pack_weights(dW1, db1, dW2, db2)
+    
+    def weight_units(self):
+        """
+        Get the neuron each weight belongs to, for crossover that keeps neurons whole.
+        
+        A hidden neuron owns its incoming weights, its bias and its outgoing
+        weights; each output bias is a unit of its own.
+        
+        Returns:
+            numpy.ndarray: Unit per weight: 0..hidden_size-1 for hidden neurons,
+                hidden_size + o for the bias of output o
+        """
+        hidden = np.arange(self.hidden_size)
+        return np.concatenate([
+            np.tile(hidden, self.input_size),
+            hidden,
+            np.repeat(hidden, self.output_size),
+            self.hidden_size + np.arange(self.output_size)
+        ])
+    
+    def hidden_preactivations(self, X, weights):
+        """
+        Calculate the hidden-layer pre-activations Z1.
+        
+        Args:
+            X (numpy.ndarray): Input data
+            weights (numpy.ndarray): Flat array of weights, or a 2D array with one row per solution
+            
+        Returns:
+            numpy.ndarray: Z1 laid out (..., hidden_size, samples)
+        """
+        W1, b1, _, _ = self._unpack_weights(weights)
+        return np.swapaxes(np.matmul(X, W1) + b1, -1, -2)
+    
+    def loss_from_hidden(self, y, Z1, weights):
+        """
+        Calculate the cross-entropy loss from known hidden pre-activations,
+        skipping the first-layer matmul.
+        
+        Args:
+            y (numpy.ndarray): True labels
+            Z1 (numpy.ndarray): Hidden pre-activations laid out (..., hidden_size, samples)
+            weights (numpy.ndarray): Weights the output layer is taken from (flat or one row per solution)
+            
+        Returns:
+            float: Cross-entropy loss (one per row when weights is 2D)
+        """
+        m = len(y)
+        _, _, W2, b2 = self._unpack_weights(weights)
+        
+        # Output layer laid out (..., outputs, samples), like sparse_update_loss
+        b2 = b2.reshape(b2.shape[:-2] + (-1, 1))
+        Z2 = np.matmul(np.swapaxes(W2, -1, -2), self.sigmoid(Z1)) + b2
+        y_prob = self.softmax(Z2, axis=-2)
+        true_class_prob = y_prob[..., y, np.arange(m)]
+        return np.sum(-np.log(true_class_prob + 1e-10), axis=-1) / m
+    
+    def activation_cache(self, X, weights):
+        """
+        Run a forward pass and keep what sparse_update_loss needs to evaluate
+        small changes to these weights incrementally.
+        
+        Args:
+            X (numpy.ndarray): Input data
+            weights (numpy.ndarray): Flat array of weights
+            
+        Returns:
+            dict: Inputs with a bias row, pre-activations Z1 and Z2 and hidden activations A1,
+                each laid out (units, samples), plus W2
+        """
+        W1, b1, W2, b2 = self._unpack_weights(weights)
+        Z1 = np.matmul(X, W1) + b1
+        A1 = self.sigmoid(Z1)
+        Z2 = np.matmul(A1, W2) + b2
+        return {
+            'inputs': np.ascontiguousarray(np.vstack([X.T, np.ones(X.shape[0])])),
+            'Z1': np.ascontiguousarray(Z1.T),
+            'A1': np.ascontiguousarray(A1.T),
+            'Z2': np.ascontiguousarray(Z2.T),
+            'W2': W2.copy()
+        }
+    
+    def sparse_update_loss(self, y, cache, indices, deltas):
+        """
+        Calculate the cross-entropy loss of solutions that each differ from the
+        cached one in a few weights, without a full forward pass.
+        
+        Only the hidden units whose incoming weights changed are recomputed;
+        their change in activation and any changed output weights are then
+        added to the cached Z2 as rank-k updates. The cost per solution grows
+        with the number of changed weights rather than the network size.
+        
+        Args:
+            y (numpy.ndarray): True labels of the cached inputs
+            cache (dict): Result of activation_cache for the base solution
+            indices (numpy.ndarray): Array of shape (n, k) with the changed weight indices;
+                indices within a row must be distinct
+            deltas (numpy.ndarray): Array of shape (n, k) with the change to each weight
+            
+        Returns:
+            numpy.ndarray: Loss of each of the n solutions
+        """
+        # Work through the solutions in chunks whose temporaries stay in cache
+        n, k = indices.shape
+        chunk = max(1, self.SPARSE_CHUNK_ELEMENTS // (max(k, self.output_size) * len(y)))
+        if n <= chunk:
+            return self._sparse_update_loss(y, cache, indices, deltas)
+        return np.concatenate([
+            self._sparse_update_loss(y, cache, indices[start:start + chunk], deltas[start:start + chunk])
+            for start in range(0, n, chunk)
+        ])
+    
+    def _sparse_update_loss(self, y, cache, indices, deltas):
+        """
+        Calculate sparse_update_loss for one chunk of solutions.
+        
+        Args:
+            y (numpy.ndarray): True labels of the cached inputs
+            cache (dict): Result of activation_cache for the base solution
+            indices (numpy.ndarray): Array of shape (n, k) with the changed weight indices
+            deltas (numpy.ndarray): Array of shape (n, k) with the change to each weight
+            
+        Returns:
+            numpy.ndarray: Loss of each of the n solutions
+        """
+        m = len(y)
+        k = indices.shape[1]
+        W1_size = self.input_size * self.hidden_size
+        b1_end = W1_size + self.hidden_size
+        W2_end = b1_end + self.hidden_size * self.output_size
+        
+        # Changed hidden-layer weights: the unit they feed and their input column (the last one for b1)
+        hidden = indices < b1_end
+        unit = np.where(hidden, np.where(indices < W1_size, indices % self.hidden_size, indices - W1_size), -1)
+        column = np.where(indices < W1_size, indices // self.hidden_size, self.input_size)
+        column = np.where(hidden, column, 0)
+        
+        # Changed output-layer weights: the hidden unit they read (W2 only) and the output they feed
+        output_layer = ~hidden
+        from_unit = np.where(output_layer & (indices < W2_end), (indices - b1_end) // self.output_size, -1)
+        output = np.where(indices < W2_end, (indices - b1_end) % self.output_size, indices - W2_end)
+        
+        # Everything below is laid out (n, units, samples) so reductions over
+        # the few output classes run along a contiguous sample axis
+        
+        # New pre-activation of each changed unit; changes to the same unit add up
+        same_unit = hidden[:, :, np.newaxis] & (unit[:, :, np.newaxis] == unit[:, np.newaxis, :])
+        contributions = cache['inputs'][column] * deltas[..., np.newaxis]
+        safe_unit = np.maximum(unit, 0)
+        Z1 = cache['Z1'][safe_unit] + np.matmul(same_unit.astype(float), contributions)
+        
+        # Activation change, counted once per unit (at its first changed weight)
+        earlier = np.tril(np.ones((k, k), dtype=bool), -1)
+        first = hidden & ~np.any(same_unit & earlier, axis=2)
+        dA1 = (self.sigmoid(Z1) - cache['A1'][safe_unit]) * first[..., np.newaxis]
+        
+        # Hidden changes reach the outputs through the unchanged W2
+        dZ2 = np.matmul(np.swapaxes(cache['W2'][safe_unit], 1, 2), dA1)
+        
+        # Output weight changes scale the new activation of the unit they read (1 for b2)
+        reads = (from_unit[:, :, np.newaxis] == unit[:, np.newaxis, :]) & (from_unit[:, :, np.newaxis] >= 0)
+        A1 = cache['A1'][np.maximum(from_unit, 0)] + np.matmul(reads.astype(float), dA1)
+        scaled = np.where((from_unit >= 0)[..., np.newaxis], A1, 1.0) * deltas[..., np.newaxis]
+        targets = (np.arange(self.output_size) == output[..., np.newaxis]) & output_layer[..., np.newaxis]
+        dZ2 += np.matmul(np.swapaxes(targets, 1, 2).astype(float), scaled)
+        
+        # Cross-entropy of the updated outputs, as in calculate_loss
+        y_prob = self.softmax(cache['Z2'] + dZ2, axis=1)
+        true_class_prob = y_prob[:, y, np.arange(m)]
+        return np.sum(-np.log(true_class_prob + 1e-10), axis=-1) / m
+    
     def initialize_random_weights(self):
         """
         Initialize random weights for the neural network.
@@ -1,14 +1,28 @@
 import numpy as np
 import time
+from collections import OrderedDict
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
 
 class AntColonyOptimization:
     """
     Implementation of Ant Colony Optimization for neural network weights.
+    
+    Two modes are supported: 'grid' discretizes each weight and keeps a pheromone
+    table over the grid points, 'continuous' is ACO_R, which replaces the tables
+    with a ranked archive of solutions and samples new ants from Gaussian kernels
+    centred on the archive members.
     """
     
     def __init__(self, neural_network, X_train, y_train, X_test, y_test, 
                  ant_count=30, iterations=100, pheromone_importance=1.0,
-                 heuristic_importance=2.0, evaporation_rate=0.1):
+                 heuristic_importance=2.0, evaporation_rate=0.1, mode='grid',
+                 archive_size=10, locality=0.1, convergence_speed=0.85,
+                 pheromone_update='rank', elite_count=5, pheromone_min=0.01,
+                 pheromone_max=10.0, accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None, memo_size=10000):
         """
         Initialize the ACO optimizer.
         
@@ -22,8 +36,29 @@ class AntColonyOptimization:
             iterations (int): Number of iterations to run
             pheromone_importance (float): Weight given to pheromone trails (alpha)
             heuristic_importance (float): Weight given to heuristic information (beta)
-            evaporation_rate (float): Rate at which pheromones evaporate
+            evaporation_rate (float): Rate at which pheromones evaporate, in (0, 1]
+            mode (str): 'grid' for the discretized pheromone table, 'continuous' for ACO_R
+            archive_size (int): Number of ranked solutions kept in the ACO_R archive
+            locality (float): ACO_R rank weighting (q); smaller values favour the best solutions
+            convergence_speed (float): ACO_R kernel width factor (xi); smaller values converge faster
+            pheromone_update (str): Grid deposit rule: 'rank', 'elitist' or 'mmas' (MAX-MIN)
+            elite_count (int): Number of top-ranked ants allowed to deposit pheromone
+            pheromone_min (float): Lower pheromone bound for 'rank' and 'elitist'
+            pheromone_max (float): Upper pheromone bound for 'rank' and 'elitist'
+            accuracy_stride (int): Evaluate test accuracy every this many iterations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
+            memo_size (int): Number of grid solutions whose fitness is memoized (0 disables the memo)
         """
+        if mode not in ('grid', 'continuous'):
+            raise ValueError(f"Unknown ACO mode: {mode}")
+        if pheromone_update not in ('rank', 'elitist', 'mmas'):
+            raise ValueError(f"Unknown pheromone update rule: {pheromone_update}")
+        if not 0 < evaporation_rate <= 1:
+            raise ValueError("evaporation_rate must be in (0, 1]")
+        
         self.neural_network = neural_network
         self.X_train = X_train
         self.y_train = y_train
@@ -34,24 +69,52 @@ class AntColonyOptimization:
         self.pheromone_importance = pheromone_importance
         self.heuristic_importance = heuristic_importance
         self.evaporation_rate = evaporation_rate
+        self.mode = mode
+        self.archive_size = archive_size
+        self.locality = locality
+        self.convergence_speed = convergence_speed
+        self.pheromone_update = pheromone_update
+        self.elite_count = max(1, elite_count)
+        self.pheromone_min = pheromone_min
+        self.pheromone_max = pheromone_max
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(iterations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
         self.weights_size = neural_network.total_weights
         
         # Search space boundaries
         self.lower_bound = -1.0
         self.upper_bound = 1.0
         
-        # Number of discrete points in each dimension
+        # Number of discrete points in each dimension (grid mode)
         self.grid_points = 20
         
+        # Fitness memo for grid solutions, keyed by their grid-index bytes (grid mode)
+        self.memo_size = max(0, int(memo_size))
+        self.memo = OrderedDict()
+        self.memo_hits = 0
+        self.memo_lookups = 0
+        
+        # Ranked solution archive (continuous mode)
+        self.archive = None
+        self.archive_fitnesses = None
+        self.rank_probabilities = None
+        
         # Initialize best solution tracking
         self.best_solution = None
         self.best_fitness = -np.inf
         self.best_accuracy = 0
         
+        # Solutions constructed in the most recent iteration
+        self.last_solutions = []
+        
         # History for visualization
-        self.avg_fitness_history = []
-        self.best_fitness_history = []
+        self.avg_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
         self.best_accuracy_history = []
+        self.memo_hit_rate_history = HistoryBuffer(self.budget.history_capacity())
     
     def initialize_pheromones(self):
         """
@@ -70,86 +133,246 @@ class AntColonyOptimization:
         Uses negative loss as fitness to maximize.
         
         Args:
-            weights (numpy.ndarray): Weights to evaluate
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
             
         Returns:
-            float: Fitness score
+            float: Fitness score (one per row when weights is 2D)
         """
         # Calculate negative loss (higher is better)
-        loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='aco')
         return -loss
     
-    def select_next_point(self, ant_index, dimension):
+    def selection_cumulative(self):
         """
-        Select the next point for an ant to move to in a given dimension.
+        Get the cumulative selection weights of every grid point.
+        
+        A point's weight is pheromone^alpha * heuristic^beta. Pheromones only
+        change between iterations, so this is computed once per iteration and
+        shared by all ants.
+        
+        Returns:
+            numpy.ndarray: Cumulative sums of shape (weights_size, grid_points)
+        """
+        numerator = (self.pheromones ** self.pheromone_importance) * (self.heuristic ** self.heuristic_importance)
+        return np.cumsum(numerator, axis=1)
+    
+    def construct_solution(self, ant_index, cumulative=None):
+        """
+        Construct a complete solution for an ant as one grid point index per weight.
         
         Args:
             ant_index (int): Index of the ant
-            dimension (int): Current dimension being considered
+            cumulative (numpy.ndarray): Result of selection_cumulative() (computed if None)
             
         Returns:
-            int: Selected grid point index
+            numpy.ndarray: Grid point indices (uint8), one per weight
         """
-        # Calculate probabilities for each point in this dimension
-        pheromone = self.pheromones[dimension]
-        heuristic = self.heuristic[dimension]
-        
-        # Calculate the numerator of the probability formula
-        numerator = (pheromone ** self.pheromone_importance) * (heuristic ** self.heuristic_importance)
-        
-        # Calculate probabilities
-        probabilities = numerator / np.sum(numerator)
+        if cumulative is None:
+            cumulative = self.selection_cumulative()
         
-        # Select a point based on the probabilities
-        return np.random.choice(self.grid_points, p=probabilities)
+        # Inverse-CDF sampling: one uniform draw per dimension picks its grid point
+        draws = np.random.rand(self.weights_size, 1) * cumulative[:, -1:]
+        indices = np.sum(cumulative <= draws, axis=1)
+        return np.minimum(indices, self.grid_points - 1).astype(np.uint8)
     
-    def construct_solution(self, ant_index):
+    def grid_to_solution(self, indices):
         """
-        Construct a complete solution (set of weights) for an ant.
+        Convert grid point indices to continuous weight values.
         
         Args:
-            ant_index (int): Index of the ant
+            indices (numpy.ndarray): Grid point indices
             
         Returns:
-            numpy.ndarray: Constructed solution (weights)
+            numpy.ndarray: Weights with the same shape
+        """
+        return self.lower_bound + (indices / (self.grid_points - 1)) * (self.upper_bound - self.lower_bound)
+    
+    def grid_fitness(self, indices, solution):
         """
-        solution = np.zeros(self.weights_size)
+        Get the fitness of a grid solution, evaluating it only if it is not memoized.
+        
+        Converged pheromones make many ants construct the same grid solution, so
+        repeats within and across iterations are answered from a bounded LRU memo
+        and do not count as fitness evaluations. They still count toward the
+        evaluation budget (see budget_spent), so a converged run cannot loop forever.
         
-        # For each dimension, select a point
-        for dim in range(self.weights_size):
-            point_index = self.select_next_point(ant_index, dim)
+        Args:
+            indices (numpy.ndarray): Grid point indices of the solution (uint8)
+            solution (numpy.ndarray): The same solution as weights
             
-            # Convert the discrete point index to a continuous value
-            value = self.lower_bound + (point_index / (self.grid_points - 1)) * (self.upper_bound - self.lower_bound)
-            solution[dim] = value
+        Returns:
+            float: Fitness score
+        """
+        if self.memo_size == 0:
+            return self.calculate_fitness(solution)
+        
+        key = indices.tobytes()
+        self.memo_lookups += 1
+        fitness = self.memo.get(key)
+        if fitness is not None:
+            self.memo.move_to_end(key)
+            self.memo_hits += 1
+            metrics.inc('fitness_memo_hits_total', algorithm='aco')
+            return fitness
+        
+        fitness = self.calculate_fitness(solution)
+        self.memo[key] = fitness
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return fitness
+    
+    def budget_spent(self):
+        """
+        Get the evaluations charged against max_evaluations.
+        
+        Returns:
+            int: Fitness evaluations plus memo hits
+        """
+        return self.evaluations + self.memo_hits
+    
+    def memo_hit_rate(self):
+        """
+        Get the fraction of grid solutions answered from the fitness memo.
+        
+        Returns:
+            float: Hits over lookups for the run so far (0 before any lookup)
+        """
+        return self.memo_hits / self.memo_lookups if self.memo_lookups else 0.0
+    
+    def initialize_archive(self):
+        """
+        Initialize the ACO_R solution archive with random solutions, ranked best first.
+        """
+        solutions = np.random.uniform(self.lower_bound, self.upper_bound,
+                                      (self.archive_size, self.weights_size))
+        fitnesses = self.calculate_fitness(solutions)
+        order = np.argsort(-fitnesses)
+        self.archive = solutions[order]
+        self.archive_fitnesses = fitnesses[order]
+        
+        # Rank weights: Gaussian over the rank with width locality * archive_size
+        ranks = np.arange(self.archive_size)
+        width = self.locality * self.archive_size
+        rank_weights = np.exp(-ranks ** 2 / (2 * width ** 2)) / (width * np.sqrt(2 * np.pi))
+        self.rank_probabilities = rank_weights / np.sum(rank_weights)
+    
+    def sample_archive(self):
+        """
+        Sample a full solution for every ant from the archive's Gaussian kernels.
+        
+        Returns:
+            numpy.ndarray: Array of shape (ant_count, weights_size)
+        """
+        # Each ant picks a guiding archive member by rank
+        guides = np.random.choice(self.archive_size, size=self.ant_count, p=self.rank_probabilities)
+        
+        # Kernel width per member and dimension: mean distance to the other members
+        distances = np.abs(self.archive[:, np.newaxis, :] - self.archive[np.newaxis, :, :])
+        sigma = self.convergence_speed * np.sum(distances, axis=1) / max(self.archive_size - 1, 1)
         
-        return solution
+        solutions = self.archive[guides] + sigma[guides] * np.random.randn(self.ant_count, self.weights_size)
+        return np.clip(solutions, self.lower_bound, self.upper_bound)
+    
+    def update_archive(self, solutions, fitnesses):
+        """
+        Merge new solutions into the archive and keep the best archive_size of them.
+        
+        Args:
+            solutions (numpy.ndarray): New solutions
+            fitnesses (numpy.ndarray): Fitness values for each solution
+        """
+        merged = np.vstack([self.archive, solutions])
+        merged_fitnesses = np.concatenate([self.archive_fitnesses, fitnesses])
+        order = np.argsort(-merged_fitnesses)[:self.archive_size]
+        self.archive = merged[order]
+        self.archive_fitnesses = merged_fitnesses[order]
+    
+    def solution_to_grid(self, solutions):
+        """
+        Convert continuous solutions to the nearest grid point index in each dimension.
+        
+        Args:
+            solutions (numpy.ndarray): Solution or array of solutions
+            
+        Returns:
+            numpy.ndarray: Grid point indices with the same shape
+        """
+        scaled = (np.asarray(solutions) - self.lower_bound) / (self.upper_bound - self.lower_bound)
+        indices = np.rint(scaled * (self.grid_points - 1)).astype(int)
+        return np.clip(indices, 0, self.grid_points - 1)
     
     def update_pheromones(self, solutions, fitnesses):
         """
-        Update pheromone trails based on solution quality.
+        Update pheromone trails based on solution rank.
+        
+        Only the top elite_count ants (and, for 'rank' and 'elitist', the best
+        solution so far) deposit, so the deposit is a single scatter-add over
+        their grid indices. Fitness is negative loss, so the deposit quality is
+        1 / (1 + loss), which is always positive.
         
         Args:
             solutions (list): List of solutions (weights)
             fitnesses (list): List of fitness values for each solution
         """
+        solutions = np.asarray(solutions)
+        fitnesses = np.asarray(fitnesses)
+        order = np.argsort(-fitnesses)
+        
         # Evaporation
         self.pheromones *= (1 - self.evaporation_rate)
         
-        # Pheromone deposit
-        for solution, fitness in zip(solutions, fitnesses):
-            # Only allow positive fitness to contribute
-            if fitness > 0:
-                # For each dimension, find the closest grid point
-                for dim in range(self.weights_size):
-                    value = solution[dim]
-                    
-                    # Convert continuous value to discrete point index
-                    point_index = int(((value - self.lower_bound) / (self.upper_bound - self.lower_bound)) * (self.grid_points - 1))
-                    point_index = max(0, min(point_index, self.grid_points - 1))  # Ensure within bounds
-                    
-                    # Deposit pheromone proportional to fitness
-                    self.pheromones[dim, point_index] += fitness
+        # Choose the depositing solutions and how much each one deposits
+        best_quality = 1.0 / (1.0 - self.best_fitness)
+        if self.pheromone_update == 'mmas':
+            # Only the iteration-best ant deposits
+            depositors = solutions[order[:1]]
+            amounts = 1.0 / (1.0 - fitnesses[order[:1]])
+        elif self.pheromone_update == 'rank':
+            # The r-th ranked ant deposits (w - r) times its quality; the best so far deposits w times
+            top = order[:self.elite_count - 1]
+            rank_weights = self.elite_count - 1 - np.arange(len(top))
+            depositors = np.vstack([solutions[top], self.best_solution])
+            amounts = np.append(rank_weights / (1.0 - fitnesses[top]), self.elite_count * best_quality)
+        else:
+            # Top ants deposit their quality; the best so far gets an extra elite deposit
+            top = order[:self.elite_count]
+            depositors = np.vstack([solutions[top], self.best_solution])
+            amounts = np.append(1.0 / (1.0 - fitnesses[top]), self.elite_count * best_quality)
+        
+        # Scatter-add the deposits over (dimension, grid point) cells
+        indices = self.solution_to_grid(depositors)
+        cells = (np.arange(self.weights_size) * self.grid_points + indices).ravel()
+        deposit = np.bincount(cells, weights=np.repeat(amounts, self.weights_size),
+                              minlength=self.weights_size * self.grid_points)
+        self.pheromones += deposit.reshape(self.weights_size, self.grid_points)
+        
+        # Keep trails within bounds so no grid point becomes impossible to pick
+        if self.pheromone_update == 'mmas':
+            tau_max = best_quality / self.evaporation_rate
+            tau_min = tau_max / (2 * self.grid_points)
+        else:
+            tau_min, tau_max = self.pheromone_min, self.pheromone_max
+        np.clip(self.pheromones, tau_min, tau_max, out=self.pheromones)
+    
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+        
+        Args:
+            k (int): Maximum number of solutions to return
+            
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # Candidates are the best solution so far plus the last iteration's ants
+        pool = np.array(self.last_solutions).reshape(-1, self.weights_size)
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, pool)
+        order = np.argsort(losses)
+        return np.vstack([self.best_solution, pool[order[:k - 1]]])[:k]
     
     def run(self):
         """
@@ -159,68 +382,120 @@ class AntColonyOptimization:
             tuple: Best weights, best accuracy, and history
         """
         start_time = time.time()
+        self.budget.start()
         
-        # Initialize pheromones
-        self.initialize_pheromones()
-        
-        # Initialize best solution with a random solution
-        self.best_solution = np.random.uniform(self.lower_bound, self.upper_bound, self.weights_size)
-        self.best_fitness = self.calculate_fitness(self.best_solution)
-        self.best_accuracy = self.neural_network.calculate_accuracy(self.X_test, self.y_test, self.best_solution)
-        
-        # Store initial best
-        self.best_fitness_history.append(self.best_fitness)
-        self.best_accuracy_history.append(self.best_accuracy)
+        if self.mode == 'continuous':
+            # Initialize the archive and start from its best member
+            self.initialize_archive()
+            self.best_solution = self.archive[0].copy()
+            self.best_fitness = self.archive_fitnesses[0]
+        else:
+            # Initialize pheromones
+            self.initialize_pheromones()
+            
+            # Initialize best solution with a random solution
+            self.best_solution = np.random.uniform(self.lower_bound, self.upper_bound, self.weights_size)
+            self.best_fitness = self.calculate_fitness(self.best_solution)
         
-        # Main optimization loop
-        for iteration in range(self.iterations):
-            # Solutions for this iteration
-            solutions = []
-            fitnesses = []
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
+            
+            # Store initial best
+            self.best_fitness_history.append(self.best_fitness)
+            tracker.record(self.best_solution)
             
-            # Each ant constructs a solution
-            for ant in range(self.ant_count):
-                # Construct a solution
-                solution = self.construct_solution(ant)
+            # Main optimization loop
+            for iteration in range(self.iterations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.budget_spent())
+                if self.stop_reason is not None:
+                    break
                 
-                # Calculate fitness
-                fitness = self.calculate_fitness(solution)
+                improved = False
+                if self.mode == 'continuous':
+                    # All ants sample their solutions at once and are scored in one batch
+                    with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='construction'):
+                        solutions = self.sample_archive()
+                    fitnesses = self.calculate_fitness(solutions)
+                    
+                    # Update best solution if improved
+                    best_idx = np.argmax(fitnesses)
+                    if fitnesses[best_idx] > self.best_fitness:
+                        self.best_solution = solutions[best_idx].copy()
+                        self.best_fitness = fitnesses[best_idx]
+                        improved = True
+                    
+                    # Update the archive
+                    with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='archive_update'):
+                        self.update_archive(solutions, fitnesses)
+                    self.last_solutions = solutions
+                else:
+                    # Solutions for this iteration
+                    solutions = []
+                    fitnesses = []
+                    
+                    iteration_hits = self.memo_hits
+                    with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='construction'):
+                        cumulative = self.selection_cumulative()
+                    
+                    # Each ant constructs a solution
+                    for ant in range(self.ant_count):
+                        # Construct a solution
+                        with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='construction'):
+                            indices = self.construct_solution(ant, cumulative)
+                            solution = self.grid_to_solution(indices)
+                        
+                        # Calculate fitness, reusing it when an earlier ant built the same solution
+                        fitness = self.grid_fitness(indices, solution)
+                        
+                        # Store solution and fitness
+                        solutions.append(solution)
+                        fitnesses.append(fitness)
+                        
+                        # Update best solution if improved
+                        if fitness > self.best_fitness:
+                            self.best_solution = solution.copy()
+                            self.best_fitness = fitness
+                            improved = True
+                    
+                    # Update pheromones
+                    with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='pheromone_update'):
+                        self.update_pheromones(solutions, fitnesses)
+                    self.last_solutions = solutions
+                    self.memo_hit_rate_history.append((self.memo_hits - iteration_hits) / self.ant_count)
                 
-                # Store solution and fitness
-                solutions.append(solution)
-                fitnesses.append(fitness)
+                # Calculate average fitness for this iteration
+                avg_fitness = np.mean(fitnesses)
+                self.avg_fitness_history.append(avg_fitness)
                 
-                # Update best solution if improved
-                if fitness > self.best_fitness:
-                    self.best_solution = solution.copy()
-                    self.best_fitness = fitness
-                    self.best_accuracy = self.neural_network.calculate_accuracy(
-                        self.X_test, self.y_test, solution
-                    )
-            
-            # Update pheromones
-            self.update_pheromones(solutions, fitnesses)
-            
-            # Calculate average fitness for this iteration
-            avg_fitness = np.mean(fitnesses)
-            self.avg_fitness_history.append(avg_fitness)
-            
-            # Store best fitness and accuracy for this iteration
-            self.best_fitness_history.append(self.best_fitness)
-            self.best_accuracy_history.append(self.best_accuracy)
+                # Store best fitness and the best solution snapshot for this iteration
+                self.best_fitness_history.append(self.best_fitness)
+                tracker.record(self.best_solution, improved)
+                
+                # Print progress every 10 iterations
+                if (iteration + 1) % 10 == 0:
+                    print(f"ACO - Iteration {iteration + 1}/{self.iterations}, " +
+                          f"Best Fitness: {self.best_fitness:.4f}, " +
+                          f"Avg Fitness: {avg_fitness:.4f}")
             
-            # Print progress every 10 iterations
-            if (iteration + 1) % 10 == 0:
-                print(f"ACO - Iteration {iteration + 1}/{self.iterations}, " +
-                      f"Best Accuracy: {self.best_accuracy:.4f}, " +
-                      f"Avg Fitness: {avg_fitness:.4f}")
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='aco', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
         
         end_time = time.time()
         print(f"ACO optimization completed in {end_time - start_time:.2f} seconds")
         print(f"Final accuracy: {self.best_accuracy:.4f}")
+        if self.mode == 'grid':
+            print(f"Fitness memo hit rate: {self.memo_hit_rate():.2%}")
         
-        return self.best_solution, self.best_accuracy, {
-            'avg_fitness_history': self.avg_fitness_history,
-            'best_fitness_history': self.best_fitness_history,
+        history = {
+            'avg_fitness_history': self.avg_fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
             'best_accuracy_history': self.best_accuracy_history
         }
+        if self.mode == 'grid':
+            history['memo_hit_rate_history'] = self.memo_hit_rate_history.values()
+        return self.best_solution, self.best_accuracy, history
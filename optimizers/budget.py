@@ -0,0 +1,94 @@
+import time
+
+class RunBudget:
+    """
+    Stopping rule shared by the optimizers: an iteration limit plus optional
+    wall-clock and fitness-evaluation budgets, and cooperative cancellation.
+
+    Optimizers check stop_reason() before each iteration, so a run stops as
+    soon as a budget is spent and goes over it by at most one iteration.
+    """
+
+    # Iteration limit for runs bounded only by their time or evaluation budget
+    UNLIMITED_ITERATIONS = 10 ** 9
+
+    # Histories are preallocated for at most this many iterations and grow past it
+    MAX_PREALLOCATED = 10000
+
+    def __init__(self, iterations, max_seconds=None, max_evaluations=None, cancel_token=None):
+        """
+        Initialize the budget.
+
+        Args:
+            iterations (int): Maximum number of iterations
+            max_seconds (float): Wall-clock limit for the run (None for no limit)
+            max_evaluations (int): Fitness-evaluation limit for the run (None for no limit)
+            cancel_token: CancellationToken checked before every iteration (optional)
+        """
+        if max_seconds is not None and max_seconds <= 0:
+            raise ValueError("max_seconds must be positive")
+        if max_evaluations is not None and max_evaluations <= 0:
+            raise ValueError("max_evaluations must be positive")
+        self.iterations = iterations
+        self.max_seconds = max_seconds
+        self.max_evaluations = max_evaluations
+        self.cancel_token = cancel_token
+        self.start_time = time.perf_counter()
+
+    def start(self):
+        """Start the wall clock; called when the run begins."""
+        self.start_time = time.perf_counter()
+
+    def elapsed(self):
+        """
+        Get the time since the run started.
+
+        Returns:
+            float: Seconds since start()
+        """
+        return time.perf_counter() - self.start_time
+
+    def stop_reason(self, evaluations):
+        """
+        Check whether the run should stop before its next iteration.
+
+        Args:
+            evaluations (int): Fitness evaluations spent so far
+
+        Returns:
+            str: 'cancelled', 'max_evaluations' or 'max_seconds', or None to continue
+        """
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return 'cancelled'
+        if self.max_evaluations is not None and evaluations >= self.max_evaluations:
+            return 'max_evaluations'
+        if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+            return 'max_seconds'
+        return None
+
+    def progress(self, iteration, evaluations):
+        """
+        Get the fraction of the budget spent, for schedules such as PSO's inertia.
+
+        Args:
+            iteration (int): Current iteration (0-based)
+            evaluations (int): Fitness evaluations spent so far
+
+        Returns:
+            float: Largest of the spent iteration, evaluation and time fractions, in [0, 1]
+        """
+        fractions = [iteration / max(self.iterations - 1, 1)]
+        if self.max_evaluations is not None:
+            fractions.append(evaluations / self.max_evaluations)
+        if self.max_seconds is not None:
+            fractions.append(self.elapsed() / self.max_seconds)
+        return min(max(fractions), 1.0)
+
+    def history_capacity(self):
+        """
+        Get the number of history points to preallocate.
+
+        Returns:
+            int: Iteration limit plus the initial point, capped at MAX_PREALLOCATED + 1
+        """
+        return min(self.iterations, self.MAX_PREALLOCATED) + 1
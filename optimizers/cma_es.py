@@ -0,0 +1,329 @@
+import numpy as np
+import time
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
+
+class CMAES:
+    """
+    Implementation of the Covariance Matrix Adaptation Evolution Strategy
+    (CMA-ES) for optimizing neural network weights.
+
+    Each generation samples the whole population from a multivariate normal
+    distribution as one array and scores it in a single batched forward pass.
+    Three covariance models are available:
+
+    - 'full': the standard CMA-ES with a full D x D covariance matrix
+    - 'sep': separable CMA-ES with a diagonal covariance, O(D) memory and time
+    - 'lowrank': limited-memory matrix adaptation (LM-MA-ES), which shapes the
+      search distribution with a few direction vectors, O(m * D) memory
+
+    'auto' uses 'full' up to FULL_MAX_DIMENSION weights and 'sep' above it.
+    """
+
+    # Largest number of weights for which 'auto' keeps a full covariance matrix
+    FULL_MAX_DIMENSION = 1000
+
+    def __init__(self, neural_network, X_train, y_train, X_test, y_test,
+                 population_size=None, iterations=100, sigma=0.3, covariance='auto',
+                 memory=None, accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None):
+        """
+        Initialize the CMA-ES optimizer.
+
+        Args:
+            neural_network: Neural network model to optimize
+            X_train: Training data features
+            y_train: Training data labels
+            X_test: Test data features
+            y_test: Test data labels
+            population_size (int): Samples per generation (default 4 + 3 ln D)
+            iterations (int): Number of generations to run
+            sigma (float): Initial step size
+            covariance (str): Covariance model: 'auto', 'full', 'sep' or 'lowrank'
+            memory (int): Direction vectors kept by 'lowrank' (default 4 + 3 ln D)
+            accuracy_stride (int): Evaluate test accuracy every this many generations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
+        """
+        if covariance not in ('auto', 'full', 'sep', 'lowrank'):
+            raise ValueError(f"Unknown covariance model: {covariance}")
+
+        self.neural_network = neural_network
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.y_test = y_test
+        self.weights_size = neural_network.total_weights
+        default_size = 4 + int(3 * np.log(self.weights_size))
+        self.population_size = max(4, int(population_size or default_size))
+        self.iterations = iterations
+        self.sigma = float(sigma)
+        if covariance == 'auto':
+            covariance = 'full' if self.weights_size <= self.FULL_MAX_DIMENSION else 'sep'
+        self.covariance = covariance
+        self.memory = max(1, int(memory or default_size))
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(iterations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
+
+        # Search distribution
+        self.mean = None
+        self.population = None
+        self.population_fitness = None
+
+        # Initialize best solution tracking
+        self.best_solution = None
+        self.best_fitness = -np.inf
+        self.best_accuracy = 0
+
+        # History for visualization
+        self.avg_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.sigma_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_accuracy_history = []
+
+    def initialize_strategy(self):
+        """
+        Set the recombination weights, learning rates and the initial distribution.
+        """
+        n = self.weights_size
+        lam = self.population_size
+        self.mu = lam // 2
+
+        # Log-linear recombination weights for the best mu samples
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.recombination_weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.recombination_weights ** 2)
+        mueff = self.mueff
+
+        # Step-size control
+        self.cs = (mueff + 2) / (n + mueff + 5)
+        self.damps = 1 + 2 * max(0.0, np.sqrt((mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        # Covariance learning rates
+        self.cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+        self.c1 = 2 / ((n + 1.3) ** 2 + mueff)
+        self.cmu = min(1 - self.c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff))
+        if self.covariance == 'sep':
+            # A diagonal model has only n parameters to learn, so it can learn faster
+            self.c1 *= (n + 2) / 3
+            self.cmu = min(1 - self.c1, self.cmu * (n + 2) / 3)
+
+        # Initial distribution: small random mean, like the other optimizers' starting points
+        self.mean = np.random.randn(n) * 0.1
+        self.ps = np.zeros(n)
+        self.pc = np.zeros(n)
+        self.generation = 0
+
+        if self.covariance == 'full':
+            self.C = np.eye(n)
+            self.B = np.eye(n)
+            self.D = np.ones(n)
+            self.eigen_generation = 0
+        elif self.covariance == 'sep':
+            self.C = np.ones(n)
+        else:
+            # LM-MA-ES: direction vectors and their learning rates (Loshchilov et al., 2017)
+            # Capped at 1 like the direction rates: past it cs * (2 - cs) turns negative for lam > 2n
+            self.cs = min(2 * lam / n, 1.0)
+            self.directions = np.zeros((self.memory, n))
+            self.cd = 1 / (1.5 ** np.arange(self.memory) * n)
+            self.cc_directions = np.minimum(lam / (4.0 ** np.arange(self.memory) * n), 1.0)
+
+    def calculate_fitness(self, weights):
+        """
+        Calculate the fitness of a solution (higher is better).
+        Uses negative loss as fitness to maximize.
+
+        Args:
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
+
+        Returns:
+            float: Fitness score (one per row when weights is 2D)
+        """
+        # Calculate negative loss (higher is better)
+        with metrics.timer('optimizer_phase_seconds', algorithm='cmaes', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='cmaes')
+        return -loss
+
+    def sample(self):
+        """
+        Sample a generation from the current search distribution.
+
+        Returns:
+            tuple: Standard normal samples z and their steps y, both (population_size, D);
+                candidates are mean + sigma * y
+        """
+        z = np.random.randn(self.population_size, self.weights_size)
+        if self.covariance == 'full':
+            y = (z * self.D) @ self.B.T
+        elif self.covariance == 'sep':
+            y = z * np.sqrt(self.C)
+        else:
+            y = z.copy()
+            for j in range(min(self.generation, self.memory)):
+                direction = self.directions[j]
+                y = (1 - self.cd[j]) * y + self.cd[j] * np.outer(y @ direction, direction)
+        return z, y
+
+    def update_distribution(self, z, y, fitness_values):
+        """
+        Move the mean toward the best samples and adapt the step size and covariance.
+
+        Args:
+            z (numpy.ndarray): Standard normal samples of the generation
+            y (numpy.ndarray): Steps of the generation
+            fitness_values (numpy.ndarray): Fitness of each sample
+        """
+        n = self.weights_size
+        w = self.recombination_weights
+        selected = np.argsort(-fitness_values)[:self.mu]
+        y_selected = y[selected]
+        y_w = w @ y_selected
+        self.mean = self.mean + self.sigma * y_w
+        self.generation += 1
+
+        if self.covariance == 'lowrank':
+            z_w = w @ z[selected]
+            self.ps = (1 - self.cs) * self.ps + np.sqrt(self.mueff * self.cs * (2 - self.cs)) * z_w
+            self.directions = ((1 - self.cc_directions)[:, np.newaxis] * self.directions
+                               + np.sqrt(self.mueff * self.cc_directions * (2 - self.cc_directions))[:, np.newaxis]
+                               * z_w)
+            self.sigma *= np.exp(self.cs / 2 * (np.dot(self.ps, self.ps) / n - 1))
+            return
+
+        # Evolution path for the step size uses the whitened step C^(-1/2) y_w
+        if self.covariance == 'full':
+            whitened = self.B @ ((self.B.T @ y_w) / self.D)
+        else:
+            whitened = y_w / np.sqrt(self.C)
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * whitened
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = (ps_norm / np.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n
+                < 1.4 + 2 / (n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        # Rank-one and rank-mu covariance updates
+        decay = 1 - self.c1 - self.cmu + (1 - hsig) * self.c1 * self.cc * (2 - self.cc)
+        if self.covariance == 'full':
+            self.C = (decay * self.C + self.c1 * np.outer(self.pc, self.pc)
+                      + self.cmu * (y_selected.T * w) @ y_selected)
+
+            # The eigendecomposition is O(D^3), so as in the reference implementation it is
+            # refreshed once the evaluations since the last one exceed lambda/(c1+cmu)/D/10
+            evaluations_since = (self.generation - self.eigen_generation) * self.population_size
+            if evaluations_since > self.population_size / (self.c1 + self.cmu) / n / 10:
+                self.eigen_generation = self.generation
+                self.C = np.triu(self.C) + np.triu(self.C, 1).T
+                eigenvalues, self.B = np.linalg.eigh(self.C)
+                self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        else:
+            self.C = decay * self.C + self.c1 * self.pc ** 2 + self.cmu * w @ (y_selected ** 2)
+
+        self.sigma *= np.exp((self.cs / self.damps) * (ps_norm / self.chi_n - 1))
+
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+
+        Args:
+            k (int): Maximum number of solutions to return
+
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # Candidates are the best solution so far, the distribution mean and the last generation
+        pool = np.vstack([self.mean, self.population])
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, pool)
+        order = np.argsort(losses)
+        return np.vstack([self.best_solution, pool[order[:k - 1]]])[:k]
+
+    def run(self):
+        """
+        Run the CMA-ES optimization process.
+
+        Returns:
+            tuple: Best weights, best accuracy, and history
+        """
+        start_time = time.time()
+        self.budget.start()
+
+        # Initialize the search distribution and evaluate its mean
+        self.initialize_strategy()
+        self.population = self.mean[np.newaxis, :]
+        self.population_fitness = np.atleast_1d(self.calculate_fitness(self.population))
+        self.best_solution = self.mean.copy()
+        self.best_fitness = self.population_fitness[0]
+
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
+
+            # Store initial best
+            self.best_fitness_history.append(self.best_fitness)
+            self.sigma_history.append(self.sigma)
+            tracker.record(self.best_solution)
+
+            # Main optimization loop
+            for iteration in range(self.iterations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.evaluations)
+                if self.stop_reason is not None:
+                    break
+
+                # Sample the generation and score it in one batch
+                with metrics.timer('optimizer_phase_seconds', algorithm='cmaes', phase='sampling'):
+                    z, y = self.sample()
+                    self.population = self.mean + self.sigma * y
+                self.population_fitness = self.calculate_fitness(self.population)
+                avg_fitness = np.mean(self.population_fitness)
+                self.avg_fitness_history.append(avg_fitness)
+
+                # Update best solution if improved
+                best_idx = np.argmax(self.population_fitness)
+                improved = self.population_fitness[best_idx] > self.best_fitness
+                if improved:
+                    self.best_solution = self.population[best_idx].copy()
+                    self.best_fitness = self.population_fitness[best_idx]
+
+                # Adapt the mean, step size and covariance
+                with metrics.timer('optimizer_phase_seconds', algorithm='cmaes', phase='adaptation'):
+                    self.update_distribution(z, y, self.population_fitness)
+
+                # Store best fitness and the best solution snapshot for this generation
+                self.best_fitness_history.append(self.best_fitness)
+                self.sigma_history.append(self.sigma)
+                tracker.record(self.best_solution, improved)
+
+                # Print progress every 10 generations
+                if (iteration + 1) % 10 == 0:
+                    print(f"CMA-ES - Generation {iteration + 1}/{self.iterations}, " +
+                          f"Best Fitness: {self.best_fitness:.4f}, " +
+                          f"Avg Fitness: {avg_fitness:.4f}, Sigma: {self.sigma:.4f}")
+
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='cmaes', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
+
+        end_time = time.time()
+        print(f"CMA-ES optimization completed in {end_time - start_time:.2f} seconds")
+        print(f"Final accuracy: {self.best_accuracy:.4f}")
+
+        return self.best_solution, self.best_accuracy, {
+            'avg_fitness_history': self.avg_fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
+            'sigma_history': self.sigma_history.values(),
+            'best_accuracy_history': self.best_accuracy_history
+        }
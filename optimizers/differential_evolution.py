@@ -0,0 +1,331 @@
+import numpy as np
+import time
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
+
+class DifferentialEvolution:
+    """
+    Implementation of Differential Evolution for optimizing neural network weights.
+
+    Every generation is computed for the whole population at once: donor
+    indices, mutant vectors, binomial crossover masks and selection are array
+    operations, and all trial vectors are scored in one batched forward pass.
+    Strategies:
+
+    - 'rand1': DE/rand/1/bin, v = x_r1 + F (x_r2 - x_r3)
+    - 'best1': DE/best/1/bin, v = x_best + F (x_r1 - x_r2)
+    - 'current_to_pbest': JADE's DE/current-to-pbest/1/bin with an archive of
+      replaced parents and per-individual F and CR adapted from successful trials
+    """
+
+    STRATEGIES = ('rand1', 'best1', 'current_to_pbest')
+
+    def __init__(self, neural_network, X_train, y_train, X_test, y_test,
+                 population_size=50, generations=100, strategy='current_to_pbest',
+                 mutation_factor=0.5, crossover_rate=0.9, p_best=0.05, adaptation_rate=0.1,
+                 accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None):
+        """
+        Initialize the Differential Evolution optimizer.
+
+        Args:
+            neural_network: Neural network model to optimize
+            X_train: Training data features
+            y_train: Training data labels
+            X_test: Test data features
+            y_test: Test data labels
+            population_size (int): Size of the population (at least 4)
+            generations (int): Number of generations to run
+            strategy (str): 'rand1', 'best1' or 'current_to_pbest'
+            mutation_factor (float): Differential weight F (initial mean of F for 'current_to_pbest')
+            crossover_rate (float): Crossover probability CR (initial mean of CR for 'current_to_pbest')
+            p_best (float): Fraction of the population the pbest donor is drawn from
+            adaptation_rate (float): Learning rate c of the F and CR means
+            accuracy_stride (int): Evaluate test accuracy every this many generations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        if population_size < 4:
+            raise ValueError("population_size must be at least 4")
+
+        self.neural_network = neural_network
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.y_test = y_test
+        self.population_size = population_size
+        self.generations = generations
+        self.strategy = strategy
+        self.mutation_factor = mutation_factor
+        self.crossover_rate = crossover_rate
+        self.p_best = p_best
+        self.adaptation_rate = adaptation_rate
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(generations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
+        self.weights_size = neural_network.total_weights
+        self.population = None
+        self.fitness_values = None
+        self.archive = np.empty((0, self.weights_size))
+
+        # Means of the adaptive F and CR distributions ('current_to_pbest' only)
+        self.mean_mutation_factor = mutation_factor
+        self.mean_crossover_rate = crossover_rate
+
+        # History for visualization
+        self.fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_accuracy_history = []
+        self.best_solution = None
+        self.best_fitness = -np.inf
+        self.best_accuracy = 0
+
+    def initialize_population(self):
+        """
+        Initialize the population with random weights.
+
+        Returns:
+            numpy.ndarray: Initial population
+        """
+        # Initialize with small random values
+        self.population = np.random.randn(self.population_size, self.weights_size) * 0.1
+        return self.population
+
+    def calculate_fitness(self, weights):
+        """
+        Calculate the fitness of a solution (higher is better).
+        Uses negative loss as fitness to maximize.
+
+        Args:
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
+
+        Returns:
+            float: Fitness score (one per row when weights is 2D)
+        """
+        # Calculate negative loss (higher is better)
+        with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='de')
+        return -loss
+
+    def donor_indices(self, count):
+        """
+        Draw distinct donor indices for every individual, none equal to its own index.
+
+        Args:
+            count (int): Number of donors per individual
+
+        Returns:
+            numpy.ndarray: Array of shape (population_size, count)
+        """
+        # Random sort keys with the diagonal pushed last give distinct picks without a Python loop
+        keys = np.random.random((self.population_size, self.population_size))
+        np.fill_diagonal(keys, np.inf)
+        return np.argpartition(keys, count, axis=1)[:, :count]
+
+    def sample_control_parameters(self):
+        """
+        Get the F and CR values of every individual for this generation.
+
+        Returns:
+            tuple: Arrays F and CR of shape (population_size,)
+        """
+        n = self.population_size
+        if self.strategy != 'current_to_pbest':
+            return np.full(n, self.mutation_factor), np.full(n, self.crossover_rate)
+
+        # JADE: F ~ Cauchy(mean F, 0.1) truncated to (0, 1], CR ~ N(mean CR, 0.1) clipped to [0, 1]
+        F = self.mean_mutation_factor + 0.1 * np.random.standard_cauchy(n)
+        redraw = F <= 0
+        while np.any(redraw):
+            F[redraw] = self.mean_mutation_factor + 0.1 * np.random.standard_cauchy(np.count_nonzero(redraw))
+            redraw = F <= 0
+        F = np.minimum(F, 1.0)
+        CR = np.clip(np.random.normal(self.mean_crossover_rate, 0.1, n), 0.0, 1.0)
+        return F, CR
+
+    def mutate(self, F):
+        """
+        Build the mutant vectors of the whole population.
+
+        Args:
+            F (numpy.ndarray): Differential weight of each individual
+
+        Returns:
+            numpy.ndarray: Mutant vectors, one row per individual
+        """
+        P = self.population
+        F = F[:, np.newaxis]
+
+        if self.strategy == 'rand1':
+            r = self.donor_indices(3)
+            return P[r[:, 0]] + F * (P[r[:, 1]] - P[r[:, 2]])
+
+        if self.strategy == 'best1':
+            r = self.donor_indices(2)
+            best = P[np.argmax(self.fitness_values)]
+            return best + F * (P[r[:, 0]] - P[r[:, 1]])
+
+        # current-to-pbest/1: pbest from the top p of the population, x_r2 from population + archive
+        n = self.population_size
+        top = max(2, int(np.ceil(self.p_best * n)))
+        pbest = np.argsort(-self.fitness_values)[:top][np.random.randint(0, top, n)]
+        r1 = self.donor_indices(1)[:, 0]
+        union = np.vstack([P, self.archive]) if len(self.archive) else P
+        r2 = np.random.randint(0, len(union), n)
+        clash = (r2 == np.arange(n)) | (r2 == r1)
+        while np.any(clash):
+            r2[clash] = np.random.randint(0, len(union), np.count_nonzero(clash))
+            clash = (r2 == np.arange(n)) | (r2 == r1)
+        return P + F * (P[pbest] - P) + F * (P[r1] - union[r2])
+
+    def crossover(self, mutants, CR):
+        """
+        Binomial crossover of the population with its mutant vectors.
+
+        Args:
+            mutants (numpy.ndarray): Mutant vectors
+            CR (numpy.ndarray): Crossover rate of each individual
+
+        Returns:
+            numpy.ndarray: Trial vectors
+        """
+        mask = np.random.random(mutants.shape) < CR[:, np.newaxis]
+
+        # Every trial takes at least one gene from its mutant
+        mask[np.arange(self.population_size), np.random.randint(0, self.weights_size, self.population_size)] = True
+        return np.where(mask, mutants, self.population)
+
+    def select(self, trials, trial_fitness, F, CR):
+        """
+        Keep each trial that is at least as good as its parent and adapt F and CR.
+
+        Args:
+            trials (numpy.ndarray): Trial vectors
+            trial_fitness (numpy.ndarray): Fitness of each trial
+            F (numpy.ndarray): Differential weight used for each trial
+            CR (numpy.ndarray): Crossover rate used for each trial
+        """
+        replace = trial_fitness >= self.fitness_values
+
+        if self.strategy == 'current_to_pbest':
+            # Replaced parents go to the archive, which is trimmed at random to the population size
+            self.archive = np.vstack([self.archive, self.population[replace]])
+            if len(self.archive) > self.population_size:
+                keep = np.random.choice(len(self.archive), self.population_size, replace=False)
+                self.archive = self.archive[keep]
+
+            # Means move toward the successful values (Lehmer mean for F)
+            successful = replace & (trial_fitness > self.fitness_values)
+            if np.any(successful):
+                c = self.adaptation_rate
+                F_success = F[successful]
+                self.mean_mutation_factor = ((1 - c) * self.mean_mutation_factor
+                                             + c * np.sum(F_success ** 2) / np.sum(F_success))
+                self.mean_crossover_rate = (1 - c) * self.mean_crossover_rate + c * np.mean(CR[successful])
+
+        self.population[replace] = trials[replace]
+        self.fitness_values[replace] = trial_fitness[replace]
+
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+
+        Args:
+            k (int): Maximum number of solutions to return
+
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # The population always holds the best solution found, so its fitness order is enough
+        order = np.argsort(-self.fitness_values)
+        return np.vstack([self.best_solution, self.population[order[:k - 1]]])[:k]
+
+    def run(self):
+        """
+        Run the Differential Evolution optimization process.
+
+        Returns:
+            tuple: Best weights, best accuracy, and history
+        """
+        start_time = time.time()
+        self.budget.start()
+
+        # Initialize and evaluate the population in one batch
+        self.initialize_population()
+        self.fitness_values = self.calculate_fitness(self.population)
+        best_idx = np.argmax(self.fitness_values)
+        self.best_solution = self.population[best_idx].copy()
+        self.best_fitness = self.fitness_values[best_idx]
+
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
+
+            # Store initial best
+            self.best_fitness_history.append(self.best_fitness)
+            tracker.record(self.best_solution)
+
+            # Main evolution loop
+            for generation in range(self.generations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.evaluations)
+                if self.stop_reason is not None:
+                    break
+
+                # Mutation and crossover for the whole population
+                with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='mutation'):
+                    F, CR = self.sample_control_parameters()
+                    mutants = self.mutate(F)
+                with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='crossover'):
+                    trials = self.crossover(mutants, CR)
+
+                # Score all trials in one batch, then keep the ones that are at least as good
+                trial_fitness = self.calculate_fitness(trials)
+                with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='selection'):
+                    self.select(trials, trial_fitness, F, CR)
+                avg_fitness = np.mean(self.fitness_values)
+                self.fitness_history.append(avg_fitness)
+
+                # Update best solution if improved
+                best_idx = np.argmax(self.fitness_values)
+                improved = self.fitness_values[best_idx] > self.best_fitness
+                if improved:
+                    self.best_solution = self.population[best_idx].copy()
+                    self.best_fitness = self.fitness_values[best_idx]
+
+                # Store best fitness and the best solution snapshot for this generation
+                self.best_fitness_history.append(self.best_fitness)
+                tracker.record(self.best_solution, improved)
+
+                # Print progress every 10 generations
+                if (generation + 1) % 10 == 0:
+                    print(f"DE - Generation {generation + 1}/{self.generations}, " +
+                          f"Best Fitness: {self.best_fitness:.4f}, " +
+                          f"Avg Fitness: {avg_fitness:.4f}")
+
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='de', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
+
+        end_time = time.time()
+        print(f"DE optimization completed in {end_time - start_time:.2f} seconds")
+        print(f"Final accuracy: {self.best_accuracy:.4f}")
+
+        return self.best_solution, self.best_accuracy, {
+            'fitness_history': self.fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
+            'best_accuracy_history': self.best_accuracy_history
+        }
@@ -1,13 +1,31 @@
 import numpy as np
 import time
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
 
 class GeneticAlgorithm:
     """
     Implementation of a Genetic Algorithm for optimizing neural network weights.
+    
+    Two crossover modes are supported: 'point' cuts the flat weight vector at a
+    random point, 'unit' lets each child inherit whole hidden neurons (incoming
+    weights, bias and outgoing weights) from either parent. In 'unit' mode each
+    individual's hidden pre-activations on the training set are cached, so a
+    child's are stitched from its parents' columns and only its mutated weights
+    are applied on top, instead of recomputing X @ W1.
     """
     
+    # Above this fraction of changed hidden-layer weights, recomputing the
+    # children's hidden pre-activations with one matmul beats sparse updates
+    SPARSE_MUTATION_FRACTION = 0.02
+    
     def __init__(self, neural_network, X_train, y_train, X_test, y_test, 
-                 population_size=50, generations=100, mutation_rate=0.1):
+                 population_size=50, generations=100, mutation_rate=0.1,
+                 accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None,
+                 crossover='point', cache_mb=64):
         """
         Initialize the Genetic Algorithm optimizer.
         
@@ -20,7 +38,19 @@ class GeneticAlgorithm:
             population_size (int): Size of the population
             generations (int): Number of generations to run
             mutation_rate (float): Probability of mutation
+            accuracy_stride (int): Evaluate test accuracy every this many generations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
+            crossover (str): 'point' for single-point crossover, 'unit' for neuron-aligned
+                crossover with cached hidden activations
+            cache_mb (float): Memory cap for the cached hidden activations in 'unit' mode;
+                above it children are evaluated with a full forward pass
         """
+        if crossover not in ('point', 'unit'):
+            raise ValueError(f"Unknown crossover mode: {crossover}")
+        
         self.neural_network = neural_network
         self.X_train = X_train
         self.y_train = y_train
@@ -29,15 +59,30 @@ class GeneticAlgorithm:
         self.population_size = population_size
         self.generations = generations
         self.mutation_rate = mutation_rate
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(generations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
         self.weights_size = neural_network.total_weights
         self.population = None
-        self.fitness_history = []
-        self.best_fitness_history = []
+        self.fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
         self.best_accuracy_history = []
         self.best_solution = None
         self.best_fitness = -np.inf
         self.best_accuracy = 0
         
+        # Neuron-aligned crossover ('unit' mode): the unit each weight belongs to,
+        # the population's fitness and its hidden pre-activations (population, hidden, samples)
+        self.crossover_mode = crossover
+        self.units = neural_network.weight_units()
+        self.fitness_values = None
+        cache_bytes = population_size * neural_network.hidden_size * len(X_train) * 8
+        self.use_hidden_cache = crossover == 'unit' and cache_bytes <= cache_mb * 1024 * 1024
+        self.hidden_cache = None
+        self.inputs = np.ascontiguousarray(np.vstack([X_train.T, np.ones(len(X_train))])) if self.use_hidden_cache else None
+        
     def initialize_population(self):
         """
         Initialize the population with random weights.
@@ -60,13 +105,17 @@ class GeneticAlgorithm:
         Uses negative loss as fitness to maximize.
         
         Args:
-            weights (numpy.ndarray): Weights to evaluate
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
             
         Returns:
-            float: Fitness score
+            float: Fitness score (one per row when weights is 2D)
         """
         # Calculate negative loss (higher is better)
-        loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='ga')
         return -loss
     
     def selection(self, k=3):
@@ -81,13 +130,9 @@ class GeneticAlgorithm:
         """
         # Select k random individuals
         idx = np.random.randint(0, self.population_size, k)
-        selected = self.population[idx]
-        
-        # Calculate fitness for each selected individual
-        fitness_values = np.array([self.calculate_fitness(ind) for ind in selected])
         
-        # Return the individual with the highest fitness
-        return selected[np.argmax(fitness_values)]
+        # Return the one with the highest stored fitness (no re-evaluation)
+        return self.population[idx[np.argmax(self.fitness_values[idx])]]
     
     def crossover(self, parent1, parent2):
         """
@@ -105,6 +150,109 @@ class GeneticAlgorithm:
         child = np.concatenate([parent1[:crossover_point], parent2[crossover_point:]])
         return child
     
+    def unit_crossover(self, parents1, parents2):
+        """
+        Neuron-aligned crossover for a batch of children.
+        
+        Args:
+            parents1 (numpy.ndarray): Population indices of the first parents
+            parents2 (numpy.ndarray): Population indices of the second parents
+            
+        Returns:
+            tuple: Children of shape (n, weights_size) and a mask of shape
+                (n, units) that is True where a unit came from the first parent
+        """
+        from_first = np.random.random((len(parents1), self.units.max() + 1)) < 0.5
+        children = np.where(from_first[:, self.units], self.population[parents1], self.population[parents2])
+        return children, from_first
+    
+    def mutate_hidden(self, hidden, changes):
+        """
+        Apply weight changes to cached hidden pre-activations in place.
+        
+        Only changes to W1 and b1 affect the hidden layer; each changed weight
+        adds its input column (or 1 for a bias) times the change to its unit.
+        
+        Args:
+            hidden (numpy.ndarray): Pre-activations of shape (n, hidden_size, samples)
+            changes (numpy.ndarray): Weight changes of shape (n, weights_size), mostly zero
+        """
+        nn = self.neural_network
+        W1_size = nn.input_size * nn.hidden_size
+        rows, indices = np.nonzero(changes[:, :W1_size + nn.hidden_size])
+        if len(rows) == 0:
+            return
+        # Group the changes by (child, unit) so each cached column is updated once
+        keys = rows * nn.hidden_size + self.units[indices]
+        order = np.argsort(keys, kind='stable')
+        keys, indices = keys[order], indices[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        
+        columns = np.where(indices < W1_size, indices // nn.hidden_size, nn.input_size)
+        contributions = self.inputs[columns] * changes[rows[order], indices][:, np.newaxis]
+        grouped = keys[starts]
+        hidden[grouped // nn.hidden_size, grouped % nn.hidden_size] += np.add.reduceat(contributions, starts, axis=0)
+    
+    def evolve_units(self):
+        """
+        Evolve the population for one generation with neuron-aligned crossover.
+        
+        The whole generation is built and scored as one batch. Tournaments use
+        the stored fitness values, and children's hidden pre-activations are
+        stitched from the cache when it is enabled.
+        
+        Returns:
+            numpy.ndarray: New population
+        """
+        children_count = self.population_size - 1
+        
+        # Tournament selection (k=3) on the stored fitness values
+        with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='selection'):
+            entrants = np.random.randint(0, self.population_size, (2, children_count, 3))
+            winners = np.argmax(self.fitness_values[entrants], axis=2)
+            parents1, parents2 = np.take_along_axis(entrants, winners[..., np.newaxis], axis=2)[..., 0]
+        
+        # Crossover
+        with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='crossover'):
+            children, from_first = self.unit_crossover(parents1, parents2)
+        
+        # Mutation
+        with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='mutation'):
+            mutation_mask = np.random.random(children.shape) < self.mutation_rate
+            changes = np.where(mutation_mask, np.random.randn(*children.shape) * 0.1, 0.0)
+            children += changes
+        
+        # Children's hidden pre-activations: stitched from the parents' cached columns plus
+        # sparse updates for the mutated weights, unless so many changed that a matmul is cheaper
+        if self.use_hidden_cache:
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='hidden_cache'):
+                nn = self.neural_network
+                hidden_weights = (nn.input_size + 1) * nn.hidden_size
+                changed = np.count_nonzero(mutation_mask[:, :hidden_weights])
+                if changed <= self.SPARSE_MUTATION_FRACTION * children_count * hidden_weights:
+                    hidden_first = from_first[:, :nn.hidden_size, np.newaxis]
+                    hidden = np.where(hidden_first, self.hidden_cache[parents1], self.hidden_cache[parents2])
+                    self.mutate_hidden(hidden, changes)
+                else:
+                    hidden = nn.hidden_preactivations(self.X_train, children)
+        
+        # Score the children; the best individual carries over unchanged (elitism)
+        if self.use_hidden_cache:
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='fitness'):
+                loss = self.neural_network.loss_from_hidden(self.y_train, hidden, children)
+            self.evaluations += children_count
+            metrics.inc('fitness_evaluations_total', children_count, algorithm='ga')
+            fitness = -loss
+        else:
+            fitness = self.calculate_fitness(children)
+        
+        best_idx = np.argmax(self.fitness_values)
+        self.population = np.vstack([self.population[best_idx], children])
+        self.fitness_values = np.concatenate([[self.fitness_values[best_idx]], fitness])
+        if self.use_hidden_cache:
+            self.hidden_cache = np.concatenate([self.hidden_cache[best_idx][np.newaxis], hidden])
+        return self.population
+    
     def mutation(self, individual):
         """
         Apply mutation to an individual.
@@ -130,33 +278,69 @@ class GeneticAlgorithm:
         """
         Evolve the population for one generation.
         
+        Elitism and tournaments use the stored fitness values, and the children
+        are scored once as a batch, so a generation costs population_size - 1
+        evaluations. If the run is cancelled or out of time while children are
+        bred, the remaining slots keep their current individuals.
+        
         Returns:
             numpy.ndarray: New population
         """
-        new_population = np.zeros_like(self.population)
+        new_population = self.population.copy()
+        new_fitness = self.fitness_values.copy()
         
         # Keep the best individual (elitism)
-        best_idx = np.argmax([self.calculate_fitness(ind) for ind in self.population])
+        best_idx = np.argmax(self.fitness_values)
         new_population[0] = self.population[best_idx]
+        new_fitness[0] = self.fitness_values[best_idx]
         
         # Create the rest of the new population
+        bred = 1
         for i in range(1, self.population_size):
+            if self.budget.stop_reason(self.evaluations) is not None:
+                break
+            
             # Selection
-            parent1 = self.selection()
-            parent2 = self.selection()
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='selection'):
+                parent1 = self.selection()
+                parent2 = self.selection()
             
             # Crossover
-            child = self.crossover(parent1, parent2)
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='crossover'):
+                child = self.crossover(parent1, parent2)
             
             # Mutation
-            child = self.mutation(child)
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='mutation'):
+                child = self.mutation(child)
             
             # Add to new population
             new_population[i] = child
-            
+            bred = i + 1
+        
+        # Score the children in one batch
+        if bred > 1:
+            new_fitness[1:bred] = self.calculate_fitness(new_population[1:bred])
+        
         self.population = new_population
+        self.fitness_values = new_fitness
         return new_population
     
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+        
+        Args:
+            k (int): Maximum number of solutions to return
+            
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # Candidates are the best individual so far plus the final population
+        pool = self.population
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, pool)
+        order = np.argsort(losses)
+        return np.vstack([self.best_solution, pool[order[:k - 1]]])[:k]
+    
     def run(self):
         """
         Run the genetic algorithm optimization process.
@@ -165,56 +349,73 @@ class GeneticAlgorithm:
             tuple: Best weights, best accuracy, and history
         """
         start_time = time.time()
+        self.budget.start()
         
         # Initialize population
         self.initialize_population()
         
-        # Evaluate initial population
-        fitness_values = np.array([self.calculate_fitness(ind) for ind in self.population])
-        best_idx = np.argmax(fitness_values)
-        self.best_solution = self.population[best_idx].copy()
-        self.best_fitness = fitness_values[best_idx]
-        self.best_accuracy = self.neural_network.calculate_accuracy(self.X_test, self.y_test, self.best_solution)
-        
-        # Store initial best
-        self.best_fitness_history.append(self.best_fitness)
-        self.best_accuracy_history.append(self.best_accuracy)
-        
-        # Main evolution loop
-        for generation in range(self.generations):
-            # Evolve population
-            self.evolve()
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
             
-            # Evaluate new population
-            fitness_values = np.array([self.calculate_fitness(ind) for ind in self.population])
-            avg_fitness = np.mean(fitness_values)
-            self.fitness_history.append(avg_fitness)
-            
-            # Update best solution if improved
+            # Evaluate initial population as one batch; the fitness (and, in unit mode,
+            # the hidden activations) are kept for the next generation
+            self.fitness_values = fitness_values = self.calculate_fitness(self.population)
+            if self.crossover_mode == 'unit' and self.use_hidden_cache:
+                self.hidden_cache = self.neural_network.hidden_preactivations(self.X_train, self.population)
             best_idx = np.argmax(fitness_values)
-            if fitness_values[best_idx] > self.best_fitness:
-                self.best_solution = self.population[best_idx].copy()
-                self.best_fitness = fitness_values[best_idx]
-                self.best_accuracy = self.neural_network.calculate_accuracy(
-                    self.X_test, self.y_test, self.best_solution
-                )
+            self.best_solution = self.population[best_idx].copy()
+            self.best_fitness = fitness_values[best_idx]
             
-            # Store best fitness and accuracy for this generation
+            # Store initial best
             self.best_fitness_history.append(self.best_fitness)
-            self.best_accuracy_history.append(self.best_accuracy)
+            tracker.record(self.best_solution)
+            
+            # Main evolution loop
+            for generation in range(self.generations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.evaluations)
+                if self.stop_reason is not None:
+                    break
+                
+                # Evolve population; children are scored while they are created
+                if self.crossover_mode == 'unit':
+                    self.evolve_units()
+                else:
+                    self.evolve()
+                fitness_values = self.fitness_values
+                avg_fitness = np.mean(fitness_values)
+                self.fitness_history.append(avg_fitness)
+                
+                # Update best solution if improved
+                best_idx = np.argmax(fitness_values)
+                improved = fitness_values[best_idx] > self.best_fitness
+                if improved:
+                    self.best_solution = self.population[best_idx].copy()
+                    self.best_fitness = fitness_values[best_idx]
+                
+                # Store best fitness and the best solution snapshot for this generation
+                self.best_fitness_history.append(self.best_fitness)
+                tracker.record(self.best_solution, improved)
+                
+                # Print progress every 10 generations
+                if (generation + 1) % 10 == 0:
+                    print(f"GA - Generation {generation + 1}/{self.generations}, " +
+                          f"Best Fitness: {self.best_fitness:.4f}, " +
+                          f"Avg Fitness: {avg_fitness:.4f}")
             
-            # Print progress every 10 generations
-            if (generation + 1) % 10 == 0:
-                print(f"GA - Generation {generation + 1}/{self.generations}, " +
-                      f"Best Accuracy: {self.best_accuracy:.4f}, " +
-                      f"Avg Fitness: {avg_fitness:.4f}")
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='ga', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
         
         end_time = time.time()
         print(f"GA optimization completed in {end_time - start_time:.2f} seconds")
         print(f"Final accuracy: {self.best_accuracy:.4f}")
         
         return self.best_solution, self.best_accuracy, {
-            'fitness_history': self.fitness_history,
-            'best_fitness_history': self.best_fitness_history,
+            'fitness_history': self.fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
             'best_accuracy_history': self.best_accuracy_history
         }
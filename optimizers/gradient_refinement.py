@@ -0,0 +1,210 @@
+import numpy as np
+import time
+
+class GradientRefiner:
+    """
+    Gradient-based local refinement of solutions found by a metaheuristic.
+
+    The metaheuristic does the global search; this stage takes its top-k
+    solutions and polishes them with the network's analytic gradient, either
+    with mini-batch gradient descent (all candidates updated together as one
+    stacked array) or with L-BFGS (one candidate at a time, full batch).
+    """
+
+    def __init__(self, neural_network, X_train, y_train, X_test, y_test,
+                 method='lbfgs', top_k=5, steps=100, learning_rate=0.1,
+                 batch_size=32, momentum=0.9, history_size=10, tolerance=1e-6):
+        """
+        Initialize the gradient refiner.
+
+        Args:
+            neural_network: Neural network model to optimize
+            X_train: Training data features
+            y_train: Training data labels
+            X_test: Test data features
+            y_test: Test data labels
+            method (str): 'lbfgs' or 'sgd' (mini-batch gradient descent with momentum)
+            top_k (int): Number of candidate solutions to refine (at least 1)
+            steps (int): Number of update steps per candidate
+            learning_rate (float): Step size for mini-batch gradient descent
+            batch_size (int): Mini-batch size for gradient descent
+            momentum (float): Momentum coefficient for gradient descent
+            history_size (int): Number of correction pairs kept by L-BFGS
+            tolerance (float): Gradient norm below which L-BFGS stops early
+        """
+        if method not in ('lbfgs', 'sgd'):
+            raise ValueError(f"Unknown refinement method: {method}")
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+
+        self.neural_network = neural_network
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.y_test = y_test
+        self.method = method
+        self.top_k = top_k
+        self.steps = steps
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.momentum = momentum
+        self.history_size = history_size
+        self.tolerance = tolerance
+
+        # Initialize best solution tracking
+        self.best_solution = None
+        self.best_fitness = -np.inf
+        self.best_accuracy = 0
+
+        # History for visualization
+        self.best_fitness_history = []
+
+    def refine_sgd(self, candidates):
+        """
+        Refine all candidates together with mini-batch gradient descent.
+
+        Args:
+            candidates (numpy.ndarray): Array of shape (k, total_weights)
+
+        Returns:
+            numpy.ndarray: Refined candidates
+        """
+        weights = candidates.copy()
+        velocity = np.zeros_like(weights)
+        n_samples = self.X_train.shape[0]
+        batch_size = min(self.batch_size, n_samples)
+        order = np.random.permutation(n_samples)
+        position = 0
+
+        for step in range(self.steps):
+            # Start a new epoch when the current permutation is exhausted
+            if position + batch_size > n_samples:
+                order = np.random.permutation(n_samples)
+                position = 0
+            batch = order[position:position + batch_size]
+            position += batch_size
+
+            # One gradient evaluation covers every candidate
+            _, grad = self.neural_network.loss_and_gradient(
+                self.X_train[batch], self.y_train[batch], weights
+            )
+            velocity = self.momentum * velocity - self.learning_rate * grad
+            weights += velocity
+
+            losses = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+            self.best_fitness_history.append(float(-np.min(losses)))
+
+        return weights
+
+    def refine_lbfgs(self, weights):
+        """
+        Refine a single candidate with full-batch L-BFGS and a backtracking line search.
+
+        Args:
+            weights (numpy.ndarray): Flat array of weights
+
+        Returns:
+            tuple: Refined weights and the loss history for this candidate
+        """
+        x = weights.copy()
+        loss, grad = self.neural_network.loss_and_gradient(self.X_train, self.y_train, x)
+        s_list = []
+        y_list = []
+        loss_history = [float(loss)]
+
+        for step in range(self.steps):
+            if np.linalg.norm(grad) < self.tolerance:
+                break
+
+            # Two-loop recursion to apply the inverse Hessian approximation
+            q = grad.copy()
+            alphas = []
+            for s, y in zip(reversed(s_list), reversed(y_list)):
+                alpha = np.dot(s, q) / np.dot(y, s)
+                q -= alpha * y
+                alphas.append(alpha)
+            if s_list:
+                q *= np.dot(s_list[-1], y_list[-1]) / np.dot(y_list[-1], y_list[-1])
+            for (s, y), alpha in zip(zip(s_list, y_list), reversed(alphas)):
+                beta = np.dot(y, q) / np.dot(y, s)
+                q += s * (alpha - beta)
+            direction = -q
+
+            # Fall back to steepest descent if the direction is not a descent direction
+            slope = np.dot(grad, direction)
+            if slope >= 0:
+                direction = -grad
+                slope = -np.dot(grad, grad)
+                s_list.clear()
+                y_list.clear()
+
+            # Backtracking line search (Armijo condition)
+            step_length = 1.0
+            while True:
+                x_new = x + step_length * direction
+                loss_new, grad_new = self.neural_network.loss_and_gradient(
+                    self.X_train, self.y_train, x_new
+                )
+                if loss_new <= loss + 1e-4 * step_length * slope or step_length < 1e-10:
+                    break
+                step_length *= 0.5
+
+            s = x_new - x
+            y = grad_new - grad
+            if np.dot(s, y) > 1e-10:
+                s_list.append(s)
+                y_list.append(y)
+                if len(s_list) > self.history_size:
+                    s_list.pop(0)
+                    y_list.pop(0)
+
+            x, loss, grad = x_new, loss_new, grad_new
+            loss_history.append(float(loss))
+
+        return x, loss_history
+
+    def refine(self, candidates):
+        """
+        Refine the candidate solutions and keep the best one.
+
+        Args:
+            candidates (numpy.ndarray): Array of shape (k, total_weights), best first
+
+        Returns:
+            tuple: Best weights, best accuracy, and history
+        """
+        start_time = time.time()
+        candidates = np.atleast_2d(np.asarray(candidates, dtype=float))[:self.top_k]
+
+        if self.method == 'sgd':
+            refined = self.refine_sgd(candidates)
+        else:
+            refined = []
+            loss_histories = []
+            for candidate in candidates:
+                weights, loss_history = self.refine_lbfgs(candidate)
+                refined.append(weights)
+                loss_histories.append(loss_history)
+            refined = np.array(refined)
+
+            # Best loss across candidates at each step (shorter runs hold their final value)
+            length = max(len(h) for h in loss_histories)
+            padded = np.array([h + [h[-1]] * (length - len(h)) for h in loss_histories])
+            self.best_fitness_history = (-np.min(padded, axis=0)).tolist()
+
+        # Keep the refined candidate with the lowest training loss
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, refined)
+        best_idx = np.argmin(losses)
+        self.best_solution = refined[best_idx].copy()
+        self.best_fitness = -losses[best_idx]
+        self.best_accuracy = self.neural_network.calculate_accuracy(
+            self.X_test, self.y_test, self.best_solution
+        )
+
+        end_time = time.time()
+        print(f"Gradient refinement ({self.method}) completed in {end_time - start_time:.2f} seconds")
+        print(f"Final accuracy: {self.best_accuracy:.4f}")
+
+        return self.best_solution, self.best_accuracy, {
+            'best_fitness_history': self.best_fitness_history
+        }
@@ -1,14 +1,26 @@
 import numpy as np
 import time
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
 
 class ParticleSwarmOptimization:
     """
     Implementation of Particle Swarm Optimization for neural network weights.
+    
+    The social term pulls each particle towards the best personal best in its
+    neighbourhood. The 'global' topology makes that the whole swarm (gbest);
+    'ring', 'von_neumann' and 'random' use smaller neighbourhoods that slow
+    down information flow and keep large swarms from collapsing early.
     """
     
     def __init__(self, neural_network, X_train, y_train, X_test, y_test, 
                  swarm_size=30, iterations=100, inertia=0.7, 
-                 cognitive_coef=1.5, social_coef=1.5):
+                 cognitive_coef=1.5, social_coef=1.5, topology='global',
+                 neighbors=3, inertia_schedule='constant', final_inertia=0.4,
+                 accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None):
         """
         Initialize the PSO optimizer.
         
@@ -23,7 +35,24 @@ class ParticleSwarmOptimization:
             inertia (float): Inertia weight
             cognitive_coef (float): Cognitive coefficient (c1)
             social_coef (float): Social coefficient (c2)
+            topology (str): 'global', 'ring', 'von_neumann' or 'random'
+            neighbors (int): Number of random informants per particle ('random' topology)
+            inertia_schedule (str): 'constant', 'linear' (inertia down to final_inertia)
+                or 'constriction' (Clerc's constriction factor, needs c1 + c2 > 4)
+            final_inertia (float): Inertia at the last iteration for the 'linear' schedule
+            accuracy_stride (int): Evaluate test accuracy every this many iterations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
         """
+        if topology not in ('global', 'ring', 'von_neumann', 'random'):
+            raise ValueError(f"Unknown PSO topology: {topology}")
+        if inertia_schedule not in ('constant', 'linear', 'constriction'):
+            raise ValueError(f"Unknown inertia schedule: {inertia_schedule}")
+        if inertia_schedule == 'constriction' and cognitive_coef + social_coef <= 4:
+            raise ValueError("The constriction schedule needs cognitive_coef + social_coef > 4")
+        
         self.neural_network = neural_network
         self.X_train = X_train
         self.y_train = y_train
@@ -34,6 +63,15 @@ class ParticleSwarmOptimization:
         self.inertia = inertia
         self.cognitive_coef = cognitive_coef
         self.social_coef = social_coef
+        self.topology = topology
+        self.neighbors = neighbors
+        self.inertia_schedule = inertia_schedule
+        self.final_inertia = final_inertia
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(iterations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
         self.weights_size = neural_network.total_weights
         
         # Initialize swarm attributes
@@ -45,9 +83,12 @@ class ParticleSwarmOptimization:
         self.global_best_fitness = -np.inf
         self.best_accuracy = 0
         
+        # Neighbourhood index matrix (swarm_size, neighbourhood size), None for 'global'
+        self.neighborhoods = None
+        
         # History for visualization
-        self.avg_fitness_history = []
-        self.best_fitness_history = []
+        self.avg_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
         self.best_accuracy_history = []
     
     def initialize_swarm(self):
@@ -62,17 +103,75 @@ class ParticleSwarmOptimization:
         
         # Initialize personal best positions and fitnesses
         self.personal_best_positions = self.positions.copy()
-        self.personal_best_fitnesses = np.array([
-            self.calculate_fitness(pos) for pos in self.positions
-        ])
+        self.personal_best_fitnesses = self.calculate_fitness(self.positions)
         
         # Initialize global best
         best_idx = np.argmax(self.personal_best_fitnesses)
         self.global_best_position = self.personal_best_positions[best_idx].copy()
         self.global_best_fitness = self.personal_best_fitnesses[best_idx]
-        self.best_accuracy = self.neural_network.calculate_accuracy(
-            self.X_test, self.y_test, self.global_best_position
-        )
+        
+        # Build the neighbourhood structure
+        self.build_neighborhoods()
+    
+    def build_neighborhoods(self):
+        """
+        Build the neighbourhood index matrix for the selected topology.
+        
+        Each row lists the particles (including the particle itself) whose
+        personal bests inform that particle.
+        """
+        index = np.arange(self.swarm_size)
+        
+        if self.topology == 'global':
+            self.neighborhoods = None
+        elif self.topology == 'ring':
+            # Left and right neighbours on a ring
+            self.neighborhoods = np.column_stack([
+                index, (index - 1) % self.swarm_size, (index + 1) % self.swarm_size
+            ])
+        elif self.topology == 'von_neumann':
+            # North, south, east and west neighbours on a wrapped grid
+            columns = max(1, int(np.sqrt(self.swarm_size)))
+            self.neighborhoods = np.column_stack([
+                index,
+                (index - 1) % self.swarm_size, (index + 1) % self.swarm_size,
+                (index - columns) % self.swarm_size, (index + columns) % self.swarm_size
+            ])
+        else:
+            # Each particle is informed by k randomly chosen particles
+            informants = np.random.randint(0, self.swarm_size, (self.swarm_size, self.neighbors))
+            self.neighborhoods = np.column_stack([index, informants])
+    
+    def get_neighborhood_best_positions(self):
+        """
+        Get the best personal best position in each particle's neighbourhood.
+        
+        Returns:
+            numpy.ndarray: Array of shape (swarm_size, weights_size), or the
+            global best position for the 'global' topology
+        """
+        if self.neighborhoods is None:
+            return self.global_best_position
+        
+        neighbor_fitnesses = self.personal_best_fitnesses[self.neighborhoods]
+        best_columns = np.argmax(neighbor_fitnesses, axis=1)
+        best_particles = self.neighborhoods[np.arange(self.swarm_size), best_columns]
+        return self.personal_best_positions[best_particles]
+    
+    def get_inertia(self, iteration):
+        """
+        Get the inertia weight for an iteration according to the schedule.
+        
+        Args:
+            iteration (int): Current iteration (0-based)
+            
+        Returns:
+            float: Inertia weight
+        """
+        if self.inertia_schedule == 'linear':
+            progress = self.budget.progress(iteration, self.evaluations)
+            return self.inertia - (self.inertia - self.final_inertia) * progress
+        return self.inertia
     
     def calculate_fitness(self, weights):
         """
@@ -80,18 +179,25 @@ class ParticleSwarmOptimization:
         Uses negative loss as fitness to maximize.
         
         Args:
-            weights (numpy.ndarray): Weights to evaluate
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
             
         Returns:
-            float: Fitness score
+            float: Fitness score (one per row when weights is 2D)
         """
         # Calculate negative loss (higher is better)
-        loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        with metrics.timer('optimizer_phase_seconds', algorithm='pso', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='pso')
         return -loss
     
-    def update_velocities(self):
+    def update_velocities(self, iteration=0):
         """
         Update the velocities of all particles.
+        
+        Args:
+            iteration (int): Current iteration, used by the inertia schedule
         """
         # Random coefficients
         r1 = np.random.random((self.swarm_size, self.weights_size))
@@ -100,11 +206,16 @@ class ParticleSwarmOptimization:
         # Cognitive component (personal best influence)
         cognitive = self.cognitive_coef * r1 * (self.personal_best_positions - self.positions)
         
-        # Social component (global best influence)
-        social = self.social_coef * r2 * (self.global_best_position - self.positions)
+        # Social component (neighbourhood best influence)
+        social = self.social_coef * r2 * (self.get_neighborhood_best_positions() - self.positions)
         
         # Update velocities
-        self.velocities = (self.inertia * self.velocities) + cognitive + social
+        if self.inertia_schedule == 'constriction':
+            phi = self.cognitive_coef + self.social_coef
+            chi = 2.0 / abs(2.0 - phi - np.sqrt(phi ** 2 - 4.0 * phi))
+            self.velocities = chi * (self.velocities + cognitive + social)
+        else:
+            self.velocities = (self.get_inertia(iteration) * self.velocities) + cognitive + social
         
         # Limit velocity to prevent explosion
         max_velocity = 0.1
@@ -120,10 +231,8 @@ class ParticleSwarmOptimization:
         """
         Update personal best positions and fitnesses.
         """
-        # Calculate current fitnesses
-        current_fitnesses = np.array([
-            self.calculate_fitness(pos) for pos in self.positions
-        ])
+        # Calculate current fitnesses for the whole swarm in one batch
+        current_fitnesses = self.calculate_fitness(self.positions)
         
         # Find particles that improved
         improved = current_fitnesses > self.personal_best_fitnesses
@@ -135,14 +244,36 @@ class ParticleSwarmOptimization:
     def update_global_best(self):
         """
         Update global best position and fitness.
+        
+        Returns:
+            bool: True if the global best improved
         """
         best_idx = np.argmax(self.personal_best_fitnesses)
         if self.personal_best_fitnesses[best_idx] > self.global_best_fitness:
             self.global_best_position = self.personal_best_positions[best_idx].copy()
             self.global_best_fitness = self.personal_best_fitnesses[best_idx]
-            self.best_accuracy = self.neural_network.calculate_accuracy(
-                self.X_test, self.y_test, self.global_best_position
-            )
+            return True
+        
+        if self.topology == 'random':
+            # Re-draw the random informants when the swarm stops improving
+            self.build_neighborhoods()
+        return False
+    
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+        
+        Args:
+            k (int): Maximum number of solutions to return
+            
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # Candidates are the global best plus every particle's personal best
+        pool = self.personal_best_positions
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, pool)
+        order = np.argsort(losses)
+        return np.vstack([self.global_best_position, pool[order[:k - 1]]])[:k]
     
     def run(self):
         """
@@ -152,44 +283,61 @@ class ParticleSwarmOptimization:
             tuple: Best weights, best accuracy, and history
         """
         start_time = time.time()
+        self.budget.start()
         
         # Initialize swarm
         self.initialize_swarm()
         
-        # Store initial best
-        self.best_fitness_history.append(self.global_best_fitness)
-        self.best_accuracy_history.append(self.best_accuracy)
-        
-        # Main optimization loop
-        for iteration in range(self.iterations):
-            # Update velocities and positions
-            self.update_velocities()
-            self.update_positions()
-            
-            # Update personal and global bests
-            self.update_personal_bests()
-            self.update_global_best()
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
             
-            # Calculate average fitness for this iteration
-            avg_fitness = np.mean(self.personal_best_fitnesses)
-            self.avg_fitness_history.append(avg_fitness)
-            
-            # Store best fitness and accuracy for this iteration
+            # Store initial best
             self.best_fitness_history.append(self.global_best_fitness)
-            self.best_accuracy_history.append(self.best_accuracy)
+            tracker.record(self.global_best_position)
+            
+            # Main optimization loop
+            for iteration in range(self.iterations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.evaluations)
+                if self.stop_reason is not None:
+                    break
+                
+                # Update velocities and positions
+                with metrics.timer('optimizer_phase_seconds', algorithm='pso', phase='movement'):
+                    self.update_velocities(iteration)
+                    self.update_positions()
+                
+                # Update personal and global bests
+                self.update_personal_bests()
+                improved = self.update_global_best()
+                
+                # Calculate average fitness for this iteration
+                avg_fitness = np.mean(self.personal_best_fitnesses)
+                self.avg_fitness_history.append(avg_fitness)
+                
+                # Store best fitness and the best solution snapshot for this iteration
+                self.best_fitness_history.append(self.global_best_fitness)
+                tracker.record(self.global_best_position, improved)
+                
+                # Print progress every 10 iterations
+                if (iteration + 1) % 10 == 0:
+                    print(f"PSO - Iteration {iteration + 1}/{self.iterations}, " +
+                          f"Best Fitness: {self.global_best_fitness:.4f}, " +
+                          f"Avg Fitness: {avg_fitness:.4f}")
             
-            # Print progress every 10 iterations
-            if (iteration + 1) % 10 == 0:
-                print(f"PSO - Iteration {iteration + 1}/{self.iterations}, " +
-                      f"Best Accuracy: {self.best_accuracy:.4f}, " +
-                      f"Avg Fitness: {avg_fitness:.4f}")
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='pso', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
         
         end_time = time.time()
         print(f"PSO optimization completed in {end_time - start_time:.2f} seconds")
         print(f"Final accuracy: {self.best_accuracy:.4f}")
         
         return self.global_best_position, self.best_accuracy, {
-            'avg_fitness_history': self.avg_fitness_history,
-            'best_fitness_history': self.best_fitness_history,
+            'avg_fitness_history': self.avg_fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
             'best_accuracy_history': self.best_accuracy_history
         }
@@ -1,15 +1,32 @@
 import numpy as np
 import time
-from collections import deque
+from utils.accuracy_tracker import AccuracyTracker
+from utils.metrics import metrics
+from utils.history import HistoryBuffer
+from optimizers.budget import RunBudget
 
 class TabuSearch:
     """
     Implementation of Tabu Search for neural network weights optimization.
+    
+    Tabu memory is a dict from move attribute to the iteration its tenure
+    expires, so lookups are O(1). Moving a weight in one direction makes
+    moving that weight back tabu for tabu_list_size iterations. The optional
+    solution tabu hashes visited solutions with locality-sensitive hashing,
+    so neighbors that fall back into a recently visited region are rejected
+    before they are evaluated.
+    
+    With move_size set, each neighbor changes only that many weights and is
+    evaluated incrementally from the current solution's cached activations,
+    which makes much larger neighborhoods affordable.
     """
     
     def __init__(self, neural_network, X_train, y_train, X_test, y_test, 
                  iterations=100, tabu_list_size=10, neighborhood_size=20,
-                 step_size=0.1):
+                 step_size=0.1, accuracy_stride=1, background_accuracy=False,
+                 max_seconds=None, max_evaluations=None, cancel_token=None,
+                 solution_tabu=False, solution_tenure=None, lsh_projections=8, lsh_width=None,
+                 move_size=None):
         """
         Initialize the Tabu Search optimizer.
         
@@ -20,10 +37,24 @@ class TabuSearch:
             X_test: Test data features
             y_test: Test data labels
             iterations (int): Number of iterations to run
-            tabu_list_size (int): Size of the tabu list
+            tabu_list_size (int): Tabu tenure: iterations a reversed move stays tabu
             neighborhood_size (int): Number of neighbors to generate
             step_size (float): Size of the step when generating neighbors
+            accuracy_stride (int): Evaluate test accuracy every this many iterations
+            background_accuracy (bool): Evaluate test accuracy on a background thread
+            max_seconds (float): Stop once the run has taken this many seconds (optional)
+            max_evaluations (int): Stop once this many fitness evaluations are spent (optional)
+            cancel_token: CancellationToken checked every iteration to stop early (optional)
+            solution_tabu (bool): Also reject neighbors whose LSH bucket was visited recently
+            solution_tenure (int): Iterations a visited bucket stays tabu (defaults to tabu_list_size)
+            lsh_projections (int): Number of random projections in each solution hash
+            lsh_width (float): Bucket width of each projection (defaults to the typical
+                projected length of a move: step_size, scaled by sqrt(move_size / weights) for sparse moves)
+            move_size (int): Number of weights each neighbor changes (None perturbs all of them)
         """
+        if move_size is not None and not 1 <= move_size <= neural_network.total_weights:
+            raise ValueError(f"move_size must be between 1 and {neural_network.total_weights}")
+        
         self.neural_network = neural_network
         self.X_train = X_train
         self.y_train = y_train
@@ -33,10 +64,35 @@ class TabuSearch:
         self.tabu_list_size = tabu_list_size
         self.neighborhood_size = neighborhood_size
         self.step_size = step_size
+        self.accuracy_stride = accuracy_stride
+        self.background_accuracy = background_accuracy
+        self.budget = RunBudget(iterations, max_seconds, max_evaluations, cancel_token)
+        self.evaluations = 0
+        self.stop_reason = None
         self.weights_size = neural_network.total_weights
         
-        # Initialize tabu list
-        self.tabu_list = deque(maxlen=tabu_list_size)
+        # Tabu memory: move attribute -> last iteration it is tabu
+        self.tabu_moves = {}
+        self.iteration = 0
+        
+        # Solution tabu: LSH bucket of each visited solution -> last iteration it is tabu
+        self.solution_tabu = solution_tabu
+        self.solution_tenure = tabu_list_size if solution_tenure is None else solution_tenure
+        if lsh_width is None:
+            lsh_width = step_size if move_size is None else step_size * np.sqrt(move_size / self.weights_size)
+        self.lsh_width = lsh_width
+        self.lsh_projections = None
+        self.lsh_offsets = None
+        if solution_tabu:
+            directions = np.random.randn(self.weights_size, lsh_projections)
+            self.lsh_projections = directions / np.linalg.norm(directions, axis=0)
+            self.lsh_offsets = np.random.uniform(0, self.lsh_width, lsh_projections)
+        self.visited = {}
+        self.solution_rejections = 0
+        
+        # Sparse moves: current solution's activations on the training set (see activation_cache)
+        self.move_size = move_size
+        self.cache = None
         
         # Initialize best solution tracking
         self.current_solution = None
@@ -45,8 +101,8 @@ class TabuSearch:
         self.best_accuracy = 0
         
         # History for visualization
-        self.current_fitness_history = []
-        self.best_fitness_history = []
+        self.current_fitness_history = HistoryBuffer(self.budget.history_capacity())
+        self.best_fitness_history = HistoryBuffer(self.budget.history_capacity())
         self.best_accuracy_history = []
     
     def initialize_solution(self):
@@ -63,9 +119,6 @@ class TabuSearch:
         current_fitness = self.calculate_fitness(self.current_solution)
         self.best_solution = self.current_solution.copy()
         self.best_fitness = current_fitness
-        self.best_accuracy = self.neural_network.calculate_accuracy(
-            self.X_test, self.y_test, self.best_solution
-        )
         
         return self.current_solution
     
@@ -75,13 +128,17 @@ class TabuSearch:
         Uses negative loss as fitness to maximize.
         
         Args:
-            weights (numpy.ndarray): Weights to evaluate
+            weights (numpy.ndarray): Weights to evaluate, or a 2D array with one solution per row
             
         Returns:
-            float: Fitness score
+            float: Fitness score (one per row when weights is 2D)
         """
         # Calculate negative loss (higher is better)
-        loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='fitness'):
+            loss = self.neural_network.calculate_loss(self.X_train, self.y_train, weights)
+        count = len(weights) if weights.ndim > 1 else 1
+        self.evaluations += count
+        metrics.inc('fitness_evaluations_total', count, algorithm='tabu')
         return -loss
     
     def generate_neighbors(self, solution):
@@ -108,9 +165,72 @@ class TabuSearch:
         
         return neighbors
     
+    def generate_sparse_moves(self):
+        """
+        Generate sparse neighbors, each changing move_size distinct weights.
+        
+        Returns:
+            tuple: Changed weight indices and their changes, both of shape
+                (neighborhood_size, move_size)
+        """
+        keys = np.random.rand(self.neighborhood_size, self.weights_size)
+        indices = np.argpartition(keys, self.move_size - 1, axis=1)[:, :self.move_size]
+        deltas = np.random.randn(self.neighborhood_size, self.move_size) * self.step_size
+        return indices, deltas
+    
+    def apply_moves(self, solution, indices, deltas):
+        """
+        Build the neighbors described by sparse moves.
+        
+        Args:
+            solution (numpy.ndarray): Current solution
+            indices (numpy.ndarray): Changed weight indices, one row per neighbor
+            deltas (numpy.ndarray): Change to each weight
+            
+        Returns:
+            numpy.ndarray: Array of shape (len(indices), weights_size)
+        """
+        neighbors = np.repeat(solution[np.newaxis], len(indices), axis=0)
+        neighbors[np.arange(len(indices))[:, np.newaxis], indices] += deltas
+        return neighbors
+    
+    def calculate_move_fitness(self, indices, deltas):
+        """
+        Calculate the fitness of sparse neighbors incrementally from the cached activations.
+        
+        Args:
+            indices (numpy.ndarray): Changed weight indices, one row per neighbor
+            deltas (numpy.ndarray): Change to each weight
+            
+        Returns:
+            numpy.ndarray: Fitness score of each neighbor
+        """
+        with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='fitness'):
+            loss = self.neural_network.sparse_update_loss(self.y_train, self.cache, indices, deltas)
+        self.evaluations += len(indices)
+        metrics.inc('fitness_evaluations_total', len(indices), algorithm='tabu')
+        return -loss
+    
+    def get_sparse_moves(self, indices, deltas):
+        """
+        Get the move of each sparse neighbor, as get_move would from the full solutions.
+        
+        Args:
+            indices (numpy.ndarray): Changed weight indices, one row per neighbor
+            deltas (numpy.ndarray): Change to each weight
+            
+        Returns:
+            list: Move (dimension, direction) per neighbor
+        """
+        rows = np.arange(len(indices))
+        largest = np.argmax(np.abs(deltas), axis=1)
+        dimensions = indices[rows, largest]
+        directions = np.where(deltas[rows, largest] > 0, 1, -1)
+        return list(zip(dimensions.tolist(), directions.tolist()))
+    
     def is_tabu(self, move):
         """
-        Check if a move is in the tabu list.
+        Check if a move is tabu in the current iteration.
         
         Args:
             move (tuple): Move to check (dimension, direction)
@@ -118,16 +238,57 @@ class TabuSearch:
         Returns:
             bool: True if the move is tabu, False otherwise
         """
-        return move in self.tabu_list
+        return self.tabu_moves.get(move, -1) >= self.iteration
     
     def add_to_tabu(self, move):
         """
-        Add a move to the tabu list.
+        Make reversing a move tabu for the tenure.
+        
+        Args:
+            move (tuple): Move that was made (dimension, direction)
+        """
+        dimension, direction = move
+        self.tabu_moves[(dimension, -direction)] = self.iteration + self.tabu_list_size
+        self.expire(self.tabu_moves, self.tabu_list_size)
+    
+    def expire(self, memory, tenure):
+        """
+        Drop expired entries once a tabu memory holds more than twice its tenure.
+        
+        Args:
+            memory (dict): Tabu memory mapping keys to their last tabu iteration
+            tenure (int): Tenure of the memory
+        """
+        if len(memory) > 2 * max(tenure, 1):
+            for key in [key for key, expiry in memory.items() if expiry < self.iteration]:
+                del memory[key]
+    
+    def solution_keys(self, solutions):
+        """
+        Hash solutions into LSH buckets; nearby solutions share a bucket.
+        
+        Each projection onto a random unit direction is quantized into buckets
+        of width lsh_width with a random offset (E2LSH). The bucket indices of
+        all projections together form the key.
         
         Args:
-            move (tuple): Move to add (dimension, direction)
+            solutions (numpy.ndarray): Array of shape (n, weights_size)
+            
+        Returns:
+            list: One bytes key per solution
         """
-        self.tabu_list.append(move)
+        buckets = np.floor((solutions @ self.lsh_projections + self.lsh_offsets) / self.lsh_width)
+        return [row.tobytes() for row in buckets.astype(np.int64)]
+    
+    def add_visited(self, key):
+        """
+        Make a visited solution's LSH bucket tabu for the solution tenure.
+        
+        Args:
+            key (bytes): LSH key of the solution
+        """
+        self.visited[key] = self.iteration + self.solution_tenure
+        self.expire(self.visited, self.solution_tenure)
     
     def get_move(self, current, neighbor):
         """
@@ -142,11 +303,27 @@ class TabuSearch:
         """
         # Find the dimension with the largest change
         diff = neighbor - current
-        dimension = np.argmax(np.abs(diff))
+        dimension = int(np.argmax(np.abs(diff)))
         direction = 1 if diff[dimension] > 0 else -1
         
         return (dimension, direction)
     
+    def get_top_solutions(self, k):
+        """
+        Get the best solutions found, e.g. as starting points for gradient refinement.
+        
+        Args:
+            k (int): Maximum number of solutions to return
+            
+        Returns:
+            numpy.ndarray: Array of shape (<= k, weights_size), best first
+        """
+        # Candidates are the best solution so far plus the current solution
+        pool = np.atleast_2d(self.current_solution)
+        losses = self.neural_network.calculate_loss(self.X_train, self.y_train, pool)
+        order = np.argsort(losses)
+        return np.vstack([self.best_solution, pool[order[:k - 1]]])[:k]
+    
     def run(self):
         """
         Run the Tabu Search optimization process.
@@ -155,74 +332,128 @@ class TabuSearch:
             tuple: Best weights, best accuracy, and history
         """
         start_time = time.time()
+        self.budget.start()
         
         # Initialize solution
         self.initialize_solution()
+        if self.move_size is not None:
+            self.cache = self.neural_network.activation_cache(self.X_train, self.current_solution)
+        if self.solution_tabu:
+            self.add_visited(self.solution_keys(self.current_solution[np.newaxis])[0])
         
-        # Store initial best
-        self.best_fitness_history.append(self.best_fitness)
-        self.best_accuracy_history.append(self.best_accuracy)
-        self.current_fitness_history.append(self.best_fitness)
-        
-        # Main optimization loop
-        for iteration in range(self.iterations):
-            # Generate neighbors
-            neighbors = self.generate_neighbors(self.current_solution)
+        # Test accuracy is evaluated lazily from best-solution snapshots
+        with AccuracyTracker(self.neural_network, self.X_test, self.y_test,
+                             stride=self.accuracy_stride, background=self.background_accuracy,
+                             capacity=self.budget.history_capacity()) as tracker:
             
-            # Evaluate neighbors
-            neighbor_fitnesses = [self.calculate_fitness(n) for n in neighbors]
-            
-            # Find the best non-tabu neighbor
-            best_neighbor_idx = -1
-            best_neighbor_fitness = -np.inf
+            # Store initial best
+            self.best_fitness_history.append(self.best_fitness)
+            tracker.record(self.best_solution)
+            self.current_fitness_history.append(self.best_fitness)
             
-            for i, (neighbor, fitness) in enumerate(zip(neighbors, neighbor_fitnesses)):
-                move = self.get_move(self.current_solution, neighbor)
+            # Main optimization loop
+            for iteration in range(self.iterations):
+                # Stop early once a budget is spent or the run was cancelled, keeping the best solution so far
+                self.stop_reason = self.budget.stop_reason(self.evaluations)
+                if self.stop_reason is not None:
+                    break
                 
-                # Check if the move is not tabu or if it leads to a better solution than the best so far
-                if not self.is_tabu(move) or fitness > self.best_fitness:
-                    if fitness > best_neighbor_fitness:
-                        best_neighbor_idx = i
-                        best_neighbor_fitness = fitness
-            
-            # If no non-tabu neighbor was found, pick the best neighbor regardless of tabu status
-            if best_neighbor_idx == -1:
-                best_neighbor_idx = np.argmax(neighbor_fitnesses)
-                best_neighbor_fitness = neighbor_fitnesses[best_neighbor_idx]
-            
-            # Update current solution
-            self.current_solution = neighbors[best_neighbor_idx].copy()
-            current_fitness = best_neighbor_fitness
-            
-            # Add the move to the tabu list
-            move = self.get_move(self.current_solution, neighbors[best_neighbor_idx])
-            self.add_to_tabu(move)
-            
-            # Update best solution if improved
-            if current_fitness > self.best_fitness:
-                self.best_solution = self.current_solution.copy()
-                self.best_fitness = current_fitness
-                self.best_accuracy = self.neural_network.calculate_accuracy(
-                    self.X_test, self.y_test, self.best_solution
-                )
-            
-            # Store history
-            self.current_fitness_history.append(current_fitness)
-            self.best_fitness_history.append(self.best_fitness)
-            self.best_accuracy_history.append(self.best_accuracy)
+                self.iteration = iteration
+                
+                # Generate neighbors
+                with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='neighbors'):
+                    if self.move_size is None:
+                        neighbors = self.generate_neighbors(self.current_solution)
+                    else:
+                        indices, deltas = self.generate_sparse_moves()
+                        neighbors = self.apply_moves(self.current_solution, indices, deltas)
+                
+                # Drop neighbors that fall into a recently visited region before spending evaluations on them
+                keys = None
+                if self.solution_tabu:
+                    with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='tabu_bookkeeping'):
+                        all_keys = self.solution_keys(np.array(neighbors))
+                        fresh = [i for i, key in enumerate(all_keys) if self.visited.get(key, -1) < iteration]
+                        self.solution_rejections += len(neighbors) - len(fresh)
+                        # If every neighbor revisits a tabu region, keep them all rather than stall
+                        if fresh:
+                            neighbors = [neighbors[i] for i in fresh]
+                            keys = [all_keys[i] for i in fresh]
+                            if self.move_size is not None:
+                                indices, deltas = indices[fresh], deltas[fresh]
+                        else:
+                            keys = all_keys
+                
+                # Evaluate neighbors (sparse ones incrementally, from the current solution's activations)
+                if self.move_size is None:
+                    neighbor_fitnesses = [self.calculate_fitness(n) for n in neighbors]
+                else:
+                    neighbor_fitnesses = self.calculate_move_fitness(indices, deltas)
+                
+                # Choose the best admissible neighbor and update the tabu memory
+                with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='tabu_bookkeeping'):
+                    # Find the best non-tabu neighbor
+                    if self.move_size is None:
+                        moves = [self.get_move(self.current_solution, neighbor) for neighbor in neighbors]
+                    else:
+                        moves = self.get_sparse_moves(indices, deltas)
+                    neighbor_fitnesses = np.asarray(neighbor_fitnesses)
+                    
+                    # A move is admissible if it is not tabu or if it leads to a better solution than the best so far
+                    tabu = np.array([self.is_tabu(move) for move in moves])
+                    admissible = ~tabu | (neighbor_fitnesses > self.best_fitness)
+                    
+                    # If no admissible neighbor was found, pick the best neighbor regardless of tabu status
+                    if np.any(admissible):
+                        best_neighbor_idx = int(np.argmax(np.where(admissible, neighbor_fitnesses, -np.inf)))
+                    else:
+                        best_neighbor_idx = int(np.argmax(neighbor_fitnesses))
+                    best_neighbor_fitness = neighbor_fitnesses[best_neighbor_idx]
+                    
+                    # Update current solution
+                    self.current_solution = neighbors[best_neighbor_idx].copy()
+                    current_fitness = best_neighbor_fitness
+                    
+                    # Make undoing the move tabu, using the move computed before the solution changed
+                    self.add_to_tabu(moves[best_neighbor_idx])
+                    if keys is not None:
+                        self.add_visited(keys[best_neighbor_idx])
+                
+                # Sparse moves evaluate the next neighborhood from the new solution's activations
+                if self.move_size is not None:
+                    with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='activation_cache'):
+                        self.cache = self.neural_network.activation_cache(self.X_train, self.current_solution)
+                
+                # Update best solution if improved
+                improved = current_fitness > self.best_fitness
+                if improved:
+                    self.best_solution = self.current_solution.copy()
+                    self.best_fitness = current_fitness
+                
+                # Store history
+                self.current_fitness_history.append(current_fitness)
+                self.best_fitness_history.append(self.best_fitness)
+                tracker.record(self.best_solution, improved)
+                
+                # Print progress every 10 iterations
+                if (iteration + 1) % 10 == 0:
+                    print(f"TABU - Iteration {iteration + 1}/{self.iterations}, " +
+                          f"Best Fitness: {self.best_fitness:.4f}, " +
+                          f"Current Fitness: {current_fitness:.4f}")
             
-            # Print progress every 10 iterations
-            if (iteration + 1) % 10 == 0:
-                print(f"TABU - Iteration {iteration + 1}/{self.iterations}, " +
-                      f"Best Accuracy: {self.best_accuracy:.4f}, " +
-                      f"Current Fitness: {current_fitness:.4f}")
+            # Evaluate the recorded snapshots on the test set
+            with metrics.timer('optimizer_phase_seconds', algorithm='tabu', phase='test_accuracy'):
+                self.best_accuracy_history = tracker.finalize()
+        self.best_accuracy = self.best_accuracy_history[-1]
         
         end_time = time.time()
         print(f"Tabu Search optimization completed in {end_time - start_time:.2f} seconds")
         print(f"Final accuracy: {self.best_accuracy:.4f}")
+        if self.solution_tabu:
+            print(f"Neighbors rejected by the solution tabu: {self.solution_rejections}")
         
         return self.best_solution, self.best_accuracy, {
-            'current_fitness_history': self.current_fitness_history,
-            'best_fitness_history': self.best_fitness_history,
+            'current_fitness_history': self.current_fitness_history.values(),
+            'best_fitness_history': self.best_fitness_history.values(),
             'best_accuracy_history': self.best_accuracy_history
         }
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('numba')
+
+from models import fused_kernels
+from models.neural_network import NeuralNetwork
+
+
+@pytest.mark.parametrize('sizes, samples', [((4, 8, 3), 120), ((13, 10, 3), 70), ((30, 5, 2), 33)])
+@pytest.mark.parametrize('scale', [0.5, 5.0, 1000.0])
+def test_fused_kernel_matches_numpy(sizes, samples, scale):
+    rng = np.random.default_rng(0)
+    nn = NeuralNetwork(*sizes, backend='numpy')
+    X = rng.standard_normal((samples, sizes[0]))
+    y = rng.integers(0, sizes[2], samples)
+    weights = rng.standard_normal((25, nn.total_weights)) * scale
+
+    loss, accuracy = fused_kernels.loss_and_accuracy(nn, X, y, weights)
+
+    np.testing.assert_allclose(loss, nn.numpy_loss(X, y, weights), rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(accuracy, nn.calculate_accuracy(X, y, weights))
+
+
+def test_numba_backend_routes_through_kernel():
+    rng = np.random.default_rng(1)
+    fused = NeuralNetwork(4, 8, 3, backend='numba')
+    reference = NeuralNetwork(4, 8, 3, backend='numpy')
+    X = rng.standard_normal((50, 4))
+    y = rng.integers(0, 3, 50)
+    weights = rng.standard_normal((10, fused.total_weights))
+
+    np.testing.assert_allclose(fused.calculate_loss(X, y, weights), reference.calculate_loss(X, y, weights),
+                               rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(fused.calculate_accuracy(X, y, weights),
+                                  reference.calculate_accuracy(X, y, weights))
+    assert fused.calculate_loss(X, y, weights[0]) == pytest.approx(reference.calculate_loss(X, y, weights[0]))
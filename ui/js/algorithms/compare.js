@@ -9,12 +9,17 @@ export async function runAllAlgorithms() {
     try {
         showLoading();
         
+        // An evaluation budget gives every algorithm the same amount of compute
+        const budgetInput = document.getElementById('compare-evaluation-budget');
+        const evaluationBudget = budgetInput ? parseInt(budgetInput.value, 10) || 0 : 0;
+        
         // Make an API call to the backend to run all algorithms
         const results = await runOptimization('all', {
             ga: {},
             pso: {},
             aco: {},
-            tabu: {}
+            tabu: {},
+            evaluation_budget: evaluationBudget
         });
         
         if (!results) {
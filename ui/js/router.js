@@ -1,5 +1,5 @@
 // Router for handling page navigation
-import { showLoading, hideLoading, displayErrorMessage } from './utils.js';
+import { showLoading, hideLoading, displayErrorMessage, cancelOptimization } from './utils.js';
 
 // Page content cache
 const pageCache = {};
@@ -13,6 +13,9 @@ export async function loadPage(page) {
     const pageTitle = document.getElementById('page-title');
     const pageDescription = document.getElementById('page-description');
     
+    // Leaving a page abandons its optimization run
+    cancelOptimization();
+    
     try {
         // Update page title and description
         updatePageInfo(page, pageTitle, pageDescription);
@@ -59,6 +59,10 @@ export function formatAlgorithmName(algorithm) {
             return 'Ant Colony Optimization';
         case 'tabu':
             return 'Tabu Search';
+        case 'cmaes':
+            return 'CMA-ES';
+        case 'de':
+            return 'Differential Evolution';
         default:
             return algorithm;
     }
@@ -79,6 +83,10 @@ export function getAlgorithmColor(algorithm) {
             return 'var(--aco-color)';
         case 'tabu':
             return 'var(--tabu-color)';
+        case 'cmaes':
+            return 'var(--cmaes-color)';
+        case 'de':
+            return 'var(--de-color)';
         default:
             return 'var(--primary)';
     }
@@ -601,12 +609,67 @@ export function createChart(containerId, data, color, label = 'Accuracy') {
 }
 
 /**
- * Run an optimization algorithm
+ * Decode a result sent in the compact array format (application/vnd.hybrid-ai.arrays)
+ * @param {ArrayBuffer} buffer - The response body
+ * @returns {Object} The result, with float arrays turned back into plain arrays
+ */
+export function decodeArrayResult(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'HAOB' || view.getUint8(4) !== 1) {
+        throw new Error('Unsupported binary result format');
+    }
+    
+    // JSON header, then little-endian float32 arrays
+    const headerLength = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+    const dataOffset = 12 + headerLength;
+    
+    const restore = (value) => {
+        if (Array.isArray(value)) {
+            return value.map(restore);
+        }
+        if (value && typeof value === 'object') {
+            if (Array.isArray(value.$array) && Object.keys(value).length === 1) {
+                const [offset, length] = value.$array;
+                const values = new Array(length);
+                for (let i = 0; i < length; i++) {
+                    values[i] = view.getFloat32(dataOffset + (offset + i) * 4, true);
+                }
+                return values;
+            }
+            return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, restore(item)]));
+        }
+        return value;
+    };
+    
+    return restore(header);
+}
+
+// Controller of the optimization request in flight, if any
+let currentRun = null;
+
+/**
+ * Abort the optimization request in flight. Closing the connection makes the
+ * server cancel the run, so it stops using CPU.
+ */
+export function cancelOptimization() {
+    if (currentRun) {
+        currentRun.abort();
+        currentRun = null;
+    }
+}
+
+/**
+ * Run an optimization algorithm, cancelling any run still in flight
  * @param {string} algorithm - The algorithm identifier
  * @param {Object} parameters - The algorithm parameters
  * @returns {Promise<Object>} The results
  */
 export async function runOptimization(algorithm, parameters) {
+    cancelOptimization();
+    const controller = new AbortController();
+    currentRun = controller;
     showLoading();
     
     try {
@@ -616,17 +679,22 @@ export async function runOptimization(algorithm, parameters) {
         const response = await fetch(`/api/run/${algorithm}`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Accept': 'application/vnd.hybrid-ai.arrays, application/json;q=0.9'
             },
-            body: JSON.stringify(parameters)
+            body: JSON.stringify(parameters),
+            signal: controller.signal
         });
         
         if (!response.ok) {
             throw new Error(`HTTP error! Status: ${response.status}`);
         }
         
-        // Get the results from the backend
-        const results = await response.json();
+        // Get the results from the backend (histories arrive as raw float32 arrays)
+        const contentType = response.headers.get('Content-Type') || '';
+        const results = contentType.startsWith('application/vnd.hybrid-ai.arrays')
+            ? decodeArrayResult(await response.arrayBuffer())
+            : await response.json();
         console.log(`Received results for ${algorithm}:`, results);
         
         // Check if the results contain an error
@@ -636,6 +704,15 @@ export async function runOptimization(algorithm, parameters) {
         
         return results;
     } catch (error) {
+        if (error.name === 'AbortError') {
+            console.log(`Cancelled ${algorithm} optimization`);
+            return {
+                best_accuracy: 0,
+                accuracy_history: [],
+                execution_time: 0,
+                cancelled: true
+            };
+        }
         console.error(`Error running ${algorithm} optimization:`, error);
         displayErrorMessage(`Error running ${algorithm} optimization: ${error.message}`);
         
@@ -646,6 +723,12 @@ export async function runOptimization(algorithm, parameters) {
             execution_time: 0
         };
     } finally {
-        hideLoading();
+        if (currentRun === controller) {
+            currentRun = null;
+        }
+        // A newer run owns the spinner once this one was replaced
+        if (!currentRun) {
+            hideLoading();
+        }
     }
 }
@@ -0,0 +1,130 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from utils.history import HistoryBuffer
+
+class AccuracyTracker:
+    """
+    Records best-solution snapshots during a search and evaluates their test
+    accuracy lazily, so test-set evaluation does not compete with the search loop.
+
+    Snapshots are evaluated in batched passes of bounded size when the run
+    finishes, or on a background thread while the search continues. Use the
+    tracker as a context manager so the background thread is shut down even
+    if the search fails.
+    """
+
+    def __init__(self, neural_network, X_test, y_test, stride=1, background=False, capacity=128):
+        """
+        Initialize the accuracy tracker.
+
+        Args:
+            neural_network: Neural network model being optimized
+            X_test: Test data features
+            y_test: Test data labels
+            stride (int): Only snapshot the best solution every stride history points;
+                points in between repeat the last evaluated accuracy
+            background (bool): Evaluate snapshots on a background thread as they arrive
+            capacity (int): Expected number of history points, preallocated up front
+        """
+        self.neural_network = neural_network
+        self.X_test = X_test
+        self.y_test = y_test
+        self.stride = max(1, int(stride))
+        self.background = background
+
+        self.snapshots = []
+        self.snapshot_index = HistoryBuffer(capacity, dtype=np.int64)
+        self.pending = None
+        self.futures = []
+        self.executor = ThreadPoolExecutor(max_workers=1) if background else None
+
+    def record(self, best_solution, improved=True):
+        """
+        Record one history point.
+
+        Args:
+            best_solution (numpy.ndarray): Best solution at this point
+            improved (bool): Whether the best solution changed since the last call
+        """
+        if improved or not self.snapshots:
+            self.pending = best_solution.copy()
+
+        # Take the snapshot on stride boundaries only
+        if self.pending is not None and len(self.snapshot_index) % self.stride == 0:
+            self.add_snapshot(self.pending)
+            self.pending = None
+
+        self.snapshot_index.append(len(self.snapshots) - 1)
+
+    def add_snapshot(self, solution):
+        """
+        Store a snapshot and, in background mode, start evaluating it.
+
+        Args:
+            solution (numpy.ndarray): Solution to evaluate
+        """
+        self.snapshots.append(solution)
+        if self.executor is not None:
+            self.futures.append(self.executor.submit(
+                self.neural_network.calculate_accuracy, self.X_test, self.y_test, solution
+            ))
+
+    def finalize(self):
+        """
+        Evaluate any outstanding snapshots and build the accuracy history.
+
+        Returns:
+            numpy.ndarray: Test accuracy for every recorded history point
+        """
+        # The last point always reflects the final best solution
+        if self.pending is not None:
+            self.add_snapshot(self.pending)
+            self.pending = None
+            if self.snapshot_index:
+                self.snapshot_index[-1] = len(self.snapshots) - 1
+
+        if not self.snapshots:
+            return np.empty(0)
+
+        if self.executor is not None:
+            try:
+                accuracies = np.array([future.result() for future in self.futures])
+            finally:
+                self.close()
+        else:
+            accuracies = self.evaluate_snapshots()
+
+        return np.asarray(accuracies, dtype=float)[self.snapshot_index.values()]
+
+    def evaluate_snapshots(self):
+        """
+        Evaluate every snapshot in chunks.
+
+        A batched forward pass holds snapshots x test samples x hidden units
+        activations, so chunks are sized to keep that near
+        NeuralNetwork.SPARSE_CHUNK_ELEMENTS (at least one snapshot per chunk).
+
+        Returns:
+            numpy.ndarray: Test accuracy per snapshot
+        """
+        nn = self.neural_network
+        per_snapshot = len(self.X_test) * max(nn.hidden_size, nn.output_size)
+        chunk = max(1, nn.SPARSE_CHUNK_ELEMENTS // max(per_snapshot, 1))
+        accuracies = np.empty(len(self.snapshots))
+        for start in range(0, len(self.snapshots), chunk):
+            accuracies[start:start + chunk] = nn.calculate_accuracy(
+                self.X_test, self.y_test, np.array(self.snapshots[start:start + chunk])
+            )
+        return accuracies
+
+    def close(self):
+        """Shut down the background thread, dropping snapshots not yet evaluated."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
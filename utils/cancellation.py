@@ -0,0 +1,179 @@
+import re
+import time
+import uuid
+import selectors
+import socket
+import threading
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag for one optimizer run.
+
+    Optimizers check `cancelled` once per iteration and stop early, keeping
+    the best solution and history found so far. A token is cancelled
+    explicitly with cancel(), or automatically when its `disconnected`
+    callback reports that the client went away. The callback is polled at
+    most every poll_interval seconds, so checking the token is cheap.
+    """
+
+    def __init__(self, job_id=None, algorithm=None, disconnected=None, poll_interval=0.25):
+        """
+        Initialize a token.
+
+        Args:
+            job_id (str): Identifier the run can be cancelled by
+            algorithm (str): Algorithm the run executes
+            disconnected: Callable returning True once the client has disconnected
+            poll_interval (float): Seconds between calls to `disconnected`
+        """
+        self.job_id = job_id
+        self.algorithm = algorithm
+        self.disconnected = disconnected
+        self.poll_interval = poll_interval
+        self.started = time.time()
+        self.reason = None
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.next_poll = 0.0
+
+    def cancel(self, reason='cancelled'):
+        """
+        Request cancellation; the first reason given is kept.
+
+        Args:
+            reason (str): Why the run was cancelled
+        """
+        with self.lock:
+            if not self.event.is_set():
+                self.reason = reason
+                self.event.set()
+
+    @property
+    def cancelled(self):
+        if self.event.is_set():
+            return True
+        if self.disconnected is not None:
+            now = time.monotonic()
+            if now >= self.next_poll:
+                self.next_poll = now + self.poll_interval
+                if self.disconnected():
+                    self.cancel('client_disconnected')
+        return self.event.is_set()
+
+
+class JobRegistry:
+    """
+    Tracks in-flight runs by job ID so they can be cancelled from another request.
+    """
+
+    ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]{1,64}$')
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def start(self, algorithm, job_id=None, disconnected=None):
+        """
+        Register a new run.
+
+        Args:
+            algorithm (str): Algorithm the run executes
+            job_id (str): Client-chosen identifier (generated if None)
+            disconnected: Callable returning True once the client has disconnected
+
+        Returns:
+            CancellationToken: Token for the run; pass it to finish() when done
+        """
+        if job_id is None:
+            job_id = uuid.uuid4().hex[:16]
+        elif not isinstance(job_id, str) or not self.ID_PATTERN.match(job_id):
+            raise ValueError("job_id must be 1-64 letters, digits, '-' or '_'")
+
+        token = CancellationToken(job_id, algorithm, disconnected)
+        with self.lock:
+            if job_id in self.jobs:
+                raise KeyError(f"Job {job_id} is already running")
+            self.jobs[job_id] = token
+        return token
+
+    def finish(self, token):
+        """
+        Unregister a run.
+
+        Args:
+            token (CancellationToken): Token returned by start()
+        """
+        with self.lock:
+            if self.jobs.get(token.job_id) is token:
+                del self.jobs[token.job_id]
+
+    def cancel(self, job_id, reason='cancelled'):
+        """
+        Cancel a running job.
+
+        Args:
+            job_id (str): Job identifier
+            reason (str): Why the run was cancelled
+
+        Returns:
+            bool: True if the job was running
+        """
+        with self.lock:
+            token = self.jobs.get(job_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def describe(self):
+        """
+        Summarize the running jobs for API responses.
+
+        Returns:
+            list: Job ID, algorithm, elapsed seconds and cancellation state per job
+        """
+        with self.lock:
+            tokens = list(self.jobs.values())
+        now = time.time()
+        return [{
+            'job_id': token.job_id,
+            'algorithm': token.algorithm,
+            'elapsed': now - token.started,
+            'cancelling': token.event.is_set()
+        } for token in tokens]
+
+
+def connection_closed(sock):
+    """
+    Check without blocking whether the peer has closed a socket.
+
+    Uses the platform's default selector rather than select.select, which
+    cannot watch descriptors at or above FD_SETSIZE.
+
+    Args:
+        sock (socket.socket): Connected socket
+
+    Returns:
+        bool: True if the peer closed or reset the connection; False if it is
+            still open or the check itself could not be made
+    """
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+            if not selector.select(0):
+                return False
+    except (OSError, ValueError):
+        # A failed check says nothing about the peer, so keep the run going
+        return False
+    try:
+        # Readable with nothing to read means end of stream; pipelined data means still connected
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError:
+        # Connection reset or aborted by the peer
+        return True
+
+
+# Process-wide registry of in-flight optimizer runs
+jobs = JobRegistry()
@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from models.neural_network import NeuralNetwork
+from utils.data_handler import DataHandler
+
+class DatasetContext:
+    """
+    A loaded dataset and the network architecture built for it.
+
+    Contexts are shared by concurrent requests, so they are read-only: the
+    data arrays are marked non-writeable and nothing is reassigned after
+    construction.
+    """
+
+    def __init__(self, dataset, hidden_size):
+        """
+        Load the dataset and build the network.
+
+        Args:
+            dataset (str): Dataset name (see DataHandler.DATASETS)
+            hidden_size (int): Number of hidden neurons
+        """
+        self.dataset = dataset
+        self.hidden_size = hidden_size
+        self.data_handler = DataHandler()
+        arrays = self.data_handler.load_dataset(dataset)
+        for array in arrays:
+            array.flags.writeable = False
+        self.X_train, self.X_test, self.y_train, self.y_test = arrays
+
+        input_size = self.X_train.shape[1]
+        output_size = len(np.unique(self.y_train))
+        self.nn = NeuralNetwork(input_size, hidden_size, output_size)
+        self.nbytes = sum(array.nbytes for array in arrays)
+
+    @property
+    def key(self):
+        return (self.dataset, self.hidden_size)
+
+
+class ContextRegistry:
+    """
+    Thread-safe cache of dataset contexts keyed by (dataset, hidden_size).
+
+    The first request for a key loads its context while concurrent requests
+    for the same key wait for that single load instead of repeating it.
+    Least recently used contexts are evicted once the cached data exceeds
+    max_bytes or there are more than max_contexts; requests still running
+    keep their own reference, so eviction never pulls data from under them.
+    """
+
+    # Bounds on the hidden layer size a request may ask for
+    MAX_HIDDEN_SIZE = 1024
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_contexts=8):
+        """
+        Initialize an empty registry.
+
+        Args:
+            max_bytes (int): Memory cap for the cached dataset arrays
+            max_contexts (int): Maximum number of cached contexts
+        """
+        self.max_bytes = max_bytes
+        self.max_contexts = max_contexts
+        self.contexts = OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+
+    def get(self, dataset='iris', hidden_size=8):
+        """
+        Get the context for a dataset and architecture, loading it once if needed.
+
+        Args:
+            dataset (str): Dataset name
+            hidden_size (int): Number of hidden neurons
+
+        Returns:
+            DatasetContext: Shared, read-only context
+        """
+        if dataset not in DataHandler.DATASETS:
+            raise ValueError(f"Unknown dataset '{dataset}', expected one of {sorted(DataHandler.DATASETS)}")
+        hidden_size = int(hidden_size)
+        if not 1 <= hidden_size <= self.MAX_HIDDEN_SIZE:
+            raise ValueError(f"hidden_size must be between 1 and {self.MAX_HIDDEN_SIZE}")
+        key = (dataset, hidden_size)
+
+        with self.lock:
+            context = self.contexts.get(key)
+            if context is not None:
+                self.contexts.move_to_end(key)
+                return context
+
+            # Single flight: only the first caller loads, the rest wait on its future
+            loading = self.loading.get(key)
+            owner = loading is None
+            if owner:
+                loading = self.loading[key] = Future()
+
+        if not owner:
+            return loading.result()
+
+        try:
+            start_time = time.time()
+            context = DatasetContext(dataset, hidden_size)
+            logging.info(f"Loaded context {dataset} with architecture "
+                         f"{context.nn.input_size}-{hidden_size}-{context.nn.output_size} "
+                         f"in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            with self.lock:
+                del self.loading[key]
+            loading.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.loading[key]
+            self.contexts[key] = context
+            self.evict()
+        loading.set_result(context)
+        return context
+
+    def evict(self):
+        """Drop least recently used contexts until the caps are met (call with the lock held)."""
+        while len(self.contexts) > 1 and (len(self.contexts) > self.max_contexts
+                                          or self.memory_usage() > self.max_bytes):
+            key, _ = self.contexts.popitem(last=False)
+            logging.info(f"Evicted context {key[0]} (hidden size {key[1]})")
+
+    def memory_usage(self):
+        """
+        Get the memory held by cached contexts.
+
+        Returns:
+            int: Bytes of dataset arrays in the cache
+        """
+        return sum(context.nbytes for context in self.contexts.values())
+
+
+# Process-wide registry shared by the request handlers and batch workers
+contexts = ContextRegistry()
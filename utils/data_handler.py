@@ -1,14 +1,21 @@
 import numpy as np
-from sklearn.datasets import load_iris
+from sklearn.datasets import load_iris, load_wine, load_breast_cancer
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 class DataHandler:
     """
     Utility class for loading and preprocessing datasets.
-    Currently supports the Iris dataset.
+    Supports the scikit-learn classification datasets listed in DATASETS.
     """
     
+    # Dataset loaders by name
+    DATASETS = {
+        'iris': load_iris,
+        'wine': load_wine,
+        'breast_cancer': load_breast_cancer
+    }
+    
     def __init__(self, test_size=0.2, random_state=42):
         """
         Initialize the data handler.
@@ -32,10 +39,25 @@ class DataHandler:
         Returns:
             tuple: X_train, X_test, y_train, y_test
         """
-        # Load the Iris dataset
-        iris = load_iris()
-        X = iris.data
-        y = iris.target
+        return self.load_dataset('iris')
+    
+    def load_dataset(self, name):
+        """
+        Load and preprocess a dataset by name.
+        
+        Args:
+            name (str): One of the keys of DATASETS
+            
+        Returns:
+            tuple: X_train, X_test, y_train, y_test
+        """
+        if name not in self.DATASETS:
+            raise ValueError(f"Unknown dataset '{name}', expected one of {sorted(self.DATASETS)}")
+        
+        # Load the dataset
+        dataset = self.DATASETS[name]()
+        X = dataset.data
+        y = dataset.target
         
         # Split the data into training and testing sets
         X_train, X_test, y_train, y_test = train_test_split(
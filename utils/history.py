@@ -0,0 +1,130 @@
+import numpy as np
+
+class HistoryBuffer:
+    """
+    Append-only history backed by a preallocated NumPy array.
+
+    Optimizers record one value per iteration. Sizing the buffer for the run
+    up front avoids a Python float object per point, and values() hands the
+    recorded part back as an array view without copying.
+    """
+
+    def __init__(self, capacity=128, dtype=np.float64):
+        """
+        Initialize an empty history.
+
+        Args:
+            capacity (int): Number of points to preallocate; the buffer doubles
+                when it runs out
+            dtype: NumPy dtype of the stored values
+        """
+        self.data = np.empty(max(1, int(capacity)), dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        """
+        Record one point.
+
+        Args:
+            value (float): Value to append
+        """
+        if self.size == len(self.data):
+            self.data = np.concatenate([self.data, np.empty_like(self.data)])
+        self.data[self.size] = value
+        self.size += 1
+
+    def values(self):
+        """
+        Get the recorded points.
+
+        Returns:
+            numpy.ndarray: View of the recorded points
+        """
+        return self.data[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.values()[index]
+
+    def __setitem__(self, index, value):
+        self.values()[index] = value
+
+
+def lttb_indices(values, max_points):
+    """
+    Pick points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. The points in between are
+    split into equal buckets, and from each bucket the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average is kept. This preserves the visual shape of the curve far better
+    than taking every Nth point.
+
+    Args:
+        values (numpy.ndarray): Series to downsample
+        max_points (int): Number of points to keep (at least 3)
+
+    Returns:
+        numpy.ndarray: Sorted indices of the kept points
+    """
+    n = len(values)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    y = np.asarray(values, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Twice the triangle area for every candidate in the bucket
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+
+def downsample(values, max_points, method='lttb'):
+    """
+    Reduce a history to at most max_points points.
+
+    Args:
+        values (array-like): Series to downsample
+        max_points (int): Maximum number of points; 0 or less keeps everything
+        method (str): 'lttb' (shape-preserving) or 'stride' (every Nth point,
+            plus the last one)
+
+    Returns:
+        tuple: Indices of the kept points (None if nothing was dropped) and
+            the kept values as a NumPy array
+    """
+    values = np.asarray(values, dtype=float)
+    if max_points <= 0 or len(values) <= max_points:
+        return None, values
+
+    if method == 'lttb':
+        indices = lttb_indices(values, max_points)
+    elif method == 'stride':
+        step = int(np.ceil((len(values) - 1) / (max_points - 1)))
+        indices = np.arange(0, len(values), step)
+        if indices[-1] != len(values) - 1:
+            indices = np.append(indices, len(values) - 1)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return indices, values[indices]
@@ -0,0 +1,254 @@
+import time
+import threading
+from contextlib import contextmanager
+
+class NullTimer:
+    """
+    Timer used while metrics are disabled; entering and leaving it does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+class Timer:
+    """
+    Context manager that records its elapsed time into a histogram.
+
+    If the current thread is collecting a phase breakdown, the time is also
+    added there as exclusive time: time spent in nested timers is counted
+    only for the innermost phase.
+    """
+
+    def __init__(self, registry, name, labels, phases=None):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.phases = phases
+        self.start_time = None
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        if self.phases is not None:
+            self.registry.local.timer_stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        elapsed = time.perf_counter() - self.start_time
+        if self.registry.enabled:
+            self.registry.observe(self.name, elapsed, **self.labels)
+
+        if self.phases is not None:
+            stack = self.registry.local.timer_stack
+            stack.pop()
+            if stack:
+                stack[-1].child_time += elapsed
+            algorithm = self.labels.get('algorithm', 'other')
+            phase = self.labels.get('phase', self.name)
+            by_phase = self.phases.setdefault(algorithm, {})
+            by_phase[phase] = by_phase.get(phase, 0.0) + elapsed - self.child_time
+        return False
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters, gauges and histograms, rendered in the
+    Prometheus text exposition format.
+
+    Collection is off until enabled; while disabled every recording call
+    returns immediately and timer() hands out a shared no-op context manager,
+    so instrumented hot paths cost next to nothing.
+    """
+
+    # Default histogram buckets in seconds
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                       0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+    NULL_TIMER = NullTimer()
+
+    def __init__(self):
+        """
+        Initialize an empty, disabled registry.
+        """
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        self.values = {}
+        self.local = threading.local()
+
+    def describe(self, name, metric_type, help_text, buckets=None):
+        """
+        Declare a metric's type and help text.
+
+        Args:
+            name (str): Metric name
+            metric_type (str): 'counter', 'gauge' or 'histogram'
+            help_text (str): Description shown in the exposition output
+            buckets (tuple): Upper bounds for histogram buckets
+        """
+        self.descriptions[name] = (metric_type, help_text, buckets or self.DEFAULT_BUCKETS)
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increase a counter or gauge.
+
+        Args:
+            name (str): Metric name
+            value (float): Amount to add
+            **labels: Label values
+        """
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def dec(self, name, value=1, **labels):
+        """
+        Decrease a gauge.
+
+        Args:
+            name (str): Metric name
+            value (float): Amount to subtract
+            **labels: Label values
+        """
+        self.inc(name, -value, **labels)
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge to a value.
+
+        Args:
+            name (str): Metric name
+            value (float): New value
+            **labels: Label values
+        """
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self.lock:
+            self.values.setdefault(name, {})[key] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Record an observation in a histogram.
+
+        Args:
+            name (str): Metric name
+            value (float): Observed value
+            **labels: Label values
+        """
+        if not self.enabled:
+            return
+        buckets = self.descriptions.get(name, ('histogram', '', self.DEFAULT_BUCKETS))[2]
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def timer(self, name, **labels):
+        """
+        Get a context manager that records its duration in a histogram.
+
+        Args:
+            name (str): Histogram name
+            **labels: Label values
+
+        Returns:
+            Timer, or a shared no-op timer while metrics are disabled and no
+            phase breakdown is being collected
+        """
+        phases = getattr(self.local, 'phases', None)
+        if not self.enabled and phases is None:
+            return self.NULL_TIMER
+        return Timer(self, name, labels, phases)
+
+    @contextmanager
+    def collect_phases(self):
+        """
+        Collect a per-phase time breakdown of everything timed on this thread.
+
+        Works whether or not metrics are enabled. Times are exclusive, in
+        seconds, keyed by algorithm label and then phase label.
+
+        Yields:
+            dict: Breakdown filled in as timers finish
+        """
+        previous = (getattr(self.local, 'phases', None), getattr(self.local, 'timer_stack', None))
+        phases = {}
+        self.local.phases = phases
+        self.local.timer_stack = []
+        try:
+            yield phases
+        finally:
+            self.local.phases, self.local.timer_stack = previous
+
+    def _format_labels(self, key, extra=None):
+        items = list(key) + (extra or [])
+        if not items:
+            return ''
+        escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                   for k, v in items]
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        with self.lock:
+            for name in sorted(self.values):
+                metric_type, help_text, buckets = self.descriptions.get(
+                    name, ('untyped', '', self.DEFAULT_BUCKETS)
+                )
+                if help_text:
+                    lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+
+                for key, value in sorted(self.values[name].items()):
+                    if metric_type != 'histogram':
+                        lines.append(f'{name}{self._format_labels(key)} {value}')
+                        continue
+
+                    # Histogram buckets are cumulative
+                    cumulative = 0
+                    for bound, count in zip(buckets, value['counts']):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{self._format_labels(key, [("le", bound)])} {cumulative}')
+                    lines.append(f'{name}_bucket{self._format_labels(key, [("le", "+Inf")])} {value["count"]}')
+                    lines.append(f'{name}_sum{self._format_labels(key)} {value["sum"]}')
+                    lines.append(f'{name}_count{self._format_labels(key)} {value["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the server and the optimizers
+metrics = MetricsRegistry()
+metrics.describe('http_request_duration_seconds', 'histogram', 'HTTP request latency by route')
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by route and status')
+metrics.describe('http_pending_connections', 'gauge', 'Connections queued for or held by a worker')
+metrics.describe('optimizer_runs_in_flight', 'gauge', 'Optimizer runs currently executing')
+metrics.describe('optimizer_runs_total', 'counter', 'Optimizer runs by algorithm and outcome')
+metrics.describe('optimizer_run_duration_seconds', 'histogram', 'Optimizer run duration by algorithm')
+metrics.describe('optimizer_phase_seconds', 'histogram', 'Time spent in optimizer phases by algorithm')
+metrics.describe('fitness_evaluations_total', 'counter', 'Fitness evaluations by algorithm')
+metrics.describe('fitness_memo_hits_total', 'counter', 'Fitness lookups answered from a memo by algorithm')
+metrics.describe('static_cache_requests_total', 'counter', 'Static file requests by cache result')
@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Groups concurrent inference requests into one batched call.
+
+    Callers submit rows from any thread and block on a future. A single
+    worker thread waits up to `window` seconds after the first pending
+    request for more to arrive, stacks all their rows, calls the batch
+    function once, and hands each caller its slice of the output. The worker
+    starts on the first request and exits after idle_timeout seconds without
+    one, so batchers of models that are no longer used hold no thread.
+    """
+
+    def __init__(self, batch_function, window=0.002, max_batch_rows=1024, idle_timeout=30.0):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            batch_function: Callable taking a 2D array of rows and returning
+                an array with one output row per input row
+            window (float): Seconds to wait for more requests before running a batch
+            max_batch_rows (int): Run the batch early once this many rows are waiting
+            idle_timeout (float): Seconds without requests before the worker thread exits
+        """
+        self.batch_function = batch_function
+        self.window = window
+        self.max_batch_rows = max_batch_rows
+        self.idle_timeout = idle_timeout
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.running = False
+
+    def submit(self, rows):
+        """
+        Queue rows for the next batch.
+
+        Args:
+            rows (numpy.ndarray): 2D array of input rows
+
+        Returns:
+            concurrent.futures.Future: Resolves to the output rows for these inputs
+        """
+        future = Future()
+        with self.lock:
+            self.requests.put((np.atleast_2d(rows), future))
+            if not self.running:
+                # Daemon thread so an idle batcher never blocks shutdown
+                self.running = True
+                worker = threading.Thread(target=self.worker_loop, name='micro-batcher')
+                worker.daemon = True
+                worker.start()
+        return future
+
+    def worker_loop(self):
+        while True:
+            # Wait for work; exit if none arrives for a while
+            try:
+                first = self.requests.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self.lock:
+                    if self.requests.empty():
+                        self.running = False
+                        return
+                continue
+
+            # Collect whatever else arrives within the window
+            pending = [first]
+            rows = len(pending[0][0])
+            deadline = time.perf_counter() + self.window
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                rows += len(request[0])
+
+            self.run_batch(pending)
+
+    def run_batch(self, pending):
+        """
+        Run one batch and resolve its futures.
+
+        Args:
+            pending (list): (rows, future) pairs
+        """
+        try:
+            outputs = self.batch_function(np.concatenate([rows for rows, _ in pending]))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for rows, future in pending:
+            future.set_result(outputs[start:start + len(rows)])
+            start += len(rows)
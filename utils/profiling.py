@@ -0,0 +1,161 @@
+import os
+import re
+import time
+import pstats
+import cProfile
+import uuid
+import logging
+import threading
+from utils.metrics import metrics
+
+class RunProfiler:
+    """
+    Runs an optimizer run under cProfile and reports where its time went.
+
+    The report combines a per-phase breakdown (fitness evaluation, selection,
+    pheromone update, test accuracy, plotting, ...) taken from the phase timers
+    the optimizers already carry, with the most expensive functions from
+    cProfile. The raw pstats file is kept so it can be downloaded and opened
+    with pstats or snakeviz.
+    """
+
+    # cProfile only profiles the thread that enables it, and only one profiler
+    # can be active at a time, so concurrent profiled runs get phases only
+    profile_lock = threading.Lock()
+
+    # Stored pstats file names
+    FILENAME_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+\.pstats$')
+
+    def __init__(self, output_dir, top_n=20, keep=20):
+        """
+        Initialize the run profiler.
+
+        Args:
+            output_dir (str): Directory where pstats files are stored
+            top_n (int): Number of functions listed in the report
+            keep (int): Number of most recent pstats files kept on disk
+        """
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.keep = keep
+
+    def run(self, label, func, *args):
+        """
+        Call func(*args) under the profiler.
+
+        Args:
+            label (str): Name of the run, used in the pstats file name
+            func: Callable to profile
+            *args: Arguments for func
+
+        Returns:
+            tuple: func's return value and the profile report (dict)
+        """
+        profiler = cProfile.Profile() if self.profile_lock.acquire(blocking=False) else None
+        start_time = time.perf_counter()
+        try:
+            with metrics.collect_phases() as phases:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    result = func(*args)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if profiler is not None:
+                self.profile_lock.release()
+        total_time = time.perf_counter() - start_time
+
+        report = self.build_report(phases, total_time)
+        if profiler is None:
+            report['note'] = 'Another run was being profiled; only the phase breakdown is available'
+        else:
+            report.update(self.save_stats(profiler, label))
+        return result, report
+
+    def build_report(self, phases, total_time):
+        """
+        Summarize the phase breakdown.
+
+        Args:
+            phases (dict): Exclusive seconds by algorithm and phase
+            total_time (float): Wall-clock time of the run in seconds
+
+        Returns:
+            dict: Phase breakdown with totals
+        """
+        rounded = {
+            algorithm: {phase: round(seconds, 6) for phase, seconds in
+                        sorted(by_phase.items(), key=lambda item: -item[1])}
+            for algorithm, by_phase in phases.items()
+        }
+        timed = sum(sum(by_phase.values()) for by_phase in phases.values())
+        return {
+            'total_seconds': round(total_time, 6),
+            'phases': rounded,
+            'unattributed_seconds': round(max(0.0, total_time - timed), 6)
+        }
+
+    def save_stats(self, profiler, label):
+        """
+        Write the profile to a pstats file and list the most expensive functions.
+
+        Args:
+            profiler (cProfile.Profile): Finished profiler
+            label (str): Name of the run
+
+        Returns:
+            dict: pstats file name and top functions by cumulative time
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r'[^A-Za-z0-9_\-]', '_', label)
+        # Runs are often shorter than a second, so a timestamp alone does not make the name unique
+        filename = f"{safe_label}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}.pstats"
+        profiler.dump_stats(os.path.join(self.output_dir, filename))
+        self.prune()
+
+        stats = pstats.Stats(profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:self.top_n]
+        top_functions = [{
+            'function': f"{os.path.basename(file)}:{line}({name})",
+            'calls': primitive_calls,
+            'total_seconds': round(total, 6),
+            'cumulative_seconds': round(cumulative, 6)
+        } for (file, line, name), (primitive_calls, _, total, cumulative, _) in rows]
+
+        return {'pstats_file': filename, 'top_functions': top_functions}
+
+    def prune(self):
+        """Delete all but the most recent pstats files."""
+        files = []
+        for name in os.listdir(self.output_dir):
+            if not self.FILENAME_PATTERN.match(name):
+                continue
+            path = os.path.join(self.output_dir, name)
+            # Another run's prune() may delete a file between the listing and the stat
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        files.sort(reverse=True)
+        for _, path in files[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Could not remove old profile {path}: {str(e)}")
+
+    def path_for(self, filename):
+        """
+        Get the path of a stored pstats file.
+
+        Args:
+            filename (str): pstats file name from a profile report
+
+        Returns:
+            str: Absolute path, or None if the name is invalid or the file is missing
+        """
+        if not self.FILENAME_PATTERN.match(filename):
+            return None
+        path = os.path.join(self.output_dir, filename)
+        return path if os.path.isfile(path) else None
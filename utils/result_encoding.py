@@ -0,0 +1,167 @@
+import json
+import struct
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON and the array format always work
+    msgpack = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPE = 'application/msgpack'
+ARRAYS_TYPE = 'application/vnd.hybrid-ai.arrays'
+
+# Media types clients may send for MessagePack
+MSGPACK_ALIASES = (MSGPACK_TYPE, 'application/x-msgpack')
+
+# Array format framing: magic, version, 3 reserved bytes, header length
+ARRAYS_MAGIC = b'HAOB'
+ARRAYS_VERSION = 1
+ARRAYS_PREFIX = struct.Struct('<4sB3xI')
+
+def available_types():
+    """
+    List the media types results can be encoded as.
+
+    Returns:
+        tuple: Media types, JSON first
+    """
+    if msgpack is None:
+        return (JSON_TYPE, ARRAYS_TYPE)
+    return (JSON_TYPE, ARRAYS_TYPE, MSGPACK_TYPE)
+
+def negotiate(accept):
+    """
+    Pick a result encoding from an Accept header.
+
+    Args:
+        accept (str): Value of the Accept request header (may be None)
+
+    Returns:
+        str: Chosen media type; JSON unless the client prefers a supported binary type
+    """
+    best_type = JSON_TYPE
+    best_quality = 0.0
+    for part in (accept or '').split(','):
+        media_type, _, params = part.partition(';')
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_ALIASES:
+            media_type = MSGPACK_TYPE
+        if media_type not in available_types():
+            continue
+
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        # The first listed type wins ties
+        if quality > best_quality:
+            best_type = media_type
+            best_quality = quality
+    return best_type
+
+def is_float_array(value):
+    """
+    Check whether a value is stored as a raw float32 array by the array format.
+
+    Args:
+        value: Any result value
+
+    Returns:
+        bool: True for float NumPy arrays and non-empty lists of floats
+    """
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind == 'f'
+    return (isinstance(value, list) and len(value) > 0
+            and all(isinstance(x, (float, np.floating)) for x in value))
+
+def encode_arrays(data):
+    """
+    Encode a result as a JSON header followed by raw little-endian float32 arrays.
+
+    Layout: 4-byte magic 'HAOB', 1-byte version, 3 reserved bytes, uint32
+    header length, the UTF-8 JSON header (space-padded so the array data is
+    4-byte aligned), then the arrays back to back. In the header every float
+    array is replaced by {"$array": [offset, length]}, counted in float32
+    elements from the start of the array data. Integer lists such as
+    history_iterations stay in the header.
+
+    Args:
+        data: JSON-serializable result
+
+    Returns:
+        bytes: Encoded result
+    """
+    arrays = []
+    offset = 0
+
+    def extract(value):
+        nonlocal offset
+        if is_float_array(value):
+            array = np.asarray(value, dtype='<f4').ravel()
+            arrays.append(array)
+            ref = {'$array': [offset, len(array)]}
+            offset += len(array)
+            return ref
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [extract(item) for item in value]
+        return value
+
+    header = json.dumps(extract(data)).encode()
+    header += b' ' * (-(ARRAYS_PREFIX.size + len(header)) % 4)
+    prefix = ARRAYS_PREFIX.pack(ARRAYS_MAGIC, ARRAYS_VERSION, len(header))
+    return b''.join([prefix, header] + [array.tobytes() for array in arrays])
+
+def decode_arrays(payload):
+    """
+    Decode a result produced by encode_arrays().
+
+    Args:
+        payload (bytes): Encoded result
+
+    Returns:
+        Result with float arrays as NumPy float32 arrays
+    """
+    magic, version, header_length = ARRAYS_PREFIX.unpack_from(payload)
+    if magic != ARRAYS_MAGIC or version != ARRAYS_VERSION:
+        raise ValueError("Not a version 1 array-format payload")
+    start = ARRAYS_PREFIX.size + header_length
+    header = json.loads(payload[ARRAYS_PREFIX.size:start])
+    data = np.frombuffer(payload, dtype='<f4', offset=start)
+
+    def restore(value):
+        if isinstance(value, dict):
+            if set(value) == {'$array'}:
+                offset, length = value['$array']
+                return data[offset:offset + length]
+            return {key: restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [restore(item) for item in value]
+        return value
+
+    return restore(header)
+
+def encode(data, media_type):
+    """
+    Encode a result in the given media type.
+
+    Args:
+        data: JSON-serializable result
+        media_type (str): One of available_types()
+
+    Returns:
+        bytes: Encoded result
+    """
+    if media_type == ARRAYS_TYPE:
+        return encode_arrays(data)
+    if media_type == MSGPACK_TYPE:
+        # Single-precision floats, like the array format
+        return msgpack.packb(data, use_single_float=True)
+    return json.dumps(data).encode()
@@ -0,0 +1,233 @@
+import os
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from utils.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+class StaticFileCache:
+    """
+    In-memory cache for the UI's static files.
+
+    Files are read once (at startup via preload(), or on first request), stored
+    together with pre-compressed gzip/brotli variants and a strong ETag, and
+    re-read only when their modification time changes. serve() writes the
+    response with ETag, Cache-Control and Content-Encoding headers and answers
+    conditional requests with 304 Not Modified.
+    """
+
+    # Content types worth compressing
+    COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+    # Files smaller than this are sent uncompressed
+    MIN_COMPRESS_SIZE = 256
+
+    def __init__(self, root_dir, max_age=0):
+        """
+        Initialize the static file cache.
+
+        Args:
+            root_dir (str): Directory that request paths are resolved against
+            max_age (int): Cache-Control max-age in seconds for CSS/JS/images;
+                0 means browsers always revalidate with the ETag (HTML and
+                generated assets under assets/ always revalidate)
+        """
+        self.root_dir = os.path.realpath(root_dir)
+        self.max_age = max_age
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, relative_path):
+        """
+        Resolve a request path to an absolute file path inside the root directory.
+
+        Args:
+            relative_path (str): Path relative to the root directory
+
+        Returns:
+            str: Absolute path, or None if it escapes the root or is not a file
+        """
+        absolute_path = os.path.realpath(os.path.join(self.root_dir, relative_path.lstrip('/')))
+        if os.path.commonpath([absolute_path, self.root_dir]) != self.root_dir:
+            return None
+        if not os.path.isfile(absolute_path):
+            return None
+        return absolute_path
+
+    def load(self, absolute_path):
+        """
+        Read a file and build its cache entry.
+
+        Args:
+            absolute_path (str): Absolute path of the file
+
+        Returns:
+            dict: Cache entry with content type, ETag and encoded bodies
+        """
+        mtime = os.path.getmtime(absolute_path)
+        with open(absolute_path, 'rb') as file:
+            body = file.read()
+
+        content_type = mimetypes.guess_type(absolute_path)[0] or 'application/octet-stream'
+        bodies = {'identity': body}
+
+        # Pre-compress text assets; keep a variant only if it is actually smaller
+        if content_type.startswith(self.COMPRESSIBLE_TYPES) and len(body) >= self.MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                bodies['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body)
+                if len(compressed) < len(body):
+                    bodies['br'] = compressed
+
+        # Strong ETags differ per encoding, since the bytes on the wire differ
+        digest = hashlib.sha1(body).hexdigest()
+        etags = {encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+                 for encoding in bodies}
+
+        return {
+            'mtime': mtime,
+            'content_type': content_type,
+            'etags': etags,
+            'bodies': bodies
+        }
+
+    def get(self, relative_path):
+        """
+        Get the cache entry for a file, loading or reloading it if needed.
+
+        Args:
+            relative_path (str): Path relative to the root directory
+
+        Returns:
+            dict: Cache entry, or None if the file does not exist
+        """
+        absolute_path = self.resolve(relative_path)
+        if absolute_path is None:
+            return None
+
+        entry = self.entries.get(absolute_path)
+        if entry is None or entry['mtime'] != os.path.getmtime(absolute_path):
+            metrics.inc('static_cache_requests_total', result='miss')
+            entry = self.load(absolute_path)
+            with self.lock:
+                self.entries[absolute_path] = entry
+        else:
+            metrics.inc('static_cache_requests_total', result='hit')
+        return entry
+
+    def preload(self):
+        """
+        Load every file under the root directory into the cache.
+
+        Returns:
+            int: Number of files loaded
+        """
+        count = 0
+        for directory, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                self.get(os.path.relpath(os.path.join(directory, filename), self.root_dir))
+                count += 1
+        logging.info(f"Preloaded {count} static files from {self.root_dir}")
+        return count
+
+    def cache_control(self, relative_path, content_type):
+        """
+        Get the Cache-Control header value for a file.
+
+        Args:
+            relative_path (str): Path relative to the root directory
+            content_type (str): Content type of the file
+
+        Returns:
+            str: Cache-Control header value
+        """
+        # HTML and generated results change without a new URL, so always revalidate
+        if self.max_age <= 0 or content_type == 'text/html' or 'assets/' in relative_path:
+            return 'no-cache'
+        return f'public, max-age={self.max_age}'
+
+    def choose_encoding(self, entry, accept_encoding):
+        """
+        Pick the best available encoding the client accepts.
+
+        Args:
+            entry (dict): Cache entry
+            accept_encoding (str): Value of the Accept-Encoding request header
+
+        Returns:
+            str: 'br', 'gzip' or 'identity'
+        """
+        accepted = set()
+        for part in (accept_encoding or '').split(','):
+            name, _, params = part.partition(';')
+            params = params.replace(' ', '')
+            quality = 1.0
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+
+        for encoding in ('br', 'gzip'):
+            if encoding in entry['bodies'] and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    def serve(self, handler, relative_path, head=False):
+        """
+        Write a static file response to a request handler.
+
+        Args:
+            handler: BaseHTTPRequestHandler instance to respond through
+            relative_path (str): Path relative to the root directory
+            head (bool): Send headers only (HEAD request)
+
+        Returns:
+            bool: False if the file does not exist (nothing was sent)
+        """
+        entry = self.get(relative_path)
+        if entry is None:
+            return False
+
+        encoding = self.choose_encoding(entry, handler.headers.get('Accept-Encoding'))
+        body = entry['bodies'][encoding]
+        etag = entry['etags'][encoding]
+        cache_control = self.cache_control(relative_path, entry['content_type'])
+
+        # Conditional request: the client already has this exact version
+        if_none_match = handler.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            if '*' in tags or etag in tags or 'W/' + etag in tags:
+                handler.send_response(304)
+                handler.send_header('ETag', etag)
+                handler.send_header('Cache-Control', cache_control)
+                if len(entry['bodies']) > 1:
+                    handler.send_header('Vary', 'Accept-Encoding')
+                handler.end_headers()
+                return True
+
+        handler.send_response(200)
+        handler.send_header('Content-type', entry['content_type'])
+        handler.send_header('Content-Length', str(len(body)))
+        handler.send_header('ETag', etag)
+        handler.send_header('Cache-Control', cache_control)
+        if len(entry['bodies']) > 1:
+            handler.send_header('Vary', 'Accept-Encoding')
+        if encoding != 'identity':
+            handler.send_header('Content-Encoding', encoding)
+        handler.end_headers()
+
+        if not head:
+            handler.wfile.write(body)
+        return True
@@ -23,7 +23,25 @@ class Visualizer:
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
     
-    def plot_accuracy_history(self, ga_history=None, pso_history=None, aco_history=None, tabu_history=None, save_path=None):
+    def history_series(self, history):
+        """
+        Get the x and y values to plot for an accuracy history.
+        
+        Args:
+            history (dict): History with 'best_accuracy_history' and, if it was
+                downsampled, the kept points' 'iterations'
+            
+        Returns:
+            tuple: Iteration numbers and accuracies
+        """
+        accuracies = history['best_accuracy_history']
+        iterations = history.get('iterations')
+        if iterations is None:
+            iterations = np.arange(len(accuracies))
+        return iterations, accuracies
+    
+    def plot_accuracy_history(self, ga_history=None, pso_history=None, aco_history=None, tabu_history=None,
+                              cmaes_history=None, de_history=None, save_path=None):
         """
         Plot the accuracy history for both GA and PSO.
         
@@ -36,16 +54,22 @@ class Visualizer:
         
         # Plot accuracy history for each algorithm if provided
         if ga_history is not None:
-            plt.plot(ga_history['best_accuracy_history'], label='GA', color='blue')
+            plt.plot(*self.history_series(ga_history), label='GA', color='blue')
         
         if pso_history is not None:
-            plt.plot(pso_history['best_accuracy_history'], label='PSO', color='red')
+            plt.plot(*self.history_series(pso_history), label='PSO', color='red')
             
         if aco_history is not None:
-            plt.plot(aco_history['best_accuracy_history'], label='ACO', color='green')
+            plt.plot(*self.history_series(aco_history), label='ACO', color='green')
             
         if tabu_history is not None:
-            plt.plot(tabu_history['best_accuracy_history'], label='Tabu', color='purple')
+            plt.plot(*self.history_series(tabu_history), label='Tabu', color='purple')
+            
+        if cmaes_history is not None:
+            plt.plot(*self.history_series(cmaes_history), label='CMA-ES', color='orange')
+            
+        if de_history is not None:
+            plt.plot(*self.history_series(de_history), label='DE', color='teal')
         
         plt.title('Accuracy vs. Iterations')
         plt.xlabel('Iteration/Generation')
@@ -73,7 +97,7 @@ class Visualizer:
         plt.figure(figsize=(10, 6))
         
         # Plot accuracy history
-        plt.plot(history['best_accuracy_history'], label=title, color=color)
+        plt.plot(*self.history_series(history), label=title, color=color)
         
         plt.title(f'{title} Accuracy vs. Iterations')
         plt.xlabel('Iteration/Generation')
@@ -102,26 +126,26 @@ class Visualizer:
         # Add results for each algorithm if provided
         if ga_results is not None:
             results['algorithms']['ga'] = {
-                'accuracy_history': ga_results['best_accuracy_history'],
-                'final_accuracy': ga_results['best_accuracy_history'][-1]
+                'accuracy_history': np.asarray(ga_results['best_accuracy_history']).tolist(),
+                'final_accuracy': float(ga_results['best_accuracy_history'][-1])
             }
             
         if pso_results is not None:
             results['algorithms']['pso'] = {
-                'accuracy_history': pso_results['best_accuracy_history'],
-                'final_accuracy': pso_results['best_accuracy_history'][-1]
+                'accuracy_history': np.asarray(pso_results['best_accuracy_history']).tolist(),
+                'final_accuracy': float(pso_results['best_accuracy_history'][-1])
             }
             
         if aco_results is not None:
             results['algorithms']['aco'] = {
-                'accuracy_history': aco_results['best_accuracy_history'],
-                'final_accuracy': aco_results['best_accuracy_history'][-1]
+                'accuracy_history': np.asarray(aco_results['best_accuracy_history']).tolist(),
+                'final_accuracy': float(aco_results['best_accuracy_history'][-1])
             }
             
         if tabu_results is not None:
             results['algorithms']['tabu'] = {
-                'accuracy_history': tabu_results['best_accuracy_history'],
-                'final_accuracy': tabu_results['best_accuracy_history'][-1]
+                'accuracy_history': np.asarray(tabu_results['best_accuracy_history']).tolist(),
+                'final_accuracy': float(tabu_results['best_accuracy_history'][-1])
             }
             
         # Determine the best algorithm